@@ -0,0 +1,138 @@
+"""
+Time buckets for evolution charts.
+
+A bucket is identified by its first day. bucket_expression() maps a date column
+to that day in SQL; on PostgreSQL, series() lists every bucket of a range with
+generate_series, so empty buckets come back from the same query as zero rows.
+Other dialects (SQLite) only return the buckets that have data; fill_gaps()
+adds the missing ones in Python.
+"""
+from datetime import date, timedelta
+from sqlalchemy import Date, Integer, case, cast, column, func, literal_column, select, true, values
+
+DAY = "day"
+WEEK = "week"            # ISO weeks, starting on Monday
+FORTNIGHT = "fortnight"  # 1st-15th and 16th-end of each month
+MONTH = "month"
+QUARTER = "quarter"
+GRANULARITIES = (DAY, WEEK, FORTNIGHT, MONTH, QUARTER)
+
+MAX_BUCKETS = 1000
+
+_PG_STEP = {
+    DAY: "interval '1 day'",
+    WEEK: "interval '1 week'",
+    FORTNIGHT: "interval '1 month'",  # months, each split in two
+    MONTH: "interval '1 month'",
+    QUARTER: "interval '3 months'",
+}
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    if granularity == DAY:
+        return day
+    if granularity == WEEK:
+        return day - timedelta(days=day.weekday())
+    if granularity == FORTNIGHT:
+        return day.replace(day=16 if day.day > 15 else 1)
+    if granularity == MONTH:
+        return day.replace(day=1)
+    return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+
+
+def next_bucket(start: date, granularity: str) -> date:
+    if granularity == DAY:
+        return start + timedelta(days=1)
+    if granularity == WEEK:
+        return start + timedelta(days=7)
+    if granularity == FORTNIGHT and start.day == 1:
+        return start.replace(day=16)
+    months = 3 if granularity == QUARTER else 1
+    month = start.month - 1 + months
+    return date(start.year + month // 12, month % 12 + 1, 1)
+
+
+def bucket_starts(start_date: date, end_date: date, granularity: str) -> list[date]:
+    """Every bucket overlapping [start_date, end_date]; ValueError beyond MAX_BUCKETS."""
+    starts = []
+    current = bucket_start(start_date, granularity)
+    while current <= end_date:
+        starts.append(current)
+        if len(starts) > MAX_BUCKETS:
+            raise ValueError(f"The range spans more than {MAX_BUCKETS} {granularity} buckets")
+        current = next_bucket(current, granularity)
+    return starts
+
+
+def bucket_expression(date_column, granularity: str, dialect: str):
+    """SQL expression for the first day of the bucket of date_column."""
+    if dialect == "postgresql":
+        if granularity == DAY:
+            return date_column
+        if granularity == FORTNIGHT:
+            month = func.date_trunc("month", date_column)
+            second_half = case((func.extract("day", date_column) > 15, literal_column("interval '15 days'")), else_=literal_column("interval '0 days'"))
+            return cast(month + second_half, Date)
+        return cast(func.date_trunc(granularity, date_column), Date)
+
+    # SQLite date functions; buckets come back as 'YYYY-MM-DD' strings
+    if granularity == DAY:
+        return func.date(date_column)
+    if granularity == WEEK:
+        return func.date(date_column, "-6 days", "weekday 1")
+    if granularity == FORTNIGHT:
+        return case(
+            (cast(func.strftime("%d", date_column), Integer) > 15, func.strftime("%Y-%m-16", date_column)),
+            else_=func.strftime("%Y-%m-01", date_column)
+        )
+    if granularity == MONTH:
+        return func.strftime("%Y-%m-01", date_column)
+    month = cast(func.strftime("%m", date_column), Integer)
+    return func.printf("%s-%02d-01", func.strftime("%Y", date_column), (month - 1) // 3 * 3 + 1)
+
+
+def series(start_date: date, end_date: date, granularity: str):
+    """PostgreSQL: SELECT of every bucket start (column "bucket") overlapping the range."""
+    first = bucket_start(start_date, granularity)
+    if granularity == FORTNIGHT:
+        first = first.replace(day=1)
+    steps = func.generate_series(
+        cast(first, Date), cast(end_date, Date), literal_column(_PG_STEP[granularity])
+    ).table_valued("value").render_derived()
+
+    if granularity != FORTNIGHT:
+        return select(cast(steps.c.value, Date).label("bucket"))
+
+    halves = values(column("days", Integer), name="halves").data([(0,), (15,)])
+    bucket = cast(steps.c.value + func.make_interval(0, 0, 0, halves.c.days), Date)
+    return select(bucket.label("bucket")).select_from(steps.join(halves, true())).where(
+        bucket >= bucket_start(start_date, granularity),
+        bucket <= end_date
+    )
+
+
+def as_date(value) -> date:
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def fill_gaps(rows, start_date: date, end_date: date, granularity: str, *measures: str) -> list[dict]:
+    """Rows with a "bucket" column -> one dict per bucket of the range, missing measures as 0."""
+    found = {as_date(r.bucket): r for r in rows}
+    filled = []
+    for start in bucket_starts(start_date, end_date, granularity):
+        row = found.get(start)
+        filled.append({"bucket": start, **{m: getattr(row, m) if row is not None else 0 for m in measures}})
+    return filled
+
+
+def label(start: date, granularity: str) -> str:
+    year = str(start.year)[2:]
+    if granularity == DAY:
+        return f"{start.day}/{start.month}/{year}"
+    if granularity == WEEK:
+        return f"Sem. {start.day}/{start.month}/{year}"
+    if granularity == FORTNIGHT:
+        return f"{start.month}/{year} ({'1' if start.day == 1 else '2'}ª Q)"
+    if granularity == MONTH:
+        return f"{start.month}/{year}"
+    return f"T{(start.month - 1) // 3 + 1}/{year}"
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from core.config import settings
+
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache with LRU eviction and a per-entry TTL.
+    Keys are tuples whose first element is the owning user id, so every entry
+    of a user can be dropped when that user's data changes.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Returns (found, value)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        found, value = self.get(key)
+        if found:
+            return value
+        value = compute()
+        self.set(key, value)
+        return value
+
+    async def get_or_compute_async(self, key, compute):
+        """Same as get_or_compute, for a compute coroutine function."""
+        found, value = self.get(key)
+        if found:
+            return value
+        value = await compute()
+        self.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == user_id]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+def cache_key(user_id: int, endpoint: str, **params):
+    """Builds a hashable key; None params are dropped so omitted and explicit-None filters match."""
+    normalized = tuple(sorted(
+        (name, value.isoformat() if isinstance(value, (date, datetime)) else value)
+        for name, value in params.items() if value is not None
+    ))
+    return (user_id, endpoint, normalized)
+
+
+# Shared by the transactions and credit-cards analytics endpoints
+analytics_cache = TTLCache(
+    max_entries=settings.ANALYTICS_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.ANALYTICS_CACHE_TTL_SECONDS,
+)
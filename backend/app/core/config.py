@@ -10,5 +10,27 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
     API_PREFIX: str = os.getenv("API_PREFIX", "/api")
+    ANALYTICS_CACHE_MAX_ENTRIES: int = int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "2048"))
+    ANALYTICS_CACHE_TTL_SECONDS: float = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "300"))
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    MEMBERSHIP_CACHE_MAX_ENTRIES: int = int(os.getenv("MEMBERSHIP_CACHE_MAX_ENTRIES", "10000"))
+    MEMBERSHIP_CACHE_TTL_SECONDS: float = float(os.getenv("MEMBERSHIP_CACHE_TTL_SECONDS", "30"))
+    VAT_REPORT_CACHE_MAX_ENTRIES: int = int(os.getenv("VAT_REPORT_CACHE_MAX_ENTRIES", "4096"))
+    VAT_REPORT_CACHE_TTL_SECONDS: float = float(os.getenv("VAT_REPORT_CACHE_TTL_SECONDS", "3600"))
+    # Password hashing (see features/auth/hashing.py)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+    # Connection pool (see core/pool.py); the sync and the async engine each get one
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    DB_APPLICATION_NAME: str = os.getenv("DB_APPLICATION_NAME", "finance-manager-api")
+    # Users allowed to read the /system endpoints (comma-separated emails; none by default)
+    OPS_USER_EMAILS: str = os.getenv("OPS_USER_EMAILS", "")
 
 settings = Settings()
\ No newline at end of file
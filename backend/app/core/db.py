@@ -1,9 +1,13 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from core.config import settings
+from core import pool
 
 # Connection to postgreSQL
-engine = create_engine(settings.DATABASE_URL, echo=settings.DEBUG)
+engine = create_engine(settings.DATABASE_URL, echo=settings.DEBUG, **pool.engine_options(settings.DATABASE_URL))
+pool.configure("sync", engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -14,8 +18,45 @@ def get_db():
     """Returns a db session to each request"""
     db = SessionLocal()
     try:
-         # força o encoding na sessão
-        db.execute(text("SET client_encoding TO 'UTF8';"))
+        # The client encoding is set once per connection (core/pool.py)
         yield db
     finally:
         db.close()
+
+
+ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(database_url: str):
+    """Same database as DATABASE_URL, through its asyncio driver (asyncpg / aiosqlite)."""
+    url = make_url(database_url)
+    backend = url.drivername.split("+")[0]
+    url = url.set(drivername=ASYNC_DRIVERS.get(backend, url.drivername))
+    if backend.startswith("postgres") and "sslmode" in url.query:
+        # asyncpg takes ssl=<mode> instead of libpq's sslmode
+        url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": url.query["sslmode"]})
+    return url
+
+
+# Async engine for the read-heavy routes
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL), echo=settings.DEBUG,
+    **pool.engine_options(settings.DATABASE_URL, is_async=True)
+)
+pool.configure("async", async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    """
+    Returns an AsyncSession to each request. The services are written against the
+    sync Session API, so routes call them with `await db.run_sync(service.fn, ...)`:
+    the function runs on the event loop and its queries await the async driver.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,103 @@
+"""
+Connection pool configuration and monitoring for the sync and async engines.
+
+Pool size, overflow, timeout, recycle and pre-ping come from Settings.
+Recycling and pre-ping drop connections that the server or a proxy closed
+while the instance sat idle (Cloud Run / Cloud SQL), instead of failing the
+next request on them. Session parameters (client encoding, statement timeout)
+are set once when a connection is opened, not on every request.
+"""
+import threading
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from core.config import settings
+
+
+def engine_options(database_url, is_async: bool = False) -> dict:
+    """Keyword arguments for create_engine / create_async_engine."""
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        # SQLite uses its own pool classes (no network, no server-side timeouts)
+        return {}
+
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if url.get_backend_name() == "postgresql":
+        if is_async:
+            # asyncpg sends these in the startup packet and always talks UTF-8
+            server_settings = {"application_name": settings.DB_APPLICATION_NAME}
+            if settings.DB_STATEMENT_TIMEOUT_MS:
+                server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+            options["connect_args"] = {"server_settings": server_settings}
+        else:
+            options["connect_args"] = {"application_name": settings.DB_APPLICATION_NAME}
+    return options
+
+
+def _session_statements() -> list[str]:
+    statements = ["SET client_encoding TO 'UTF8'"]
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        statements.append(f"SET statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT_MS)}")
+    return statements
+
+
+class PoolMonitor:
+    """Counts pool events of one engine; status() adds the live pool gauges."""
+
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.counters = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidations": 0}
+        for event_name, counter in [
+            ("connect", "connects"),
+            ("checkout", "checkouts"),
+            ("checkin", "checkins"),
+            ("invalidate", "invalidations"),
+        ]:
+            event.listen(engine, event_name, self._counter(counter))
+
+    def _counter(self, counter: str):
+        def increment(*args):
+            with self._lock:
+                self.counters[counter] += 1
+        return increment
+
+    def status(self) -> dict:
+        pool = self.engine.pool
+        gauges = {"pool_class": type(pool).__name__}
+        for gauge in ("size", "checkedin", "checkedout", "overflow"):
+            value = getattr(pool, gauge, None)
+            if callable(value):  # QueuePool gauges; SQLite's pools only have some
+                gauges[gauge] = value()
+        gauges["timeout"] = getattr(pool, "_timeout", None)
+        gauges["recycle"] = pool._recycle
+        gauges["pre_ping"] = pool._pre_ping
+        with self._lock:
+            return {**gauges, **self.counters}
+
+
+monitors: dict[str, PoolMonitor] = {}
+
+
+def configure(name: str, engine: Engine):
+    """Registers the per-connection setup and the pool monitor for an engine (the sync_engine of an async one)."""
+    if engine.dialect.driver == "psycopg2":
+        @event.listens_for(engine, "connect")
+        def set_session_parameters(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("; ".join(_session_statements()))
+            cursor.close()
+            # Committed, otherwise the pool's reset-on-return rollback would undo the SETs
+            dbapi_connection.commit()
+
+    monitors[name] = PoolMonitor(name, engine)
+
+
+def pool_stats() -> dict:
+    return {name: monitor.status() for name, monitor in monitors.items()}
@@ -0,0 +1,66 @@
+"""
+Text search helpers shared by the personal and business transaction search.
+
+On PostgreSQL a query matches through full-text search (Portuguese configuration,
+GIN index over to_tsvector) or trigram similarity (pg_trgm GIN index), and hits
+are ranked by ts_rank + similarity. The indexed expressions are built by the
+same functions used in the queries, so the planner can match them.
+
+Other dialects (SQLite in the tests) fall back to a case-insensitive LIKE per
+search term, ranked by the number of matching terms.
+"""
+from sqlalchemy import DDL, Index, case, event, func, literal_column, or_
+from sqlalchemy.orm import Session
+from core.db import Base
+
+TS_CONFIG = literal_column("'portuguese'::regconfig")
+# Inline literals (not bound parameters) so the query text matches the index expressions
+EMPTY = literal_column("''")
+SPACE = literal_column("' '")
+
+
+def search_document(*columns):
+    """The text that gets indexed: the given columns joined by spaces, NULLs as ''."""
+    document = func.coalesce(columns[0], EMPTY)
+    for column in columns[1:]:
+        document = document.op("||")(SPACE).op("||")(func.coalesce(column, EMPTY))
+    return document
+
+
+def ts_vector(document):
+    return func.to_tsvector(TS_CONFIG, document)
+
+
+def match_and_rank(db: Session, document, q: str):
+    """Returns (where clause, rank expression) for the search text q."""
+    if db.get_bind().dialect.name == "postgresql":
+        ts_query = func.websearch_to_tsquery(TS_CONFIG, q)
+        vector = ts_vector(document)
+        condition = or_(vector.op("@@")(ts_query), document.op("%")(q))
+        rank = func.ts_rank(vector, ts_query) + func.similarity(document, q)
+        return condition, rank
+
+    terms = [term for term in q.split() if term] or [q]
+    matches = [document.icontains(term, autoescape=True) for term in terms]
+    rank = sum((case((m, 1), else_=0) for m in matches[1:]), case((matches[0], 1), else_=0))
+    return or_(*matches), rank
+
+
+def search_indexes(prefix: str, document, where):
+    """GIN indexes (full-text and trigram) over a search document; created on PostgreSQL only."""
+    return (
+        Index(
+            f"{prefix}_fts", ts_vector(document),
+            postgresql_using="gin", postgresql_where=where,
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            f"{prefix}_trgm", document.label("document"),
+            postgresql_using="gin", postgresql_ops={"document": "gin_trgm_ops"}, postgresql_where=where,
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+event.listen(
+    Base.metadata, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
@@ -1,46 +1,56 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from passlib.context import CryptContext
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from features.users.models import User
 from features.auth.schemas import UserCreate, UserLogin
-from core.db import get_db
+from features.auth.hashing import password_hasher
+from core.cache import TTLCache
+from core.config import settings
+from core.db import get_async_db, get_db
 import os
 
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 1 dia
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_password(password: str):
-    return pwd_context.hash(password)
-
-def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
-
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def register_user(db: Session, user: UserCreate):
-    if db.query(User).filter(User.email == user.email).first():
+async def _check_new_user(db: AsyncSession, user: UserCreate):
+    if await db.scalar(select(User.id).where(User.email == user.email)):
         raise ValueError("Email já registado")
-    if db.query(User).filter(User.username == user.username).first():
+    if await db.scalar(select(User.id).where(User.username == user.username)):
         raise ValueError("Username já existe")
-    db_user = User(email=user.email, username=user.username, password_hash=hash_password(user.password))
+
+# The lookups open a transaction: it is ended before awaiting the hasher, so the
+# pooled connection is not held while the password hash waits on the executor
+async def register_user(db: AsyncSession, user: UserCreate):
+    await _check_new_user(db, user)
+    await db.rollback()
+    password_hash = await password_hasher.hash(user.password)
+
+    # Checked again: another registration may have taken them while hashing
+    await _check_new_user(db, user)
+    db_user = User(email=user.email, username=user.username, password_hash=password_hash)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def authenticate_user(db: Session, credentials: UserLogin):
-    user = db.query(User).filter(User.email == credentials.email).first()
-    if not user or not verify_password(credentials.password, user.password_hash):
+async def authenticate_user(db: AsyncSession, credentials: UserLogin):
+    user = (await db.execute(
+        select(User.id, User.password_hash).where(User.email == credentials.email)
+    )).first()
+    await db.rollback()
+    if not user or not await password_hasher.verify(credentials.password, user.password_hash):
         return None
     token = create_access_token({"sub": str(user.id)})
     return {"access_token": token, "token_type": "bearer"}
@@ -50,26 +60,101 @@ def authenticate_user(db: Session, credentials: UserLogin):
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by the routes (identity only, safe to share between requests)."""
+    id: int
+    email: str
+    username: str | None
+    created_at: datetime | None
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db) ):
-    """Valida o JWT e devolve o utilizador autenticado."""
-    credentials_exception = HTTPException(
+# Authenticated users by id, so most requests skip the users lookup. Entries are
+# dropped when a user is deleted or its credentials change (see below); other
+# worker processes pick that up when their entry expires.
+principal_cache = TTLCache(
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def _cache_principal(user: User | None) -> Principal | None:
+    if user is None:
+        return None
+    principal = Principal(id=user.id, email=user.email, username=user.username, created_at=user.created_at)
+    principal_cache.set((user.id,), principal)
+    return principal
+
+
+def load_principal(db: Session, user_id: int) -> Principal | None:
+    found, principal = principal_cache.get((user_id,))
+    if found:
+        return principal
+    return _cache_principal(db.query(User).filter(User.id == user_id).first())
+
+
+async def load_principal_async(db: AsyncSession, user_id: int) -> Principal | None:
+    found, principal = principal_cache.get((user_id,))
+    if found:
+        return principal
+    return _cache_principal(await db.scalar(select(User).where(User.id == user_id)))
+
+
+def invalidate_principal(user_id: int):
+    principal_cache.invalidate_user(user_id)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ("email", "username", "password_hash")):
+        Session.object_session(target).info.setdefault("stale_principals", set()).add(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target):
+    Session.object_session(target).info.setdefault("stale_principals", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_stale_principals(session):
+    # After the commit, so a concurrent request can't re-cache the old row
+    for user_id in session.info.pop("stale_principals", ()):
+        invalidate_principal(user_id)
+
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token inválido ou expirado",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+def _token_user_id(token: str) -> int:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    return int(user_id)
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if user is None:
-        raise credentials_exception
 
-    return user
\ No newline at end of file
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db) ) -> Principal:
+    """Valida o JWT e devolve o utilizador autenticado."""
+    principal = load_principal(db, _token_user_id(token))
+    if principal is None:
+        raise _credentials_exception()
+
+    return principal
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
+    """Same as get_current_user, on the request's AsyncSession (for async routes)."""
+    principal = await load_principal_async(db, _token_user_id(token))
+    if principal is None:
+        raise _credentials_exception()
+
+    return principal
\ No newline at end of file
@@ -1,20 +1,69 @@
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 from features.business.members import models, schemas
-from fastapi import HTTPException, status
+from features.auth.service import Principal, get_current_user
+from fastapi import Depends, HTTPException, status
 from datetime import datetime
+from core.cache import TTLCache
+from core.config import settings
+from core.db import get_db
 
-def check_member_role(db: Session, business_id: int, user_id: int, allowed_roles: list[str]):
-    member = db.query(models.BusinessMember).filter(
+# Role of a user in a business (None = not an active member), keyed by (user_id, business_id).
+# Entries are dropped after any commit that inserts, updates or deletes a membership;
+# other worker processes see the change when their entry expires.
+membership_cache = TTLCache(
+    max_entries=settings.MEMBERSHIP_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.MEMBERSHIP_CACHE_TTL_SECONDS,
+)
+
+
+def get_member_role(db: Session, business_id: int, user_id: int) -> str | None:
+    key = (user_id, business_id)
+    found, role = membership_cache.get(key)
+    if found:
+        return role
+
+    role = db.query(models.BusinessMember.role).filter(
         models.BusinessMember.business_id == business_id,
-        models.BusinessMember.user_id == user_id
-    ).first()
-    
-    if not member or member.role not in allowed_roles:
+        models.BusinessMember.user_id == user_id,
+        models.BusinessMember.deleted_at == None
+    ).scalar()
+    membership_cache.set(key, role)
+    return role
+
+
+def check_member_role(db: Session, business_id: int, user_id: int, allowed_roles: list[str]):
+    role = get_member_role(db, business_id, user_id)
+    if role not in allowed_roles:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to perform this action."
         )
-    return member
+    return role
+
+
+def require_member_role(allowed_roles: list[str]):
+    """Route dependency: checks the current user's role in the path's business and returns it."""
+    def dependency(
+        business_id: int,
+        db: Session = Depends(get_db),
+        current_user: Principal = Depends(get_current_user)
+    ) -> str:
+        return check_member_role(db, business_id, current_user.id, allowed_roles)
+    return dependency
+
+
+@event.listens_for(models.BusinessMember, "after_insert")
+@event.listens_for(models.BusinessMember, "after_update")
+@event.listens_for(models.BusinessMember, "after_delete")
+def _membership_changed(mapper, connection, target):
+    Session.object_session(target).info.setdefault("stale_memberships", set()).add((target.user_id, target.business_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_stale_memberships(session):
+    for key in session.info.pop("stale_memberships", ()):
+        membership_cache.invalidate(key)
 
 def get_members(db: Session, business_id: int):
     return db.query(models.BusinessMember).filter(models.BusinessMember.business_id == business_id).all()
@@ -24,17 +73,23 @@ def add_member(db: Session, business_id: int, member_data: schemas.BusinessMembe
     existing = db.query(models.BusinessMember).filter(
         models.BusinessMember.business_id == business_id,
         models.BusinessMember.user_id == member_data.user_id
-    ).first()
+    ).order_by(models.BusinessMember.deleted_at.is_not(None), models.BusinessMember.id.desc()).first()
     
-    if existing:
+    if existing and existing.deleted_at is None:
         raise HTTPException(status_code=400, detail="User is already a member of this business")
 
-    new_member = models.BusinessMember(
-        business_id=business_id,
-        user_id=member_data.user_id,
-        role= 'invited'
-    )
-    db.add(new_member)
+    if existing:
+        # A removed member is invited again on the same row
+        existing.deleted_at = None
+        existing.role = 'invited'
+        new_member = existing
+    else:
+        new_member = models.BusinessMember(
+            business_id=business_id,
+            user_id=member_data.user_id,
+            role= 'invited'
+        )
+        db.add(new_member)
     db.commit()
     db.refresh(new_member)
     return new_member
@@ -42,7 +97,8 @@ def add_member(db: Session, business_id: int, member_data: schemas.BusinessMembe
 def remove_member(db: Session, business_id: int, user_id_to_remove: int):
     member = db.query(models.BusinessMember).filter(
         models.BusinessMember.business_id == business_id,
-        models.BusinessMember.user_id == user_id_to_remove
+        models.BusinessMember.user_id == user_id_to_remove,
+        models.BusinessMember.deleted_at == None
     ).first()
     
     if not member:
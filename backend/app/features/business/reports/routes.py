@@ -0,0 +1,29 @@
+from datetime import date
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from core.db import get_db
+from features.business.reports import schemas
+from features.business.reports.service import ProfitAndLossService, VatReportService
+from features.business.members.service import require_member_role
+
+router = APIRouter()
+
+@router.get("/vat", response_model=schemas.VatReportResponse)
+def get_vat_report(
+    business_id: int,
+    year: int = Query(None, ge=2000, le=2100),
+    currency: str = Query("EUR", min_length=3, max_length=3),
+    role: str = Depends(require_member_role(['owner', 'admin', 'member', 'viewer'])),
+    db: Session = Depends(get_db)
+):
+    return VatReportService.get_report(db, business_id, year or date.today().year, currency)
+
+@router.get("/profit-and-loss", response_model=schemas.ProfitAndLossResponse)
+def get_profit_and_loss(
+    business_id: int,
+    year: int = Query(None, ge=2000, le=2100),
+    currency: str = Query("EUR", min_length=3, max_length=3),
+    role: str = Depends(require_member_role(['owner', 'admin', 'member', 'viewer'])),
+    db: Session = Depends(get_db)
+):
+    return ProfitAndLossService.get_report(db, business_id, year or date.today().year, currency)
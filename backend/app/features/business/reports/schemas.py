@@ -0,0 +1,65 @@
+from pydantic import BaseModel
+from datetime import date
+
+class VatRateLine(BaseModel):
+    vat_rate: float
+    vat_exemption: bool
+    sales_net: float       # income net amounts
+    vat_due: float         # VAT charged on income
+    purchases_net: float   # expense net amounts
+    vat_deductible: float  # VAT paid on expenses
+    transactions: int
+
+class VatPeriod(BaseModel):
+    period: str  # "2024-01" or "2024-Q1"
+    start_date: date
+    end_date: date
+    closed: bool
+    lines: list[VatRateLine]
+    vat_due: float
+    vat_deductible: float
+    vat_balance: float  # due - deductible; negative means a credit
+    exempt_sales: float
+    exempt_purchases: float
+    withholding_on_sales: float
+    withholding_on_purchases: float
+
+class VatQuarter(VatPeriod):
+    months: list[VatPeriod]
+
+class VatReportResponse(BaseModel):
+    business_id: int
+    year: int
+    currency: str                 # the amounts are all in this currency
+    other_currencies: list[str]   # transactions of the year in other currencies, not included
+    quarters: list[VatQuarter]
+
+class ProfitAndLossTotals(BaseModel):
+    income: float
+    expense: float
+    margin: float
+    margin_pct: float | None = None  # margin / income; None without income
+
+class ProfitAndLossMonth(ProfitAndLossTotals):
+    month: int
+
+class ProfitAndLossLine(BaseModel):
+    category_id: int | None = None
+    category_name: str
+    type: str
+    months: list[float]  # January to December of the report year
+    ytd: float
+    prior_ytd: float     # same months of the previous year
+    prior_year: float
+
+class ProfitAndLossResponse(BaseModel):
+    business_id: int
+    year: int
+    currency: str                 # the amounts are all in this currency
+    other_currencies: list[str]   # transactions in other currencies, not included
+    through_month: int  # last month counted in the year-to-date columns
+    lines: list[ProfitAndLossLine]
+    months: list[ProfitAndLossMonth]
+    ytd: ProfitAndLossTotals
+    prior_ytd: ProfitAndLossTotals
+    prior_year: ProfitAndLossTotals
@@ -0,0 +1,310 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy import case, event, extract, func, inspect, literal, select, tuple_, union_all
+from sqlalchemy.orm import Session
+from core.cache import TTLCache
+from core.config import settings
+from features.business.transactions.models import BusinessTransaction, BusinessMonthlyRollup
+from features.business.transactions.rollup_service import NO_CATEGORY
+from features.business.transaction_categories.models import BusinessTransactionCategory
+
+# Quarters that are over, keyed by (business_id, year, quarter). Open quarters are
+# always read from the database. A write dated in a cached quarter (a late invoice)
+# drops that entry after commit; other worker processes see it within the TTL.
+vat_report_cache = TTLCache(
+    max_entries=settings.VAT_REPORT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.VAT_REPORT_CACHE_TTL_SECONDS,
+)
+
+ZERO = Decimal("0")
+
+
+def quarter_of(day: date) -> int:
+    return (day.month - 1) // 3 + 1
+
+
+def quarter_range(year: int, quarter: int):
+    start = date(year, 3 * quarter - 2, 1)
+    end = date(year + 1, 1, 1) if quarter == 4 else date(year, 3 * quarter + 1, 1)
+    return start, end - timedelta(days=1)
+
+
+def month_range(year: int, month: int):
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return date(year, month, 1), end - timedelta(days=1)
+
+
+class VatReportService:
+    """
+    Monthly and quarterly VAT return per business: VAT due (income) and
+    deductible (expenses) per rate, exempt amounts and withholding tax.
+    A return is in one currency: transactions in others are left out and listed.
+    """
+
+    @staticmethod
+    def _query(dialect: str, business_id: int, start_date: date, end_date: date):
+        Tx = BusinessTransaction
+        month = extract("month", Tx.date)
+
+        # Row-level values first, so the grouping only sees plain columns
+        source = select(
+            case((month <= 3, 1), (month <= 6, 2), (month <= 9, 3), else_=4).label("quarter"),
+            month.label("month"),
+            func.upper(Tx.currency).label("currency"),
+            Tx.type,
+            func.coalesce(Tx.vat_rate, 0).label("vat_rate"),
+            Tx.vat_exemption,
+            Tx.net_amount,
+            Tx.vat_amount,
+            func.coalesce(Tx.withholding_tax_amount, 0).label("withholding_tax_amount"),
+        ).where(
+            Tx.business_id == business_id,
+            Tx.deleted_at.is_(None),
+            Tx.date >= start_date,
+            Tx.date <= end_date,
+        ).subquery()
+
+        lines = [source.c.currency, source.c.type, source.c.vat_rate, source.c.vat_exemption]
+        measures = [
+            func.sum(source.c.net_amount).label("net"),
+            func.sum(source.c.vat_amount).label("vat"),
+            func.sum(source.c.withholding_tax_amount).label("withholding"),
+            func.count().label("transactions"),
+        ]
+
+        if dialect == "postgresql":
+            # One scan: month lines and quarter lines (month is NULL) in the same GROUP BY
+            query = select(source.c.quarter, source.c.month, *lines, *measures).group_by(func.grouping_sets(
+                tuple_(source.c.quarter, source.c.month, *lines),
+                tuple_(source.c.quarter, *lines),
+            ))
+        else:
+            # No GROUPING SETS (SQLite): the same rows from two GROUP BYs
+            query = union_all(
+                select(source.c.quarter, source.c.month, *lines, *measures)
+                .group_by(source.c.quarter, source.c.month, *lines),
+                select(source.c.quarter, literal(None).label("month"), *lines, *measures)
+                .group_by(source.c.quarter, *lines),
+            )
+        return query
+
+    @staticmethod
+    def _period(label: str, start_date: date, end_date: date, today: date, lines: dict):
+        period = {
+            "period": label,
+            "start_date": start_date,
+            "end_date": end_date,
+            "closed": end_date < today,
+            "lines": sorted(lines.values(), key=lambda line: (line["vat_exemption"], line["vat_rate"])),
+            "vat_due": ZERO,
+            "vat_deductible": ZERO,
+            "exempt_sales": ZERO,
+            "exempt_purchases": ZERO,
+            "withholding_on_sales": ZERO,
+            "withholding_on_purchases": ZERO,
+        }
+        for line in period["lines"]:
+            period["vat_due"] += line["vat_due"]
+            period["vat_deductible"] += line["vat_deductible"]
+            if line["vat_exemption"]:
+                period["exempt_sales"] += line["sales_net"]
+                period["exempt_purchases"] += line["purchases_net"]
+            period["withholding_on_sales"] += line.pop("withholding_on_sales")
+            period["withholding_on_purchases"] += line.pop("withholding_on_purchases")
+        period["vat_balance"] = period["vat_due"] - period["vat_deductible"]
+        return period
+
+    @staticmethod
+    def _build(rows, year: int, quarters: list[int], today: date, currencies: set[str]):
+        # (currency, quarter, month or None) -> (vat_rate, vat_exemption) -> line
+        grouped = defaultdict(dict)
+        for r in rows:
+            line = grouped[(r.currency, int(r.quarter), int(r.month) if r.month is not None else None)].setdefault(
+                (Decimal(str(r.vat_rate)), bool(r.vat_exemption)),
+                {
+                    "vat_rate": Decimal(str(r.vat_rate)),
+                    "vat_exemption": bool(r.vat_exemption),
+                    "sales_net": ZERO, "vat_due": ZERO, "withholding_on_sales": ZERO,
+                    "purchases_net": ZERO, "vat_deductible": ZERO, "withholding_on_purchases": ZERO,
+                    "transactions": 0,
+                }
+            )
+            if r.type == "income":
+                line["sales_net"] += Decimal(str(r.net))
+                line["vat_due"] += Decimal(str(r.vat))
+                line["withholding_on_sales"] += Decimal(str(r.withholding))
+            else:
+                line["purchases_net"] += Decimal(str(r.net))
+                line["vat_deductible"] += Decimal(str(r.vat))
+                line["withholding_on_purchases"] += Decimal(str(r.withholding))
+            line["transactions"] += r.transactions
+
+        # quarter -> currency -> report
+        built = {}
+        for quarter in quarters:
+            start_date, end_date = quarter_range(year, quarter)
+            built[quarter] = {}
+            for currency in currencies:
+                report = VatReportService._period(
+                    f"{year}-Q{quarter}", start_date, end_date, today, grouped[(currency, quarter, None)]
+                )
+                report["months"] = [
+                    VatReportService._period(
+                        f"{year}-{month:02d}", *month_range(year, month), today, grouped[(currency, quarter, month)]
+                    )
+                    for month in range(3 * quarter - 2, 3 * quarter + 1)
+                ]
+                built[quarter][currency] = report
+        return built
+
+    @staticmethod
+    def get_report(db: Session, business_id: int, year: int, currency: str = "EUR", today: date = None):
+        today = today or date.today()
+        currency = currency.upper()
+        quarters = {}  # quarter -> currency -> report
+        for quarter in range(1, 5):
+            found, cached = vat_report_cache.get((business_id, year, quarter))
+            if found:
+                quarters[quarter] = cached
+
+        missing = [quarter for quarter in range(1, 5) if quarter not in quarters]
+        if missing:
+            start_date = quarter_range(year, missing[0])[0]
+            end_date = quarter_range(year, missing[-1])[1]
+            query = VatReportService._query(db.get_bind().dialect.name, business_id, start_date, end_date)
+            rows = db.execute(query).all()
+            currencies = {r.currency for r in rows} | {currency}
+            for quarter, reports in VatReportService._build(rows, year, missing, today, currencies).items():
+                quarters[quarter] = reports
+                if reports[currency]["closed"]:
+                    vat_report_cache.set((business_id, year, quarter), reports)
+
+        return {
+            "business_id": business_id,
+            "year": year,
+            "currency": currency,
+            "other_currencies": sorted(
+                {c for reports in quarters.values() for c, report in reports.items() if report["lines"]} - {currency}
+            ),
+            "quarters": [
+                quarters[q].get(currency) or VatReportService._build([], year, [q], today, {currency})[q][currency]
+                for q in range(1, 5)
+            ],
+        }
+
+
+def _totals(income: Decimal, expense: Decimal):
+    margin = income - expense
+    return {
+        "income": income,
+        "expense": expense,
+        "margin": margin,
+        "margin_pct": round(float(margin / income * 100), 2) if income else None,
+    }
+
+
+class ProfitAndLossService:
+    """
+    Income, expense and margin per category and month, read from the monthly
+    rollup (business_monthly_rollups), so the cost depends on the number of
+    categories and months, not on the number of transactions. Amounts are in
+    one currency; the currencies left out are listed.
+    """
+
+    @staticmethod
+    def get_report(db: Session, business_id: int, year: int, currency: str = "EUR", today: date = None):
+        today = today or date.today()
+        currency = currency.upper()
+        if year < today.year:
+            through_month = 12
+        elif year == today.year:
+            through_month = today.month
+        else:
+            through_month = 0
+
+        rows = db.query(
+            BusinessMonthlyRollup.month_start,
+            BusinessMonthlyRollup.type,
+            BusinessMonthlyRollup.category_id,
+            BusinessMonthlyRollup.currency,
+            BusinessMonthlyRollup.net_total,
+            BusinessTransactionCategory.name,
+        ).outerjoin(
+            BusinessTransactionCategory, BusinessTransactionCategory.id == BusinessMonthlyRollup.category_id
+        ).filter(
+            BusinessMonthlyRollup.business_id == business_id,
+            BusinessMonthlyRollup.month_start >= date(year - 1, 1, 1),
+            BusinessMonthlyRollup.month_start <= date(year, 12, 1),
+            BusinessMonthlyRollup.count > 0
+        ).all()
+
+        lines = {}
+        other_currencies = set()
+        for r in rows:
+            if r.currency != currency:
+                other_currencies.add(r.currency)
+                continue
+            line = lines.setdefault((r.type, r.category_id), {
+                "category_id": None if r.category_id == NO_CATEGORY else r.category_id,
+                "category_name": r.name or "Sem categoria",
+                "type": r.type,
+                "months": [ZERO] * 12,
+                "ytd": ZERO,
+                "prior_ytd": ZERO,
+                "prior_year": ZERO,
+            })
+            total = Decimal(str(r.net_total))
+            month = r.month_start.month
+            if r.month_start.year == year:
+                line["months"][month - 1] += total
+                if month <= through_month:
+                    line["ytd"] += total
+            else:
+                line["prior_year"] += total
+                if month <= through_month:
+                    line["prior_ytd"] += total
+
+        lines = sorted(lines.values(), key=lambda line: (line["type"] != "income", line["category_name"]))
+
+        def column_totals(column):
+            income = sum((line[column] for line in lines if line["type"] == "income"), ZERO)
+            expense = sum((line[column] for line in lines if line["type"] == "expense"), ZERO)
+            return _totals(income, expense)
+
+        months = []
+        for month in range(1, 13):
+            income = sum((line["months"][month - 1] for line in lines if line["type"] == "income"), ZERO)
+            expense = sum((line["months"][month - 1] for line in lines if line["type"] == "expense"), ZERO)
+            months.append({"month": month, **_totals(income, expense)})
+
+        return {
+            "business_id": business_id,
+            "year": year,
+            "currency": currency,
+            "other_currencies": sorted(other_currencies),
+            "through_month": through_month,
+            "lines": lines,
+            "months": months,
+            "ytd": column_totals("ytd"),
+            "prior_ytd": column_totals("prior_ytd"),
+            "prior_year": column_totals("prior_year"),
+        }
+
+
+@event.listens_for(BusinessTransaction, "after_insert")
+@event.listens_for(BusinessTransaction, "after_update")
+@event.listens_for(BusinessTransaction, "after_delete")
+def _vat_period_changed(mapper, connection, target):
+    # The quarter it is dated in now and, if the date was changed, the one it left
+    history = inspect(target).attrs.date.history
+    stale = Session.object_session(target).info.setdefault("stale_vat_periods", set())
+    for day in [target.date, *history.deleted]:
+        if day is not None:
+            stale.add((target.business_id, day.year, quarter_of(day)))
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_stale_vat_periods(session):
+    for key in session.info.pop("stale_vat_periods", ()):
+        vat_report_cache.invalidate(key)
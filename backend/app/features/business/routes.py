@@ -1,17 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from core.db import get_db
 from features.business import service, schemas
-from features.users.models import User
-from features.auth.service import get_current_user
-from features.business.members.service import check_member_role
+from features.auth.service import Principal, get_current_user
+from features.business.members.service import require_member_role
 
 router = APIRouter()
 
 @router.get("/", response_model=list[schemas.BusinessResponse])
 def list_user_businesses(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     return service.get_user_businesses(db, current_user.id)
 
@@ -19,17 +19,27 @@ def list_user_businesses(
 def create_business(
     business: schemas.BusinessCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     return service.create_business(db, business, current_user.id)
 
+@router.get("/dashboard", response_model=schemas.BusinessDashboardResponse)
+def get_dashboard(
+    start_date: date = Query(None),
+    end_date: date = Query(None),
+    currency: str = Query("EUR", min_length=3, max_length=3),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    return service.get_dashboard(db, current_user.id, start_date, end_date, currency)
+
 @router.get("/{business_id}", response_model=schemas.BusinessResponse)
 def get_business(
     business_id: int,
+    role: str = Depends(require_member_role(['owner', 'admin', 'member', 'viewer'])),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    check_member_role(db, business_id, current_user.id, ['owner', 'admin', 'member', 'viewer'])
     business = service.get_business(db, business_id)
     if not business:
         raise HTTPException(status_code=404, detail="Business not found")
@@ -38,9 +48,9 @@ def get_business(
 @router.delete("/{business_id}", response_model=schemas.BusinessResponse)
 def delete_business(
     business_id: int,
+    role: str = Depends(require_member_role(['owner', 'admin'])),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    check_member_role(db, business_id, current_user.id, ['owner', 'admin'])
     return service.delete_business(db, business_id, current_user.id)
 
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
 
 class BusinessBase(BaseModel):
     name: str
@@ -16,3 +16,26 @@ class BusinessResponse(BusinessBase):
 
     class Config:
         from_attributes = True
+
+class BusinessDashboardTotals(BaseModel):
+    revenue: float   # net income
+    expense: float   # net expenses
+    profit: float
+    vat_due: float
+    vat_deductible: float
+    transactions: int
+    other_currency_transactions: int  # in other currencies, left out of the amounts
+
+class BusinessDashboardEntry(BusinessDashboardTotals):
+    business_id: int
+    name: str
+    tax_id: str
+    country: str
+    role: str
+
+class BusinessDashboardResponse(BaseModel):
+    start_date: date | None = None
+    end_date: date | None = None
+    currency: str
+    businesses: list[BusinessDashboardEntry]
+    totals: BusinessDashboardTotals
@@ -1,7 +1,10 @@
+from sqlalchemy import and_, case, func
 from sqlalchemy.orm import Session
 from features.business import models, schemas
 from features.business.members import models as member_models
-from datetime import datetime
+from features.business.transactions.models import BusinessTransaction
+from datetime import date, datetime
+from decimal import Decimal
 from fastapi import HTTPException, status
 from features.business.members.service import check_member_role
 
@@ -53,3 +56,77 @@ def get_user_businesses(db: Session, user_id: int):
         businesses.append(business_dict)
     
     return businesses
+
+DASHBOARD_ROLES = ['owner', 'admin', 'member', 'viewer']  # pending invitations see nothing
+
+def get_dashboard(db: Session, user_id: int, start_date: date = None, end_date: date = None, currency: str = "EUR"):
+    """
+    Totals of every business the user is an active member of, from one grouped query.
+    Amounts are in one currency; transactions in others are only counted.
+    """
+    Member = member_models.BusinessMember
+    Tx = BusinessTransaction
+
+    tx_join = [Tx.business_id == models.Business.id, Tx.deleted_at == None]
+    if start_date:
+        tx_join.append(Tx.date >= start_date)
+    if end_date:
+        tx_join.append(Tx.date <= end_date)
+
+    in_currency = func.upper(Tx.currency) == currency.upper()
+
+    def total(column, tx_type):
+        return func.coalesce(func.sum(case((and_(Tx.type == tx_type, in_currency), column), else_=0)), 0)
+
+    rows = db.query(
+        models.Business.id,
+        models.Business.name,
+        models.Business.tax_id,
+        models.Business.country,
+        Member.role,
+        total(Tx.net_amount, 'income').label('revenue'),
+        total(Tx.net_amount, 'expense').label('expense'),
+        total(Tx.vat_amount, 'income').label('vat_due'),
+        total(Tx.vat_amount, 'expense').label('vat_deductible'),
+        func.count(case((in_currency, Tx.id))).label('transactions'),
+        func.count(case((~in_currency, Tx.id))).label('other_currency_transactions'),
+    ).join(Member, Member.business_id == models.Business.id)\
+        .outerjoin(Tx, and_(*tx_join))\
+        .filter(Member.user_id == user_id)\
+        .filter(Member.deleted_at == None)\
+        .filter(Member.role.in_(DASHBOARD_ROLES))\
+        .filter(models.Business.deleted_at == None)\
+        .group_by(models.Business.id, models.Business.name, models.Business.tax_id, models.Business.country, Member.role)\
+        .order_by(models.Business.name, models.Business.id)\
+        .all()
+
+    businesses = []
+    totals = {
+        "revenue": Decimal('0'), "expense": Decimal('0'), "vat_due": Decimal('0'), "vat_deductible": Decimal('0'),
+        "transactions": 0, "other_currency_transactions": 0
+    }
+    for r in rows:
+        entry = {
+            "business_id": r.id,
+            "name": r.name,
+            "tax_id": r.tax_id,
+            "country": r.country,
+            "role": r.role,
+            "revenue": Decimal(str(r.revenue)),
+            "expense": Decimal(str(r.expense)),
+            "vat_due": Decimal(str(r.vat_due)),
+            "vat_deductible": Decimal(str(r.vat_deductible)),
+            "transactions": r.transactions,
+            "other_currency_transactions": r.other_currency_transactions,
+        }
+        entry["profit"] = entry["revenue"] - entry["expense"]
+        businesses.append(entry)
+        for key in totals:
+            totals[key] += entry[key]
+    totals["profit"] = totals["revenue"] - totals["expense"]
+
+    return {
+        "start_date": start_date, "end_date": end_date, "currency": currency.upper(),
+        "businesses": businesses, "totals": totals
+    }
+
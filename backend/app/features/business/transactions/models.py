@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP, text, CheckConstraint, Numeric, Boolean, Date, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP, text, CheckConstraint, Numeric, Boolean, Date, Text, Index
 from sqlalchemy.orm import relationship
 from core.db import Base
+from core.search import search_document, search_indexes
 
 class BusinessTransaction(Base):
     __tablename__ = "business_transactions"
@@ -32,6 +33,28 @@ class BusinessTransaction(Base):
 
     __table_args__ = (
         CheckConstraint("type IN ('income', 'expense')", name='business_tx_type_check'),
+        # Keyset pagination indexes (see service.get_transactions_page)
+        Index("ix_business_transactions_business_date_id", "business_id", "date", "id", postgresql_where=text("deleted_at IS NULL")),
+        Index("ix_business_transactions_business_created_at_id", "business_id", "created_at", "id", postgresql_where=text("deleted_at IS NULL")),
+        # Text search (see service.search_transactions)
+        *search_indexes(
+            "ix_business_transactions_search",
+            search_document(description, counterparty_name),
+            text("deleted_at IS NULL"),
+        ),
     )
 
     category = relationship("BusinessTransactionCategory")
+
+
+class BusinessMonthlyRollup(Base):
+    """Running net totals per (business, month, type, category, currency), maintained by rollup_service."""
+    __tablename__ = "business_monthly_rollups"
+
+    business_id = Column(Integer, ForeignKey("business.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    month_start = Column(Date, primary_key=True)
+    type = Column(String(10), primary_key=True)
+    category_id = Column(Integer, primary_key=True, autoincrement=False)  # 0 = uncategorised
+    currency = Column(String(3), primary_key=True, default='EUR')  # amounts in different currencies are never added
+    net_total = Column(Numeric(14, 2), nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
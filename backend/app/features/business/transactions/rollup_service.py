@@ -0,0 +1,117 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import delete, extract, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from features.business.transactions.models import BusinessTransaction, BusinessMonthlyRollup
+from features.transactions.rollup_service import month_start
+
+NO_CATEGORY = 0
+
+
+class BusinessRollupService:
+    @staticmethod
+    def record(db: Session, transactions, sign: int = 1):
+        """
+        Adds (sign=1) or removes (sign=-1) business transactions from the monthly
+        rollup. Must be called before the caller commits so the rollup changes in
+        the same DB transaction.
+        """
+        transactions = list(transactions)
+        if not transactions:
+            return
+
+        deltas = defaultdict(lambda: [Decimal("0"), 0])
+        for tx in transactions:
+            key = (tx.business_id, month_start(tx.date), tx.type, tx.category_id or NO_CATEGORY, tx.currency.upper())
+            deltas[key][0] += Decimal(str(tx.net_amount)) * sign
+            deltas[key][1] += sign
+
+        BusinessRollupService._upsert(db, deltas)
+
+    @staticmethod
+    def _upsert(db: Session, deltas: dict):
+        rows = [
+            {
+                "business_id": business_id,
+                "month_start": month,
+                "type": tx_type,
+                "category_id": category_id,
+                "currency": currency,
+                "net_total": total,
+                "count": count,
+            }
+            for (business_id, month, tx_type, category_id, currency), (total, count) in deltas.items()
+        ]
+
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert(BusinessMonthlyRollup)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[c.name for c in BusinessMonthlyRollup.__table__.primary_key],
+                set_={
+                    "net_total": BusinessMonthlyRollup.net_total + stmt.excluded.net_total,
+                    "count": BusinessMonthlyRollup.count + stmt.excluded.count,
+                }
+            )
+            db.execute(stmt, rows)
+            return
+
+        # Generic fallback: one lookup per touched rollup row
+        for row in rows:
+            key = {k: row[k] for k in row if k not in ("net_total", "count")}
+            existing = db.get(BusinessMonthlyRollup, tuple(key.values()))
+            if existing:
+                existing.net_total += row["net_total"]
+                existing.count += row["count"]
+            else:
+                db.add(BusinessMonthlyRollup(**row))
+        db.flush()
+
+    @staticmethod
+    def rebuild(db: Session, business_id: int = None):
+        """Recomputes the rollup from the business_transactions table (all businesses, or just one)."""
+        clear = delete(BusinessMonthlyRollup)
+        if business_id is not None:
+            clear = clear.where(BusinessMonthlyRollup.business_id == business_id)
+        db.execute(clear)
+
+        # Row-level values first, so the GROUP BY only sees plain columns
+        source = db.query(
+            BusinessTransaction.business_id,
+            extract("year", BusinessTransaction.date).label("year"),
+            extract("month", BusinessTransaction.date).label("month"),
+            BusinessTransaction.type,
+            func.coalesce(BusinessTransaction.category_id, NO_CATEGORY).label("category_id"),
+            func.upper(BusinessTransaction.currency).label("currency"),
+            BusinessTransaction.net_amount,
+        ).filter(BusinessTransaction.deleted_at.is_(None))
+        if business_id is not None:
+            source = source.filter(BusinessTransaction.business_id == business_id)
+        source = source.subquery()
+
+        dimensions = [source.c.business_id, source.c.year, source.c.month, source.c.type, source.c.category_id, source.c.currency]
+        query = db.query(
+            *dimensions,
+            func.sum(source.c.net_amount).label("net_total"),
+            func.count().label("count"),
+        ).group_by(*dimensions)
+
+        rows = [
+            {
+                "business_id": r.business_id,
+                "month_start": date(int(r.year), int(r.month), 1),
+                "type": r.type,
+                "category_id": r.category_id,
+                "currency": r.currency,
+                "net_total": r.net_total,
+                "count": r.count,
+            }
+            for r in query
+        ]
+        if rows:
+            db.execute(BusinessMonthlyRollup.__table__.insert(), rows)
+        db.commit()
+        return len(rows)
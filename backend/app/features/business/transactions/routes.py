@@ -1,38 +1,86 @@
-from fastapi import APIRouter, Depends, status
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from core.db import get_db
 from features.business.transactions import service, schemas
-from features.users.models import User
-from features.auth.service import get_current_user
-from features.business.members.service import check_member_role
+from features.auth.service import Principal, get_current_user
+from features.business.members.service import require_member_role
 
 router = APIRouter()
 
+def transaction_filters(
+    start_date: date = Query(None),
+    end_date: date = Query(None),
+    type: str = Query(None, enum=["income", "expense"]),
+    category_id: int = Query(None),
+    counterparty: str = Query(None, max_length=100),
+    payment_method: str = Query(None),
+    currency: str = Query(None, min_length=3, max_length=3),
+) -> schemas.BusinessTransactionFilters:
+    return schemas.BusinessTransactionFilters(
+        start_date=start_date,
+        end_date=end_date,
+        type=type,
+        category_id=category_id,
+        counterparty=counterparty,
+        payment_method=payment_method,
+        currency=currency,
+    )
+
 @router.get("/", response_model=list[schemas.BusinessTransactionResponse])
 def list_transactions(
     business_id: int,
+    filters: schemas.BusinessTransactionFilters = Depends(transaction_filters),
+    role: str = Depends(require_member_role(['owner', 'admin', 'member', 'viewer'])),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    return service.get_transactions(db, business_id, filters)
+
+@router.get("/page", response_model=schemas.BusinessTransactionPage)
+def list_transactions_page(
+    business_id: int,
+    sort_by: str = Query("date", enum=["date", "created_at"]),
+    limit: int = Query(50, ge=1, le=service.MAX_PAGE_SIZE),
+    cursor: str = Query(None),
+    filters: schemas.BusinessTransactionFilters = Depends(transaction_filters),
+    role: str = Depends(require_member_role(['owner', 'admin', 'member', 'viewer'])),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    try:
+        return service.get_transactions_page(db, business_id, sort_by, filters, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/search", response_model=list[schemas.BusinessTransactionSearchHit])
+def search_transactions(
+    business_id: int,
+    q: str = Query(..., min_length=2, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    role: str = Depends(require_member_role(['owner', 'admin', 'member', 'viewer'])),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    check_member_role(db, business_id, current_user.id, ['owner', 'admin', 'member', 'viewer'])
-    return service.get_transactions(db, business_id)
+    return service.search_transactions(db, business_id, q, skip, limit)
 
 @router.post("/", response_model=schemas.BusinessTransactionResponse, status_code=status.HTTP_201_CREATED)
 def create_transaction(
     business_id: int,
     transaction: schemas.BusinessTransactionCreate,
+    role: str = Depends(require_member_role(['owner', 'admin', 'member'])),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    check_member_role(db, business_id, current_user.id, ['owner', 'admin', 'member'])
     return service.create_transaction(db, business_id, transaction, current_user.id)
 
 @router.delete("/{transaction_id}", response_model=schemas.BusinessTransactionResponse)
 def delete_transaction(
     business_id: int,
     transaction_id: int,
+    role: str = Depends(require_member_role(['owner', 'admin', 'member'])),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    check_member_role(db, business_id, current_user.id, ['owner', 'admin', 'member'])
-    return service.delete_transaction(db, transaction_id, business_id, current_user.id)
+    return service.delete_transaction(db, transaction_id, business_id, current_user.id, role)
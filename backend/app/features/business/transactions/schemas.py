@@ -34,3 +34,19 @@ class BusinessTransactionResponse(BusinessTransactionBase):
 
     class Config:
         from_attributes = True
+
+class BusinessTransactionSearchHit(BusinessTransactionResponse):
+    rank: float
+
+class BusinessTransactionPage(BaseModel):
+    items: list[BusinessTransactionResponse]
+    next_cursor: Optional[str] = None
+
+class BusinessTransactionFilters(BaseModel):
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    type: Optional[str] = None
+    category_id: Optional[int] = None
+    counterparty: Optional[str] = None  # tax id, or part of the name
+    payment_method: Optional[str] = None
+    currency: Optional[str] = None
@@ -1,15 +1,89 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, tuple_
+from sqlalchemy.orm import Session, joinedload
+from core.search import match_and_rank, search_document
 from features.business.transactions import models, schemas
-from features.business.members.service import check_member_role
+from features.business.transactions.rollup_service import BusinessRollupService
+from features.transactions.service import MAX_PAGE_SIZE, decode_cursor, encode_cursor
 from fastapi import HTTPException, status
 from typing import Optional
 from datetime import datetime
 
-def get_transactions(db: Session, business_id: int):
-    return db.query(models.BusinessTransaction).filter(
-        models.BusinessTransaction.business_id == business_id
+def apply_filters(query, filters: Optional[schemas.BusinessTransactionFilters]):
+    """Applies the optional list filters to a BusinessTransaction query."""
+    Tx = models.BusinessTransaction
+    if filters is None:
+        return query
+    if filters.start_date:
+        query = query.filter(Tx.date >= filters.start_date)
+    if filters.end_date:
+        query = query.filter(Tx.date <= filters.end_date)
+    if filters.type:
+        query = query.filter(Tx.type == filters.type)
+    if filters.category_id:
+        query = query.filter(Tx.category_id == filters.category_id)
+    if filters.counterparty:
+        query = query.filter(or_(
+            Tx.counterparty_tax_id == filters.counterparty,
+            Tx.counterparty_name.icontains(filters.counterparty, autoescape=True)
+        ))
+    if filters.payment_method:
+        query = query.filter(Tx.payment_method == filters.payment_method)
+    if filters.currency:
+        query = query.filter(Tx.currency == filters.currency.upper())
+    return query
+
+def _list_query(db: Session, business_id: int, filters: Optional[schemas.BusinessTransactionFilters]):
+    query = db.query(models.BusinessTransaction).options(joinedload(models.BusinessTransaction.category)).filter(
+        models.BusinessTransaction.business_id == business_id,
+        models.BusinessTransaction.deleted_at == None
+    )
+    return apply_filters(query, filters)
+
+def get_transactions(db: Session, business_id: int, filters: Optional[schemas.BusinessTransactionFilters] = None):
+    return _list_query(db, business_id, filters).order_by(
+        models.BusinessTransaction.date.desc(), models.BusinessTransaction.id.desc()
     ).all()
 
+def get_transactions_page(
+    db: Session,
+    business_id: int,
+    sort_by: str = "date",
+    filters: Optional[schemas.BusinessTransactionFilters] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+):
+    """Keyset pagination on (date, id) or (created_at, id), like the personal transactions page."""
+    Tx = models.BusinessTransaction
+    sort_column = Tx.created_at if sort_by == "created_at" else Tx.date
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    query = _list_query(db, business_id, filters)
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_by)
+        query = query.filter(tuple_(sort_column, Tx.id) < tuple_(value, last_id))
+
+    # Fetch one extra row to know whether there is a next page
+    rows = query.order_by(sort_column.desc(), Tx.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort_by, rows[-1])
+
+    return {"items": rows, "next_cursor": next_cursor}
+
+def search_transactions(db: Session, business_id: int, q: str, skip: int = 0, limit: int = 50):
+    Tx = models.BusinessTransaction
+    condition, rank = match_and_rank(db, search_document(Tx.description, Tx.counterparty_name), q)
+    rows = db.query(Tx, rank.label("rank")).options(joinedload(Tx.category)).filter(
+        Tx.business_id == business_id,
+        Tx.deleted_at == None,
+        condition
+    ).order_by(rank.desc(), Tx.id.desc()).offset(skip).limit(limit).all()
+    for transaction, score in rows:
+        transaction.rank = float(score)
+    return [transaction for transaction, _ in rows]
+
 def create_transaction(db: Session, business_id: int, transaction: schemas.BusinessTransactionCreate, user_id: int):
     new_tx = models.BusinessTransaction(
         business_id=business_id,
@@ -17,11 +91,12 @@ def create_transaction(db: Session, business_id: int, transaction: schemas.Busin
         **transaction.model_dump()
     )
     db.add(new_tx)
+    BusinessRollupService.record(db, [new_tx])
     db.commit()
     db.refresh(new_tx)
     return new_tx
 
-def delete_transaction(db: Session, transaction_id: int, business_id: int, user_id: int):
+def delete_transaction(db: Session, transaction_id: int, business_id: int, user_id: int, role: str):
     transaction = db.query(models.BusinessTransaction).filter(
         models.BusinessTransaction.id == transaction_id,
         models.BusinessTransaction.business_id == business_id,
@@ -32,10 +107,14 @@ def delete_transaction(db: Session, transaction_id: int, business_id: int, user_
 
     # Permission check:
     # Allow deletion if user is the creator OR if user is owner/admin
-    if transaction.user_id != user_id:
-        # If not the creator, must be owner or admin
-        check_member_role(db, business_id, user_id, ['owner', 'admin'])
+    # (role is the caller's role, already resolved by the route)
+    if transaction.user_id != user_id and role not in ['owner', 'admin']:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to perform this action."
+        )
 
     transaction.deleted_at = datetime.now()
+    BusinessRollupService.record(db, [transaction], sign=-1)
     db.commit()
     return transaction
\ No newline at end of file
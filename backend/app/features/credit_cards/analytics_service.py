@@ -1,17 +1,117 @@
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, and_, case, or_
+from sqlalchemy import and_, case, func, or_, select
 from datetime import date, timedelta
 from features.transactions.models import Transaction
-from features.loans.models import Loan
 from features.credit_cards.models import CreditCard
-from features.categories.models import Category
+from features.transactions.kinds import CARD_PURCHASE, CARD_REPAYMENT_KINDS
 from decimal import Decimal
+from core import buckets
 
 class CreditCardsAnalyticsService:
+    """
+    The report is built from two independent queries (cards with their stored
+    current balance, spending/repayment evolution). get_analytics runs them one after the other
+    on a session; get_analytics_concurrent runs them at the same time, each on
+    its own pooled connection, so the latency is close to the slowest one. The
+    caller must not hold a connection of the same engine while it awaits them.
+    """
+
+    @staticmethod
+    def _evolution_window(today: date, granularity: str, start_date: date = None, end_date: date = None):
+        # Default: last 12 whole months, from the start of the month one year ago
+        # to the end of the current month (both halves of it, for fortnights)
+        end_date = end_date or buckets.next_bucket(today.replace(day=1), buckets.MONTH) - timedelta(days=1)
+        if start_date is None:
+            try:
+                start_date = end_date.replace(year=end_date.year - 1, day=1)
+            except ValueError:
+                start_date = date(end_date.year - 1, end_date.month, 1)
+        if start_date > end_date:
+            raise ValueError("start_date must not be after end_date")
+        if granularity not in buckets.GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        buckets.bucket_starts(start_date, end_date, granularity)  # raises if the range has too many buckets
+        return start_date, end_date
+
+    @staticmethod
+    def _evolution_query(user_id: int, start_date: date, end_date: date, granularity: str, dialect: str):
+        """Spending (card purchases) and repayments per bucket, in one pass over the transactions."""
+        is_spending = and_(Transaction.type == 'expense', Transaction.kind == CARD_PURCHASE)
+        is_repayment = Transaction.kind.in_(CARD_REPAYMENT_KINDS)
+
+        # Row-level values first, so the GROUP BY only sees plain columns
+        source = select(
+            buckets.bucket_expression(Transaction.date, granularity, dialect).label('bucket'),
+            case((is_spending, Transaction.amount), else_=0).label('spending'),
+            case((is_repayment, Transaction.amount), else_=0).label('repayment'),
+        ).where(
+            Transaction.user_id == user_id,
+            Transaction.date >= start_date,
+            Transaction.date <= end_date,
+            Transaction.deleted_at.is_(None),
+            or_(is_spending, is_repayment)
+        ).subquery()
+
+        totals = select(
+            source.c.bucket,
+            func.sum(source.c.spending).label('spending'),
+            func.sum(source.c.repayment).label('repayment')
+        ).group_by(source.c.bucket)
+
+        if dialect != 'postgresql':
+            return totals.order_by(source.c.bucket)
+
+        # Every bucket of the range, the empty ones as 0
+        series = buckets.series(start_date, end_date, granularity).subquery()
+        totals = totals.subquery()
+        return select(
+            series.c.bucket,
+            func.coalesce(totals.c.spending, 0).label('spending'),
+            func.coalesce(totals.c.repayment, 0).label('repayment')
+        ).select_from(series.outerjoin(totals, totals.c.bucket == series.c.bucket)).order_by(series.c.bucket)
+
+    @staticmethod
+    def _queries(user_id: int, start_date: date, end_date: date, granularity: str, dialect: str):
+        cards = select(
+            CreditCard.id, CreditCard.credit_card_limit, CreditCard.interest_rate, CreditCard.current_balance
+        ).where(CreditCard.user_id == user_id)
+
+        evolution = CreditCardsAnalyticsService._evolution_query(user_id, start_date, end_date, granularity, dialect)
+        return cards, evolution
+
+    @staticmethod
+    def get_analytics(
+        db: Session, user_id: int,
+        granularity: str = buckets.FORTNIGHT, start_date: date = None, end_date: date = None
+    ):
+        start_date, end_date = CreditCardsAnalyticsService._evolution_window(date.today(), granularity, start_date, end_date)
+        dialect = db.get_bind().dialect.name
+        queries = CreditCardsAnalyticsService._queries(user_id, start_date, end_date, granularity, dialect)
+        results = [db.execute(query).all() for query in queries]
+        return CreditCardsAnalyticsService._build(*results, start_date, end_date, granularity, dialect)
+
+    @staticmethod
+    async def get_analytics_concurrent(
+        engine: AsyncEngine, user_id: int,
+        granularity: str = buckets.FORTNIGHT, start_date: date = None, end_date: date = None
+    ):
+        start_date, end_date = CreditCardsAnalyticsService._evolution_window(date.today(), granularity, start_date, end_date)
+        dialect = engine.dialect.name
+
+        async def fetch(query):
+            async with engine.connect() as conn:
+                return (await conn.execute(query)).all()
+
+        results = await asyncio.gather(
+            *(fetch(query) for query in CreditCardsAnalyticsService._queries(user_id, start_date, end_date, granularity, dialect))
+        )
+        return CreditCardsAnalyticsService._build(*results, start_date, end_date, granularity, dialect)
+
     @staticmethod
-    def get_analytics(db: Session, user_id: int):
+    def _build(cards, evolution_rows, start_date: date, end_date: date, granularity: str, dialect: str):
         # 1. credit Cards Data (Limits & Interest Rates)
-        cards = db.query(CreditCard).filter(CreditCard.user_id == user_id).all()
         if not cards:
              return {
                 "utilization": {"used": 0, "available": 0, "total_limit": 0},
@@ -20,20 +120,15 @@ class CreditCardsAnalyticsService:
                 "evolution": []
             }
 
-        card_ids = [c.id for c in cards]
         total_limit = sum(c.credit_card_limit for c in cards)
 
         # 2. Current Debt (Utilization)
-        # Sum of principals of all active loans linked to these cards
-        total_debt = db.query(func.sum(Loan.principal)).filter(
-            Loan.user_id == user_id,
-            Loan.used_credit_card.in_(card_ids),
-            Loan.deleted_at.is_(None)
-        ).scalar() or Decimal(0)
+        debt_per_card = {card.id: card.current_balance for card in cards}
+        total_debt = sum(debt_per_card.values(), Decimal(0))
 
         # Ensure we don't have negative available credit visually
         available_credit = total_limit - total_debt
-        
+
         utilization_data = {
             "used": float(total_debt),
             "available": float(available_credit),
@@ -43,19 +138,6 @@ class CreditCardsAnalyticsService:
         # 3. Interest Rate Utilization (Radial Bar)
         # Group cards by interest rate
         results_by_rate = []
-        # Get debt per card first to make it easier
-        debt_per_card = {}
-        loans_per_card = db.query(
-            Loan.used_credit_card, 
-            func.sum(Loan.principal).label('total')
-        ).filter(
-             Loan.user_id == user_id,
-             Loan.used_credit_card.in_(card_ids),
-             Loan.deleted_at.is_(None)
-        ).group_by(Loan.used_credit_card).all()
-
-        for card_id, debt in loans_per_card:
-            debt_per_card[card_id] = debt
 
         # Group logic in python to be simpler with small number of cards
         rate_groups = {}
@@ -63,7 +145,7 @@ class CreditCardsAnalyticsService:
             rate = float(card.interest_rate or 0)
             if rate not in rate_groups:
                 rate_groups[rate] = {"limit": 0, "used": 0}
-            
+
             rate_groups[rate]["limit"] += float(card.credit_card_limit)
             rate_groups[rate]["used"] += float(debt_per_card.get(card.id, 0))
 
@@ -75,117 +157,26 @@ class CreditCardsAnalyticsService:
                 "limit": data["limit"],
                 "percentage": round(percent, 2)
             })
-        
+
         # Sort by interest rate ascending (inner to outer rings usually)
         results_by_rate.sort(key=lambda x: x["interest_rate"])
 
-        # 4. Evolution (Line Chart - Bi-weekly)
-        # Last 12 months
-        today = date.today()
-        # Start of month 12 months ago
-        # Logic: Subtract 1 year, set to day 1
-        try:
-             start_date = today.replace(year=today.year - 1, day=1)
-        except ValueError:
-             # Handle leap year edge case if today was Feb 29 (though we set day=1 so it's safe)
-             start_date = date(today.year - 1, today.month, 1)
-             
-        end_date = today
-
-        # 4a. Spending (Expenses via Credit Card)
-        spending_query = db.query(
-            extract('year', Transaction.date).label('year'),
-            extract('month', Transaction.date).label('month'),
-            case(
-                (extract('day', Transaction.date) <= 15, 1),
-                else_=2
-            ).label('period_part'),
-            func.sum(Transaction.amount).label('total')
-        ).filter(
-            Transaction.user_id == user_id,
-            Transaction.date >= start_date,
-            Transaction.date <= end_date,
-            Transaction.type == 'expense',
-            Transaction.deleted_at.is_(None),
-            Transaction.payment_method.in_(['Cartão de crédito', 'credit_card', 'Credit Card'])
-        ).group_by(
-            extract('year', Transaction.date),
-            extract('month', Transaction.date),
-            'period_part'
-        ).all()
-
-        # 4b. Repayments (Income/Transfers used to pay CC)
-        # Assuming repayment logic: Description like 'Pagamento de Cartão%' AND Category 'Pagamento de dívidas'
-        # Or Transaction type 'expense' but category 'Pagamento de dívidas'?
-        # Let's check existing logic in TransactionsAnalytics:
-        # exclude_card_repayment uses: Transaction.description.ilike('Pagamento de Cartão de Crédito%') AND Category.name == 'Pagamento de dívidas'
-        
-        repayment_query = db.query(
-            extract('year', Transaction.date).label('year'),
-            extract('month', Transaction.date).label('month'),
-            case(
-                (extract('day', Transaction.date) <= 15, 1),
-                else_=2
-            ).label('period_part'),
-            func.sum(Transaction.amount).label('total')
-        ).join(Transaction.category)\
-        .filter(
-            Transaction.user_id == user_id,
-            Transaction.date >= start_date,
-            Transaction.date <= end_date,
-            Transaction.deleted_at.is_(None),
-            and_(
-                Transaction.description.ilike('Pagamento de Cartão de Crédito%'),
-                Category.name == 'Pagamento de dívidas'
-            )
-        ).group_by(
-            extract('year', Transaction.date),
-            extract('month', Transaction.date),
-            'period_part'
-        ).all()
-
-        # Map results
-        spending_map = {}
-        for r in spending_query:
-            key = (int(r.year), int(r.month), int(r.period_part))
-            spending_map[key] = float(r.total)
-
-        repayment_map = {}
-        for r in repayment_query:
-            key = (int(r.year), int(r.month), int(r.period_part))
-            repayment_map[key] = float(r.total)
-
-        # Generate timeline
-        evolution_data = []
-        current = start_date
-        while current <= end_date:
-            year = current.year
-            month = current.month
-            
-            # Period 1 (1-15)
-            key1 = (year, month, 1)
-            evolution_data.append({
-                "period_label": f"{month}/{str(year)[2:]} (1ª Q)",
-                "raw_date": f"{year}-{month:02d}-01",
-                "spending": spending_map.get(key1, 0),
-                "repayment": repayment_map.get(key1, 0)
-            })
+        # 4. Evolution (Line Chart), one point per bucket
+        if dialect != 'postgresql':
+            evolution_rows = buckets.fill_gaps(evolution_rows, start_date, end_date, granularity, 'spending', 'repayment')
+        else:
+            evolution_rows = [row._mapping for row in evolution_rows]
 
-            # Period 2 (16-End)
-            key2 = (year, month, 2)
+        evolution_data = []
+        for row in evolution_rows:
+            bucket = buckets.as_date(row["bucket"])
             evolution_data.append({
-                "period_label": f"{month}/{str(year)[2:]} (2ª Q)",
-                "raw_date": f"{year}-{month:02d}-16",
-                "spending": spending_map.get(key2, 0),
-                "repayment": repayment_map.get(key2, 0)
+                "period_label": buckets.label(bucket, granularity),
+                "raw_date": bucket.isoformat(),
+                "spending": float(row["spending"]),
+                "repayment": float(row["repayment"])
             })
 
-            # Move to next month
-            if current.month == 12:
-                current = current.replace(year=current.year + 1, month=1)
-            else:
-                current = current.replace(month=current.month + 1)
-
         return {
             "utilization": utilization_data,
             "interest_rates_utilization": results_by_rate,
@@ -0,0 +1,100 @@
+"""
+Current debt of credit cards: the sum of the principals of the active loans
+the card's owner charged to it.
+
+It is stored in credit_cards.current_balance, so reading it is a lookup by
+card. Every service that creates, deletes, re-assigns or changes the principal
+of a loan charged to a card calls adjust_balances() before committing, which
+applies the change as `current_balance = current_balance + delta`, atomically
+and in the same DB transaction. check_balances() / repair_balances() compare
+the column with the loans (backend/repair_card_balances.py).
+"""
+from collections import defaultdict
+from decimal import Decimal
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+from features.credit_cards.models import CreditCard
+from features.loans.models import Loan
+
+CENTS = Decimal("0.01")
+
+
+def card_balances(db: Session, user_id: int) -> list[tuple[CreditCard, Decimal]]:
+    """Every card of the user with its current debt, in one query."""
+    cards = db.query(CreditCard).filter(CreditCard.user_id == user_id).order_by(CreditCard.id).all()
+    return [(card, Decimal(str(card.current_balance))) for card in cards]
+
+
+def card_balance(db: Session, credit_card_id: int, user_id: int) -> Decimal:
+    balance = db.scalar(
+        select(CreditCard.current_balance).where(CreditCard.id == credit_card_id, CreditCard.user_id == user_id)
+    )
+    return Decimal(str(balance or 0))
+
+
+def loan_deltas(loans, sign: int = 1) -> dict:
+    """Balance changes of adding (sign=1) or removing (sign=-1) these loans; accepts rows with used_credit_card and principal."""
+    deltas = defaultdict(Decimal)
+    for loan in loans:
+        if loan.used_credit_card is not None:
+            deltas[loan.used_credit_card] += Decimal(str(loan.principal)) * sign
+    return deltas
+
+
+def adjust_balances(db: Session, deltas: dict, user_id: int):
+    """Adds each card's delta to its current_balance (one executemany UPDATE); cards of other users are left alone. Call before committing."""
+    rows = [
+        {"card_id": card_id, "delta": Decimal(str(delta)).quantize(CENTS)}
+        for card_id, delta in deltas.items() if card_id is not None and delta
+    ]
+    if not rows:
+        return
+    cards = CreditCard.__table__
+    db.execute(
+        update(cards)
+        .where(cards.c.id == bindparam("card_id"), cards.c.user_id == user_id)
+        .values(current_balance=cards.c.current_balance + bindparam("delta")),
+        rows
+    )
+
+
+def adjust_balance(db: Session, credit_card_id: int | None, delta, user_id: int):
+    adjust_balances(db, {credit_card_id: delta}, user_id)
+
+
+def _actual_balance():
+    return func.coalesce(
+        select(func.sum(Loan.principal)).where(
+            Loan.used_credit_card == CreditCard.id,
+            Loan.user_id == CreditCard.user_id,
+            Loan.deleted_at.is_(None)
+        ).scalar_subquery(),
+        0
+    )
+
+
+def check_balances(db: Session, user_id: int = None) -> list[dict]:
+    """Cards whose stored balance differs from the sum of their active loans."""
+    actual = _actual_balance()
+    query = select(CreditCard.id, CreditCard.user_id, CreditCard.current_balance, actual.label("actual"))
+    if user_id is not None:
+        query = query.where(CreditCard.user_id == user_id)
+    return [
+        {"card_id": r.id, "user_id": r.user_id, "stored": Decimal(str(r.current_balance)), "actual": Decimal(str(r.actual))}
+        for r in db.execute(query)
+        if Decimal(str(r.current_balance)) != Decimal(str(r.actual))
+    ]
+
+
+def repair_balances(db: Session, user_id: int = None) -> list[dict]:
+    """Recomputes the balance of the drifted cards from their loans and commits; returns what was fixed."""
+    drifted = check_balances(db, user_id)
+    if drifted:
+        db.execute(
+            update(CreditCard)
+            .where(CreditCard.id.in_([d["card_id"] for d in drifted]))
+            .values(current_balance=_actual_balance())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    return drifted
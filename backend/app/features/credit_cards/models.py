@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Numeric, String, TIMESTAMP, ForeignKey, func
+from sqlalchemy import Column, Integer, Numeric, String, TIMESTAMP, ForeignKey, func, text
 from sqlalchemy.orm import relationship
 from core.db import Base
 
@@ -10,6 +10,9 @@ class CreditCard(Base):
     name = Column(String(100), nullable=False)
     credit_card_limit = Column(Numeric(10, 2), nullable=False)
     interest_rate = Column(Numeric(5, 2))
+    # Sum of the principals of the card's active loans, maintained by the loan
+    # write services (features/credit_cards/balances.py)
+    current_balance = Column(Numeric(12, 2), nullable=False, default=0, server_default=text("0"))
     created_at = Column(TIMESTAMP, server_default=func.now())
 
     loans = relationship("Loan", back_populates="credit_card")
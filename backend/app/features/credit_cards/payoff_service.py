@@ -0,0 +1,208 @@
+import numpy as np
+from datetime import date
+from sqlalchemy.orm import Session
+from core import buckets
+from features.credit_cards.models import CreditCard
+from features.loans.models import Loan
+
+AVALANCHE = "avalanche"  # highest interest rate first
+SNOWBALL = "snowball"    # smallest balance first
+CUSTOM = "custom"        # the order given by the user
+STRATEGIES = (AVALANCHE, SNOWBALL, CUSTOM)
+
+MAX_MONTHS = 600
+PAID_OFF = 0.005  # balances below half a cent count as paid
+
+
+class PayoffSimulationService:
+    """
+    Month-by-month payoff of every debt of the user (cards with a balance and
+    loans not charged to a card) with a fixed monthly budget. Each month the
+    debts accrue interest, the minimum payments (a share of the balance) are
+    paid, and what is left of the budget goes to the debts in the order of the
+    strategy; paid-off debts free their share for the next one.
+
+    All the strategies are simulated together: balances are a strategies x debts
+    array updated once per month, so the cost grows with the months, not with
+    the number of debts or strategies.
+    """
+
+    @staticmethod
+    def _debts(db: Session, user_id: int) -> list[dict]:
+        cards = db.query(CreditCard).filter(
+            CreditCard.user_id == user_id, CreditCard.current_balance > 0
+        ).order_by(CreditCard.id).all()
+        loans = db.query(Loan).filter(
+            Loan.user_id == user_id,
+            Loan.used_credit_card.is_(None),  # card loans are part of the card's balance
+            Loan.deleted_at.is_(None),
+            Loan.principal > 0
+        ).order_by(Loan.id).all()
+
+        return [
+            {"key": f"card:{c.id}", "type": "credit_card", "id": c.id, "name": c.name,
+             "balance": float(c.current_balance), "interest_rate": float(c.interest_rate or 0)}
+            for c in cards
+        ] + [
+            {"key": f"loan:{l.id}", "type": "loan", "id": l.id, "name": l.name,
+             "balance": float(l.principal), "interest_rate": float(l.interest_rate or 0)}
+            for l in loans
+        ]
+
+    @staticmethod
+    def _without_balance(db: Session, user_id: int, keys: list[str]) -> set[str]:
+        """The keys of an order that name the user's own cards / loans with nothing to pay (not simulated)."""
+        ids = {"card": set(), "loan": set()}
+        for key in keys:
+            kind, _, debt_id = key.partition(":")
+            if kind in ids and debt_id.isdigit():
+                ids[kind].add(int(debt_id))
+        cards = db.query(CreditCard.id).filter(
+            CreditCard.user_id == user_id, CreditCard.id.in_(ids["card"])
+        ).all()
+        loans = db.query(Loan.id).filter(
+            Loan.user_id == user_id, Loan.deleted_at.is_(None), Loan.id.in_(ids["loan"])
+        ).all()
+        return {f"card:{c.id}" for c in cards} | {f"loan:{l.id}" for l in loans}
+
+    @staticmethod
+    def _order(debts: list[dict], strategy: str, custom_order: list[str] = None) -> list[int]:
+        """Indexes of the debts in the order they receive the extra payments."""
+        positions = range(len(debts))
+        avalanche = sorted(positions, key=lambda i: (-debts[i]["interest_rate"], debts[i]["balance"]))
+        if strategy == AVALANCHE:
+            return avalanche
+        if strategy == SNOWBALL:
+            return sorted(positions, key=lambda i: (debts[i]["balance"], -debts[i]["interest_rate"]))
+
+        index = {debt["key"]: i for i, debt in enumerate(debts)}
+        unknown = [key for key in custom_order or [] if key not in index]
+        if unknown:
+            raise ValueError(f"Unknown debts in order: {', '.join(unknown)}")
+        first = list(dict.fromkeys(index[key] for key in custom_order or []))
+        # Debts left out of the custom order follow it, highest rate first
+        return first + [i for i in avalanche if i not in first]
+
+    @staticmethod
+    def simulate(balances, annual_rates, orders, budget: float, months: int, minimum_payment_pct: float = 0):
+        """
+        balances, annual_rates: (debts,); orders: (strategies, debts) payment priorities.
+        Returns the payment, interest and end-of-month balance arrays, each
+        (strategies, months run, debts); the run stops once every strategy has paid everything.
+        """
+        orders = np.asarray(orders, dtype=np.intp)
+        balance = np.tile(np.asarray(balances, dtype=float), (orders.shape[0], 1))
+        monthly_rate = np.asarray(annual_rates, dtype=float) / 100 / 12
+        shape = (orders.shape[0], months, balance.shape[1])
+        payments, interest, remaining = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+
+        months_run = months
+        for month in range(months):
+            if not balance.any():
+                months_run = month
+                break
+            accrued = balance * monthly_rate
+            balance = balance + accrued
+
+            # Minimum payments, scaled down when they do not fit in the budget
+            minimum = balance * (minimum_payment_pct / 100)
+            minimum_total = minimum.sum(axis=1, keepdims=True)
+            minimum *= np.minimum(1, np.divide(budget, minimum_total, out=np.ones_like(minimum_total), where=minimum_total > 0))
+            balance = balance - minimum
+            extra = budget - minimum.sum(axis=1, keepdims=True)
+
+            # The rest in priority order: each debt gets what the ones before it left
+            ordered = np.take_along_axis(balance, orders, axis=1)
+            before = np.cumsum(ordered, axis=1) - ordered
+            extra_ordered = np.clip(extra - before, 0, ordered)
+            extra_paid = np.empty_like(balance)
+            np.put_along_axis(extra_paid, orders, extra_ordered, axis=1)
+
+            balance = balance - extra_paid
+            balance[balance < PAID_OFF] = 0
+            payments[:, month] = minimum + extra_paid
+            interest[:, month] = accrued
+            remaining[:, month] = balance
+
+        return payments[:, :months_run], interest[:, :months_run], remaining[:, :months_run]
+
+    @staticmethod
+    def get_simulation(
+        db: Session, user_id: int, budget: float, strategies: list[str],
+        order: list[str] = None, months: int = 360, minimum_payment_pct: float = 0, today: date = None
+    ):
+        unknown = [s for s in strategies if s not in STRATEGIES]
+        if unknown:
+            raise ValueError(f"Unknown strategies: {', '.join(unknown)}")
+        if CUSTOM in strategies and not order:
+            raise ValueError("The custom strategy needs an order of debts")
+        strategies = list(dict.fromkeys(strategies))
+
+        debts = PayoffSimulationService._debts(db, user_id)
+        if order:
+            # Paid-off cards and loans (or loans charged to a card) may be named; they are skipped
+            simulated = {debt["key"] for debt in debts}
+            missing = [key for key in order if key not in simulated]
+            if missing:
+                owned = PayoffSimulationService._without_balance(db, user_id, missing)
+                order = [key for key in order if key in simulated or key not in owned]
+        orders = [PayoffSimulationService._order(debts, strategy, order) for strategy in strategies]
+        if not debts:
+            return {"budget": budget, "total_debt": 0, "debts": [], "strategies": [
+                {"strategy": s, "order": [], "paid_off": True, "months": 0, "payoff_date": None,
+                 "total_interest": 0, "total_paid": 0, "debts": []} for s in strategies
+            ]}
+
+        payments, interest, remaining = PayoffSimulationService.simulate(
+            [d["balance"] for d in debts], [d["interest_rate"] for d in debts],
+            orders, budget, min(months, MAX_MONTHS), minimum_payment_pct
+        )
+
+        # Payments start on the first day of next month
+        month_dates = [buckets.next_bucket((today or date.today()).replace(day=1), buckets.MONTH)]
+        while len(month_dates) < payments.shape[1]:
+            month_dates.append(buckets.next_bucket(month_dates[-1], buckets.MONTH))
+
+        # First month each debt is at zero, -1 if it is never paid off
+        paid = remaining == 0
+        payoff_month = np.where(paid.any(axis=1), paid.argmax(axis=1), -1)
+
+        results = []
+        for s, strategy in enumerate(strategies):
+            per_debt = []
+            for d, debt in enumerate(debts):
+                last = int(payoff_month[s, d])
+                end = last + 1 if last >= 0 else payments.shape[1]
+                per_debt.append({
+                    "key": debt["key"],
+                    "payoff_date": month_dates[last] if last >= 0 else None,
+                    "interest_paid": round(float(interest[s, :end, d].sum()), 2),
+                    "schedule": [
+                        {"month": month, "payment": round(p, 2), "interest": round(i, 2), "balance": round(b, 2)}
+                        for month, p, i, b in zip(
+                            month_dates[:end],
+                            payments[s, :end, d].tolist(),
+                            interest[s, :end, d].tolist(),
+                            remaining[s, :end, d].tolist()
+                        )
+                    ]
+                })
+            paid_off = bool((payoff_month[s] >= 0).all())
+            last_month = int(payoff_month[s].max())
+            results.append({
+                "strategy": strategy,
+                "order": [debts[i]["key"] for i in orders[s]],
+                "paid_off": paid_off,
+                "months": last_month + 1 if paid_off else None,
+                "payoff_date": month_dates[last_month] if paid_off else None,
+                "total_interest": round(float(interest[s].sum()), 2),
+                "total_paid": round(float(payments[s].sum()), 2),
+                "debts": per_debt
+            })
+
+        return {
+            "budget": budget,
+            "total_debt": round(sum(d["balance"] for d in debts), 2),
+            "debts": debts,
+            "strategies": results
+        }
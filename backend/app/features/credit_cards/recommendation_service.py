@@ -1,7 +1,5 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from features.credit_cards.models import CreditCard
-from features.loans.models import Loan
+from features.credit_cards.balances import card_balances
 
 class RecommendationService:
     @staticmethod
@@ -10,21 +8,10 @@ class RecommendationService:
         Avalanche Method: Pay off highest interest rate debt first.
         """
         # 1. Get all credit cards with their current debt
-        cards = db.query(CreditCard).filter(
-            CreditCard.user_id == user_id
-        ).all()
-
         card_debts = []
         total_debt = 0.0
 
-        for card in cards:
-            # Calculate current debt for this card
-            current_debt = db.query(func.sum(Loan.principal)).filter(
-                Loan.used_credit_card == card.id,
-                Loan.user_id == user_id,
-                Loan.deleted_at.is_(None)
-            ).scalar() or 0.0
-            
+        for card, current_debt in card_balances(db, user_id):
             if current_debt > 0:
                 card_debts.append({
                     "id": card.id,
@@ -64,21 +51,10 @@ class RecommendationService:
         """
         Cheapest Credit Method: Use lowest interest rate card first, respecting limits.
         """
-        # 1. Get all credit cards
-        cards = db.query(CreditCard).filter(
-            CreditCard.user_id == user_id
-        ).all()
-
+        # 1. Get all credit cards with their current debt
         card_availabilities = []
 
-        for card in cards:
-            # Calculate current debt
-            current_debt = db.query(func.sum(Loan.principal)).filter(
-                Loan.used_credit_card == card.id,
-                Loan.user_id == user_id,
-                Loan.deleted_at.is_(None)
-            ).scalar() or 0.0
-
+        for card, current_debt in card_balances(db, user_id):
             # Calculate available limit
             limit = float(card.credit_card_limit)
             debt = float(current_debt)
@@ -1,42 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
-from core.db import get_db
-from features.auth.service import get_current_user
-from features.users.models import User
+from datetime import date
+from core import buckets
+from core.db import get_db, get_async_db
+from core.cache import analytics_cache, cache_key
+from features.auth.service import Principal, get_current_user, get_current_user_async
+from features.users.versioning import check_etag, check_daily_etag, check_daily_etag_async, current_data_version_async
 from features.credit_cards import schemas, service
 from features.credit_cards.analytics_service import CreditCardsAnalyticsService
 from features.credit_cards.recommendation_service import RecommendationService
+from features.credit_cards.payoff_service import MAX_MONTHS, STRATEGIES, PayoffSimulationService
 
 router = APIRouter()
 
-@router.get("/analytics")
-def get_credit_cards_analytics(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+@router.get("/analytics", dependencies=[Depends(check_daily_etag_async)])
+async def get_credit_cards_analytics(
+    granularity: str = Query(buckets.FORTNIGHT, enum=list(buckets.GRANULARITIES)),
+    start_date: date = Query(None),
+    end_date: date = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async),
+    version: int = Depends(current_data_version_async)
 ):
-    return CreditCardsAnalyticsService.get_analytics(db, current_user.id)
+    # The default evolution window is relative to today, so the day is part of the key
+    key = cache_key(
+        current_user.id, "credit_cards.analytics", version=version, today=date.today(),
+        granularity=granularity, start_date=start_date, end_date=end_date
+    )
+    # The report's queries run concurrently, each on its own connection from the session's engine.
+    # The auth / version lookups opened a transaction on the session: end it first, so the request
+    # does not hold a pooled connection while it waits for the others (a full pool would deadlock)
+    await db.close()
+    try:
+        return await analytics_cache.get_or_compute_async(
+            key, lambda: CreditCardsAnalyticsService.get_analytics_concurrent(
+                db.bind, current_user.id, granularity, start_date, end_date
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/", response_model=schemas.CreditCardRead, status_code=status.HTTP_201_CREATED)
 def create_credit_card(
     card: schemas.CreditCardCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     return service.create_credit_card(db, card, current_user.id)
 
-@router.get("/", response_model=List[schemas.CreditCardRead])
+@router.get("/", response_model=List[schemas.CreditCardRead], dependencies=[Depends(check_etag)])
 def read_credit_cards(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     return service.get_credit_cards(db, current_user.id)
 
-@router.get("/{card_id}", response_model=schemas.CreditCardRead)
+@router.get("/{card_id}", response_model=schemas.CreditCardRead, dependencies=[Depends(check_etag)])
 def read_credit_card(
     card_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     card = service.get_credit_card(db, card_id, current_user.id)
     if not card:
@@ -47,24 +72,41 @@ def read_credit_card(
 def delete_credit_card(
     card_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     card = service.delete_credit_card(db, card_id, current_user.id)
     if not card:
         raise HTTPException(status_code=404, detail="Credit card not found")
     return {"message": "Credit card deleted successfully"}
-@router.get("/recommendations/repayment")
+@router.get("/recommendations/repayment", dependencies=[Depends(check_etag)])
 def get_repayment_recommendations(
     amount: float,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     return RecommendationService.get_repayment_recommendations(db, current_user.id, amount)
 
-@router.get("/recommendations/purchase")
+@router.get("/recommendations/purchase", dependencies=[Depends(check_etag)])
 def get_purchase_recommendations(
     amount: float,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     return RecommendationService.get_purchase_recommendations(db, current_user.id, amount)
+
+@router.get("/recommendations/payoff", dependencies=[Depends(check_daily_etag)])
+def simulate_payoff(
+    budget: float = Query(..., gt=0),
+    strategies: List[str] = Query(list(STRATEGIES[:2])),
+    order: List[str] = Query(None, description='Debts for the custom strategy, e.g. "card:3", "loan:7"'),
+    months: int = Query(360, ge=1, le=MAX_MONTHS),
+    minimum_payment_pct: float = Query(0, ge=0, le=100),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    try:
+        return PayoffSimulationService.get_simulation(
+            db, current_user.id, budget, strategies, order, months, minimum_payment_pct
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
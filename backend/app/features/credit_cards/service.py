@@ -1,4 +1,5 @@
 from sqlalchemy.orm import Session
+from features.users.versioning import bump_data_version
 from features.credit_cards.models import CreditCard
 from features.credit_cards.schemas import CreditCardCreate
 
@@ -11,6 +12,7 @@ def get_credit_card(db: Session, credit_card_id: int, user_id: int):
 def create_credit_card(db: Session, card: CreditCardCreate, user_id: int):
     db_card = CreditCard(**card.model_dump(), user_id=user_id)
     db.add(db_card)
+    bump_data_version(db, user_id)
     db.commit()
     db.refresh(db_card)
     return db_card
@@ -19,6 +21,7 @@ def delete_credit_card(db: Session, credit_card_id: int, user_id: int):
     card = get_credit_card(db, credit_card_id, user_id)
     if card:
         db.delete(card)
+        bump_data_version(db, user_id)
         db.commit()
     return card
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Numeric, String, Date, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Integer, Numeric, String, Date, TIMESTAMP, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from core.db import Base
@@ -15,7 +15,14 @@ class Loan(Base):
     start_date = Column(Date, nullable=False)
     end_date = Column(Date)
     total_installments = Column(Integer)
+    # The credit-card expense this loan tracks (NULL for loans entered by hand)
+    transaction_id = Column(Integer, ForeignKey("transactions.id", ondelete="CASCADE"), nullable=True)
     created_at = Column(TIMESTAMP, server_default=func.now())
     deleted_at = Column(TIMESTAMP, nullable=True)
 
-    credit_card = relationship("features.credit_cards.models.CreditCard", back_populates="loans")
\ No newline at end of file
+    __table_args__ = (
+        Index("ix_loans_transaction_id", "transaction_id"),
+    )
+
+    credit_card = relationship("features.credit_cards.models.CreditCard", back_populates="loans")
+    transaction = relationship("features.transactions.models.Transaction")
\ No newline at end of file
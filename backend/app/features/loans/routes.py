@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
-from core.db import get_db
-from features.auth.service import get_current_user
-from features.users.models import User
+from core.db import get_db, get_async_db
+from features.auth.service import Principal, get_current_user, get_current_user_async
+from features.users.versioning import check_etag, check_etag_async
 from features.loans import schemas, service
 from features.loans.analytics_service import LoansAnalyticsService
 
@@ -12,7 +13,7 @@ router = APIRouter()
 @router.get("/analytics")
 def get_loans_analytics(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     return LoansAnalyticsService.get_analytics(db, current_user.id)
 
@@ -20,22 +21,25 @@ def get_loans_analytics(
 def create_loan(
     loan: schemas.LoanCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    return service.create_loan(db, loan, current_user.id)
+    db_loan = service.create_loan(db, loan, current_user.id)
+    if not db_loan:
+        raise HTTPException(status_code=404, detail="Credit Card not found")
+    return db_loan
 
-@router.get("/", response_model=List[schemas.LoanRead])
+@router.get("/", response_model=List[schemas.LoanRead], dependencies=[Depends(check_etag)])
 def read_loans(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     return service.get_loans(db, current_user.id)
 
-@router.get("/{loan_id}", response_model=schemas.LoanRead)
+@router.get("/{loan_id}", response_model=schemas.LoanRead, dependencies=[Depends(check_etag)])
 def read_loan(
     loan_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     loan = service.get_loan(db, loan_id, current_user.id)
     if not loan:
@@ -46,7 +50,7 @@ def read_loan(
 def delete_loan(
     loan_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     loan = service.delete_loan(db, loan_id, current_user.id)
     if not loan:
@@ -58,7 +62,7 @@ def link_card_to_loan(
     loan_id: int,
     update_data: schemas.LoanUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     if update_data.used_credit_card is None:
          raise HTTPException(status_code=400, detail="Credit Card ID required")
@@ -73,7 +77,7 @@ def repay_loan(
     loan_id: int,
     repayment: schemas.LoanRepayment,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     loan = service.repay_loan(db, loan_id, repayment, current_user.id)
     if not loan:
@@ -85,27 +89,27 @@ def correct_loan_balance(
     loan_id: int,
     correction: schemas.LoanCorrection,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     loan = service.correct_loan_balance(db, loan_id, correction, current_user.id)
     if not loan:
          raise HTTPException(status_code=404, detail="Loan not found")
     return loan
 
-@router.get("/credit-card/{card_id}/balance", response_model=schemas.LoanBalance)
-def get_credit_card_balance(
+@router.get("/credit-card/{card_id}/balance", response_model=schemas.LoanBalance, dependencies=[Depends(check_etag_async)])
+async def get_credit_card_balance(
     card_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async)
 ):
-    return service.credit_card_balance(db, card_id, current_user.id)
+    return await db.run_sync(service.credit_card_balance, card_id, current_user.id)
 
-@router.get("/credit-cards/balances", response_model=schemas.CreditCardBalances)
-def get_credit_card_balances(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+@router.get("/credit-cards/balances", response_model=schemas.CreditCardBalances, dependencies=[Depends(check_etag_async)])
+async def get_credit_card_balances(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async)
 ):
-    return service.credit_card_balances(db, current_user.id)
+    return await db.run_sync(service.credit_card_balances, current_user.id)
 
 
 
@@ -115,16 +119,19 @@ def repay_credit_card_balance(
     card_id: int,
     repayment: schemas.LoanRepayment,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    return service.credit_card_balance_repayment(db, card_id, current_user.id, repayment)
+    result = service.credit_card_balance_repayment(db, card_id, current_user.id, repayment)
+    if not result:
+        raise HTTPException(status_code=404, detail="Credit Card not found")
+    return result
 
 @router.post("/credit-card/{card_id}/correct-balance", response_model=schemas.LoanBalance)
 def correct_credit_card_balance(
     card_id: int,
     correction: schemas.CreditCardBalanceCorrection,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     # Using 'loan' variable name for consistent return check, though logic returns correction object or loan
     result = service.correct_credit_card_balance(db, card_id, correction, current_user.id)
@@ -1,10 +1,17 @@
+from decimal import Decimal
+from sqlalchemy import case, select, update
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
+from features.users.versioning import bump_data_version
 from fastapi import HTTPException
 from features.loans.models import Loan
 from features.loans import schemas
-from features.credit_cards.service import get_credit_card, get_credit_cards
+from features.credit_cards.models import CreditCard
+from features.credit_cards.service import get_credit_card
+from features.credit_cards.balances import CENTS, adjust_balance, card_balance, card_balances
 from features.transactions.models import Transaction 
+from features.transactions.rollup_service import TransactionRollupService
+from features.transactions import kinds
 from features.categories.models import Category
 from datetime import datetime
 
@@ -18,24 +25,45 @@ def get_loan(db: Session, loan_id: int, user_id: int):
         Loan.deleted_at.is_(None)
     ).first()
 
+def get_loan_for_update(db: Session, loan_id: int, user_id: int):
+    """
+    get_loan for writes: locks the row of the loan's card first (the lock card
+    repayments take, always in that order) and then the loan, re-reading its principal.
+    """
+    loan = get_loan(db, loan_id, user_id)
+    if not loan:
+        return None
+    if loan.used_credit_card is not None:
+        db.query(CreditCard.id).filter(CreditCard.id == loan.used_credit_card).with_for_update().all()
+    return db.query(Loan).filter(
+        Loan.id == loan_id, Loan.deleted_at.is_(None)
+    ).with_for_update().populate_existing().first()
+
 def create_loan(db: Session, loan: schemas.LoanCreate, user_id: int):
+    if loan.used_credit_card is not None and not get_credit_card(db, loan.used_credit_card, user_id):
+        return None
+
     db_loan = Loan(**loan.model_dump(), user_id=user_id)
     db.add(db_loan)
+    adjust_balance(db, db_loan.used_credit_card, db_loan.principal, user_id)
+    bump_data_version(db, user_id)
     db.commit()
     db.refresh(db_loan)
     return db_loan
 
 def delete_loan(db: Session, loan_id: int, user_id: int):
-    loan = get_loan(db, loan_id, user_id)
+    loan = get_loan_for_update(db, loan_id, user_id)
     if loan:
         loan.deleted_at = func.now()
         db.add(loan)
+        adjust_balance(db, loan.used_credit_card, -loan.principal, user_id)
+        bump_data_version(db, user_id)
         db.commit()
         db.refresh(loan)
     return loan
 
 def update_loan_card(db: Session, loan_id: int, card_id: int, user_id: int):
-    loan = get_loan(db, loan_id, user_id)
+    loan = get_loan_for_update(db, loan_id, user_id)
     if not loan:
         return None
     
@@ -43,16 +71,19 @@ def update_loan_card(db: Session, loan_id: int, card_id: int, user_id: int):
     if not card:
         return None
 
+    adjust_balance(db, loan.used_credit_card, -loan.principal, user_id)
+    adjust_balance(db, card_id, loan.principal, user_id)
     loan.used_credit_card = card_id
     loan.interest_rate = card.interest_rate
     
     db.add(loan)
+    bump_data_version(db, user_id)
     db.commit()
     db.refresh(loan)
     return loan
 
 def repay_loan(db: Session, loan_id: int, repayment: schemas.LoanRepayment, user_id: int):
-    loan = get_loan(db, loan_id, user_id)
+    loan = get_loan_for_update(db, loan_id, user_id)
     if not loan:
         return None
     
@@ -62,6 +93,7 @@ def repay_loan(db: Session, loan_id: int, repayment: schemas.LoanRepayment, user
     if new_principal < 0:
          new_principal = 0 
     
+    adjust_balance(db, loan.used_credit_card, new_principal - float(loan.principal), user_id)
     loan.principal = new_principal
 
     # 2. Create Transaction
@@ -77,82 +109,79 @@ def repay_loan(db: Session, loan_id: int, repayment: schemas.LoanRepayment, user
         type="expense",
         payment_method="Deposito à ordem", # Fixed spelling to match init_db.sql constraint
         date=repayment.date,
-        category_id=category_id # Use the ID, not the name
+        category_id=category_id, # Use the ID, not the name
+        kind=kinds.LOAN_REPAYMENT
     )
     
     db.add(loan)
     db.add(transaction)
+    TransactionRollupService.record(db, [transaction])
+    bump_data_version(db, user_id)
     db.commit()
     db.refresh(loan)
     return loan
 
 
 def correct_loan_balance(db: Session, loan_id: int, correction: schemas.LoanCorrection, user_id: int):
-    loan = get_loan(db, loan_id, user_id)
+    loan = get_loan_for_update(db, loan_id, user_id)
     if not loan:
         return None
     
+    adjust_balance(db, loan.used_credit_card, correction.new_balance - float(loan.principal), user_id)
     loan.principal = correction.new_balance
     db.add(loan)
+    bump_data_version(db, user_id)
     db.commit()
     db.refresh(loan)
     return loan
 
 def credit_card_balances(db:Session, user_id: int):
-    credit_cards = get_credit_cards(db, user_id)
-
-    resume = {}
-    for card in credit_cards:
-        current_balance = db.query(func.sum(Loan.principal)).filter(
-            Loan.used_credit_card == card.id,
-            Loan.user_id == user_id,
-            Loan.deleted_at.is_(None)
-        ).scalar() or 0.0
-        resume[card.id] = float(current_balance)
-    
+    resume = {card.id: float(balance) for card, balance in card_balances(db, user_id)}
     return schemas.CreditCardBalances(resume=resume)
 
 
 
 def credit_card_balance(db: Session, credit_card_id: int, user_id: int):
-    current_balance = db.query(func.sum(Loan.principal)).filter(
+    return schemas.LoanBalance(balance=float(card_balance(db, credit_card_id, user_id)))
+
+def fifo_repayment(credit_card_id: int, user_id: int, amount: Decimal):
+    """
+    One UPDATE that spreads `amount` over the card's open loans, oldest first:
+    a window sum gives the debt of the loans before each one, so every loan is
+    either paid off, partly reduced, or left untouched, whatever their number.
+    """
+    open_loans = select(
+        Loan.id,
+        (func.sum(Loan.principal).over(order_by=(Loan.start_date, Loan.created_at, Loan.id)) - Loan.principal).label("before")
+    ).where(
         Loan.used_credit_card == credit_card_id,
         Loan.user_id == user_id,
-        Loan.deleted_at.is_(None)
-    ).scalar() or 0.0
-    return schemas.LoanBalance(balance=current_balance)
-
-def credit_card_balance_repayment(db: Session, credit_card_id: int, user_id: int, repayment: schemas.LoanRepayment):
-    repayment_amount = abs(repayment.amount)
-    current_credit_card_balance = credit_card_balance(db, credit_card_id, user_id)
-    credit_card = get_credit_card(db, credit_card_id, user_id)
-
-    if repayment_amount > current_credit_card_balance.balance:
-        repayment_amount = current_credit_card_balance.balance
-        
-    # Get active loans for this card, oldest first
-    loans = db.query(Loan).filter(
-            Loan.used_credit_card == credit_card_id,
-            Loan.user_id == user_id,
-            Loan.deleted_at.is_(None),
-            Loan.principal > 0
-    ).order_by(Loan.start_date.asc(), Loan.created_at.asc()).all()
-    
-    amount_to_reduce = repayment_amount
-    for loan in loans:
-        if amount_to_reduce <= 0:
-            break
-            
-        if loan.principal >= amount_to_reduce:
-            # This loan covers the reduction
-            loan.principal = float(loan.principal) - amount_to_reduce
-            amount_to_reduce = 0
-            db.add(loan)
-        else:
-            # This loan is fully paid off, but we still need to reduce more
-            amount_to_reduce -= float(loan.principal)
-            loan.principal = 0
-            db.add(loan)
+        Loan.deleted_at.is_(None),
+        Loan.principal > 0
+    ).subquery()
+
+    return (
+        update(Loan)
+        .where(Loan.id == open_loans.c.id, open_loans.c.before < amount)
+        .values(principal=case(
+            (open_loans.c.before + Loan.principal <= amount, 0),
+            else_=Loan.principal - (amount - open_loans.c.before)
+        ))
+        .execution_options(synchronize_session=False)
+    )
+
+def credit_card_balance_repayment(db: Session, credit_card_id: int, user_id: int, repayment: schemas.LoanRepayment, kind: str = kinds.CARD_REPAYMENT):
+    # Locking the card row serializes concurrent repayments of the card and the writes of its
+    # loans, which take the same lock first (get_loan_for_update)
+    credit_card = db.query(CreditCard).filter(
+        CreditCard.id == credit_card_id, CreditCard.user_id == user_id
+    ).with_for_update().populate_existing().first()
+    if not credit_card:
+        return None
+
+    repayment_amount = min(Decimal(str(abs(repayment.amount))).quantize(CENTS), credit_card.current_balance)
+    if repayment_amount > 0:
+        db.execute(fifo_repayment(credit_card_id, user_id, repayment_amount))
     
     # 2. Create Transaction
     # Find the category id for "Pagamento de dívidas".
@@ -162,19 +191,26 @@ def credit_card_balance_repayment(db: Session, credit_card_id: int, user_id: int
     transaction = Transaction(
         user_id=user_id,
         description=f"Pagamento de Cartão de Crédito: {credit_card.name}",
-        amount=min(repayment_amount, repayment.amount),
+        amount=repayment_amount,
         type="expense",
         payment_method="Deposito à ordem", 
         date=repayment.date,
-        category_id=category_id 
+        category_id=category_id,
+        kind=kind
     )
     
+    adjust_balance(db, credit_card_id, -repayment_amount, user_id)
     db.add(transaction)
+    TransactionRollupService.record(db, [transaction])
+    bump_data_version(db, user_id)
     db.commit()
 
     return schemas.LoanBalance(balance=credit_card_balance(db, credit_card_id, user_id).balance)
 
 def correct_credit_card_balance(db: Session, credit_card_id: int, correction: schemas.CreditCardBalanceCorrection, user_id: int):
+    if not get_credit_card(db, credit_card_id, user_id):
+        return None
+
     # 1. Calculate current total balance for this card
     current_balance_data = credit_card_balance(db, credit_card_id, user_id)
     
@@ -205,7 +241,7 @@ def correct_credit_card_balance(db: Session, credit_card_id: int, correction: sc
             date=correction.date,
             description=f"Acerto de Saldo (-): {correction.description or 'Ajuste Manual'}"
         )
-        return credit_card_balance_repayment(db, credit_card_id, user_id, repayment)
+        return credit_card_balance_repayment(db, credit_card_id, user_id, repayment, kind=kinds.BALANCE_ADJUSTMENT)
 
     # If diff is 0, nothing to do
     return credit_card_balance(db, credit_card_id, user_id)
\ No newline at end of file
@@ -0,0 +1 @@
+"""Operational endpoints (cache and connection pool statistics)."""
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from core.cache import analytics_cache
+from core.config import settings
+from core.pool import pool_stats
+from features.auth.service import Principal, get_current_user, principal_cache
+from features.business.members.service import membership_cache
+from features.business.reports.service import vat_report_cache
+
+
+def require_ops_user(current_user: Principal = Depends(get_current_user)) -> Principal:
+    """Dependency: the process-wide figures below are only for the users listed in OPS_USER_EMAILS."""
+    ops_emails = {email.strip().lower() for email in settings.OPS_USER_EMAILS.split(",") if email.strip()}
+    if current_user.email.lower() not in ops_emails:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
+    return current_user
+
+
+router = APIRouter(dependencies=[Depends(require_ops_user)])
+
+@router.get("/cache")
+def get_cache_stats():
+    """Hit/miss counters of the in-process caches, used to size them."""
+    return {"analytics": analytics_cache.stats(), "principals": principal_cache.stats(),
+            "memberships": membership_cache.stats(), "vat_reports": vat_report_cache.stats()}
+
+
+@router.get("/pool")
+def get_pool_stats():
+    """Live gauges and event counters of the database connection pools."""
+    return pool_stats()
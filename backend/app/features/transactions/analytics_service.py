@@ -1,8 +1,10 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, and_
+from sqlalchemy import func, extract
 from typing import List
 from datetime import date
-from features.transactions.models import Transaction
+from features.transactions.models import Transaction, TransactionMonthlyRollup
+from features.transactions.rollup_service import TransactionRollupService
+from features.transactions.kinds import CARD_PURCHASE, CARD_REPAYMENT_KINDS, CREDIT_CARD_PAYMENT_METHODS
 from features.categories.models import Category
 from features.transactions.analytics_schemas import MonthlySummary, AnalyticsResponse, CategorySpending, SpendingByCategoryResponse
 from decimal import Decimal
@@ -14,6 +16,44 @@ from decimal import Decimal
 # Let's keep it simple and assume I'll copy schemas to features/transactions/schemas.py or similar.
 
 class TransactionAnalyticsService:
+    """
+    Whole months are read from the transaction_monthly_rollups table, so the cost
+    grows with the number of months instead of the number of transactions. Only the
+    partial months at the edges of the requested range hit the transactions table.
+    """
+
+    @staticmethod
+    def _filter_rollup(query, user_id: int, first_month: date, last_month: date, category_id, exclude_credit_card, exclude_card_repayment):
+        query = query.filter(
+            TransactionMonthlyRollup.user_id == user_id,
+            TransactionMonthlyRollup.month_start >= first_month,
+            TransactionMonthlyRollup.month_start <= last_month,
+            TransactionMonthlyRollup.count > 0
+        )
+        if category_id:
+            query = query.filter(TransactionMonthlyRollup.category_id == category_id)
+        if exclude_credit_card:
+            query = query.filter(TransactionMonthlyRollup.payment_method.notin_(CREDIT_CARD_PAYMENT_METHODS))
+        if exclude_card_repayment:
+            query = query.filter(TransactionMonthlyRollup.is_card_repayment.is_(False))
+        return query
+
+    @staticmethod
+    def _filter_transactions(query, user_id: int, start_date: date, end_date: date, category_id, exclude_credit_card, exclude_card_repayment):
+        query = query.filter(
+            Transaction.user_id == user_id,
+            Transaction.date >= start_date,
+            Transaction.date <= end_date,
+            Transaction.deleted_at.is_(None)
+        )
+        if category_id:
+            query = query.filter(Transaction.category_id == category_id)
+        if exclude_credit_card:
+            query = query.filter(Transaction.kind != CARD_PURCHASE)
+        if exclude_card_repayment:
+            query = query.filter(Transaction.kind.notin_(CARD_REPAYMENT_KINDS))
+        return query
+
     @staticmethod
     def get_monthly_summary(
         db: Session, 
@@ -24,50 +64,40 @@ class TransactionAnalyticsService:
         exclude_credit_card: bool = False,
         exclude_card_repayment: bool = False
     ):
-        # Base query
-        query = db.query(
-            extract('year', Transaction.date).label('year'),
-            extract('month', Transaction.date).label('month'),
-            Transaction.type,
-            func.sum(Transaction.amount).label('total')
-        ).join(Transaction.category, isouter=True).filter(
-            Transaction.user_id == user_id,
-            Transaction.date >= start_date,
-            Transaction.date <= end_date,
-            Transaction.deleted_at.is_(None)
-        )
+        filters = (category_id, exclude_credit_card, exclude_card_repayment)
+        first_month, last_month, edge_ranges = TransactionRollupService.split_range(start_date, end_date)
 
-        # Apply Filters
-        if category_id:
-            query = query.filter(Transaction.category_id == category_id)
-        
-        if exclude_credit_card:
-            query = query.filter(Transaction.payment_method.notin_(['Cartão de crédito', 'credit_card', 'Credit Card']))
-
-        if exclude_card_repayment:
-            query = query.filter(
-                ~and_(
-                    Transaction.description.ilike('Pagamento de Cartão de Crédito%'),
-                    Category.name == 'Pagamento de dívidas'
-                )
+        # (year, month, type, total) rows from both sources
+        results = []
+        if first_month:
+            rollup_query = db.query(
+                TransactionMonthlyRollup.month_start,
+                TransactionMonthlyRollup.type,
+                func.sum(TransactionMonthlyRollup.total).label('total')
             )
+            rollup_query = TransactionAnalyticsService._filter_rollup(rollup_query, user_id, first_month, last_month, *filters)
+            for r in rollup_query.group_by(TransactionMonthlyRollup.month_start, TransactionMonthlyRollup.type):
+                results.append((r.month_start.year, r.month_start.month, r.type, r.total))
 
-        results = query.group_by(
-            extract('year', Transaction.date),
-            extract('month', Transaction.date),
-            Transaction.type
-        ).all()
+        for edge_start, edge_end in edge_ranges:
+            edge_query = db.query(
+                extract('year', Transaction.date).label('year'),
+                extract('month', Transaction.date).label('month'),
+                Transaction.type,
+                func.sum(Transaction.amount).label('total')
+            )
+            edge_query = TransactionAnalyticsService._filter_transactions(edge_query, user_id, edge_start, edge_end, *filters)
+            for r in edge_query.group_by(extract('year', Transaction.date), extract('month', Transaction.date), Transaction.type):
+                results.append((int(r.year), int(r.month), r.type, r.total))
 
         summary_map = {}
-        for r in results:
-            key = (int(r.year), int(r.month))
+        for year, month, tx_type, total in results:
+            key = (year, month)
             if key not in summary_map:
                 summary_map[key] = {'income': Decimal('0.00'), 'expense': Decimal('0.00')}
             
-            if r.type == 'income':
-                summary_map[key]['income'] = r.total
-            elif r.type == 'expense':
-                summary_map[key]['expense'] = r.total
+            if tx_type in ('income', 'expense'):
+                summary_map[key][tx_type] += total
 
         data = []
         for (year, month), values in summary_map.items():
@@ -95,43 +125,38 @@ class TransactionAnalyticsService:
         exclude_credit_card: bool = False,
         exclude_card_repayment: bool = False
     ):
-        query = db.query(
-            Category.name,
-            func.sum(Transaction.amount).label('total')
-        ).join(Transaction.category)\
-        .filter(
-            Transaction.user_id == user_id,
-            Transaction.date >= start_date,
-            Transaction.date <= end_date,
-            Transaction.type == 'expense',
-            Transaction.deleted_at.is_(None)
-        )
-
-        # Apply Filters
-        if category_id:
-            query = query.filter(Transaction.category_id == category_id)
-        
-        if exclude_credit_card:
-            query = query.filter(Transaction.payment_method.notin_(['Cartão de crédito', 'credit_card', 'Credit Card']))
+        filters = (category_id, exclude_credit_card, exclude_card_repayment)
+        first_month, last_month, edge_ranges = TransactionRollupService.split_range(start_date, end_date)
 
-        if exclude_card_repayment:
-            query = query.filter(
-                ~and_(
-                    Transaction.description.ilike('Pagamento de Cartão de Crédito%'),
-                    Category.name == 'Pagamento de dívidas'
-                )
-            )
+        totals = {}
+        if first_month:
+            rollup_query = db.query(
+                Category.name,
+                func.sum(TransactionMonthlyRollup.total).label('total')
+            ).join(Category, TransactionMonthlyRollup.category_id == Category.id)\
+            .filter(TransactionMonthlyRollup.type == 'expense')
+            rollup_query = TransactionAnalyticsService._filter_rollup(rollup_query, user_id, first_month, last_month, *filters)
+            for r in rollup_query.group_by(Category.name):
+                totals[r.name] = totals.get(r.name, Decimal('0.00')) + r.total
 
-        results = query.group_by(Category.name).all()
+        for edge_start, edge_end in edge_ranges:
+            edge_query = db.query(
+                Category.name,
+                func.sum(Transaction.amount).label('total')
+            ).join(Transaction.category)\
+            .filter(Transaction.type == 'expense')
+            edge_query = TransactionAnalyticsService._filter_transactions(edge_query, user_id, edge_start, edge_end, *filters)
+            for r in edge_query.group_by(Category.name):
+                totals[r.name] = totals.get(r.name, Decimal('0.00')) + r.total
 
-        total_spent = sum((r.total for r in results), Decimal('0.00'))
+        total_spent = sum(totals.values(), Decimal('0.00'))
         
         category_spending = []
-        for r in results:
-            percentage = (float(r.total) / float(total_spent) * 100) if total_spent > 0 else 0
+        for name, total in totals.items():
+            percentage = (float(total) / float(total_spent) * 100) if total_spent > 0 else 0
             category_spending.append({
-                "category_name": r.name,
-                "total_amount": r.total,
+                "category_name": name,
+                "total_amount": total,
                 "percentage": round(percentage, 2)
             })
 
@@ -0,0 +1,179 @@
+"""
+Incremental bank-statement parsers.
+
+Every parser reads the upload as a stream and yields one
+(row number, parsed entry | error) pair at a time, so a statement is never
+fully loaded into memory. A parsed entry is a dict with the keys
+date, description, amount (signed Decimal) and, optionally, type,
+payment_method and category_id.
+"""
+import csv
+import io
+import re
+import xml.etree.ElementTree as ET
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import BinaryIO, Iterator
+
+ParsedRow = tuple[int, dict | Exception]
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y%m%d")
+OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)")
+
+
+def parse_date(value: str) -> date:
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date: {value!r}")
+
+
+def parse_amount(value: str) -> Decimal:
+    """Accepts both 1234.56 / 1,234.56 and the Portuguese 1234,56 / 1.234,56 notations."""
+    value = value.strip().replace(" ", "").replace("\u00a0", "")
+    if "," in value and "." in value:
+        if value.rfind(",") > value.rfind("."):
+            value = value.replace(".", "").replace(",", ".")
+        else:
+            value = value.replace(",", "")
+    elif "," in value:
+        value = value.replace(",", ".")
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"Unrecognised amount: {value!r}")
+
+
+def parse_csv(stream: BinaryIO) -> Iterator[ParsedRow]:
+    """
+    CSV with a header row. Required columns: date, amount. Optional: description,
+    type, payment_method, category_id. Both ',' and ';' delimiters are accepted.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    first_line = text.readline()
+    delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+    header = [h.strip().lower() for h in next(csv.reader([first_line], delimiter=delimiter), [])]
+
+    missing = {"date", "amount"} - set(header)
+    if missing:
+        raise ValueError(f"CSV header is missing columns: {', '.join(sorted(missing))}")
+
+    # Row 1 is the header
+    for row_number, values in enumerate(csv.reader(text, delimiter=delimiter), start=2):
+        if not any(v.strip() for v in values):
+            continue
+        try:
+            record = dict(zip(header, values))
+            entry = {
+                "date": parse_date(record["date"]),
+                "description": (record.get("description") or "").strip() or None,
+                "amount": parse_amount(record["amount"]),
+            }
+            if record.get("type"):
+                entry["type"] = record["type"].strip().lower()
+            if record.get("payment_method"):
+                entry["payment_method"] = record["payment_method"].strip()
+            if record.get("category_id"):
+                entry["category_id"] = int(record["category_id"])
+            yield row_number, entry
+        except (ValueError, KeyError) as e:
+            yield row_number, e
+
+
+def parse_ofx(stream: BinaryIO) -> Iterator[ParsedRow]:
+    """OFX 1.x (SGML) and 2.x (XML): one entry per <STMTTRN> block."""
+    text = io.TextIOWrapper(stream, encoding="latin-1", newline="")
+    current = None
+    row_number = 0
+
+    for line in text:
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if not closing:
+                    current = {}
+                    continue
+                if current is not None:
+                    row_number += 1
+                    yield row_number, _ofx_entry(current)
+                current = None
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+
+
+def _ofx_entry(fields: dict) -> dict | Exception:
+    try:
+        description = " - ".join(v for v in (fields.get("NAME"), fields.get("MEMO")) if v)
+        return {
+            # DTPOSTED looks like 20240131120000[-3:BRT]; the date is the first 8 digits
+            "date": parse_date(fields["DTPOSTED"][:8]),
+            "description": description or None,
+            "amount": parse_amount(fields["TRNAMT"]),
+        }
+    except (ValueError, KeyError) as e:
+        return e
+
+
+def parse_camt053(stream: BinaryIO) -> Iterator[ParsedRow]:
+    """ISO 20022 camt.053: one entry per <Ntry>, streamed with iterparse."""
+    row_number = 0
+    for _, element in ET.iterparse(stream, events=("end",)):
+        if _local_name(element.tag) != "Ntry":
+            continue
+        row_number += 1
+        yield row_number, _camt_entry(element)
+        # Drop the parsed entry so memory does not grow with the statement size
+        element.clear()
+
+
+def _camt_entry(entry: ET.Element) -> dict | Exception:
+    try:
+        fields = {}
+        for child in entry.iter():
+            name = _local_name(child.tag)
+            if name not in fields and child.text and child.text.strip():
+                fields[name] = child.text.strip()
+
+        amount = parse_amount(fields["Amt"])
+        if fields.get("CdtDbtInd") == "DBIT":
+            amount = -amount
+
+        booking_date = fields.get("Dt") or fields.get("DtTm", "")[:10]
+        description = fields.get("Ustrd") or fields.get("AddtlNtryInf") or fields.get("Nm")
+        return {
+            "date": parse_date(booking_date),
+            "description": description,
+            "amount": amount,
+        }
+    except (ValueError, KeyError) as e:
+        return e
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+PARSERS = {
+    "csv": parse_csv,
+    "ofx": parse_ofx,
+    "camt053": parse_camt053,
+}
+
+EXTENSIONS = {
+    ".csv": "csv",
+    ".ofx": "ofx",
+    ".qfx": "ofx",
+    ".xml": "camt053",
+}
+
+
+def detect_format(filename: str | None) -> str | None:
+    if not filename:
+        return None
+    for extension, fmt in EXTENSIONS.items():
+        if filename.lower().endswith(extension):
+            return fmt
+    return None
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class ImportRowResult(BaseModel):
+    row: int
+    status: str  # "imported" or "error"
+    error: Optional[str] = None
+
+
+class ImportReport(BaseModel):
+    format: str
+    imported: int
+    failed: int
+    loans_created: int
+    rows: List[ImportRowResult]
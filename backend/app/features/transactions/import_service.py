@@ -0,0 +1,132 @@
+from types import SimpleNamespace
+from typing import BinaryIO
+from xml.etree.ElementTree import ParseError
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from features.users.versioning import bump_data_version
+from features.transactions import schemas
+from features.transactions.models import Transaction
+from features.categories.models import Category
+from features.transactions.import_parsers import PARSERS
+from features.transactions.kinds import kind_for_payment_method
+from features.transactions.service import card_expense_loan_values
+from features.transactions.rollup_service import TransactionRollupService
+from features.loans.models import Loan
+
+IMPORT_BATCH_SIZE = 1000
+
+
+class StatementImportService:
+    @staticmethod
+    def import_statement(
+        db: Session,
+        user_id: int,
+        stream: BinaryIO,
+        fmt: str,
+        payment_method: str = "Transferência bancária",
+        category_id: int = None
+    ):
+        """
+        Parses a bank statement row by row and inserts it in batches of
+        IMPORT_BATCH_SIZE (one multi-row INSERT per batch) inside a single
+        DB transaction. Rows that fail to parse or validate (including a payment
+        method or category the database would reject) are reported and skipped.
+        """
+        parser = PARSERS[fmt]
+        category_ids = set(db.scalars(select(Category.id)))
+        report_rows = []
+        tx_batch = []
+        imported = failed = loans_created = 0
+
+        def flush():
+            nonlocal loans_created
+            if not tx_batch:
+                return
+            inserted = db.execute(
+                insert(Transaction).returning(
+                    Transaction.id, Transaction.description, Transaction.amount,
+                    Transaction.date, Transaction.payment_method
+                ),
+                tx_batch
+            ).all()
+            TransactionRollupService.record(db, (SimpleNamespace(**row) for row in tx_batch))
+            loan_batch = [
+                {**card_expense_loan_values(tx, user_id), "transaction_id": tx.id}
+                for tx in inserted if tx.payment_method == "Cartão de crédito"
+            ]
+            if loan_batch:
+                db.execute(insert(Loan), loan_batch)
+                loans_created += len(loan_batch)
+            tx_batch.clear()
+
+        try:
+            for row_number, entry in parser(stream):
+                if isinstance(entry, Exception):
+                    failed += 1
+                    report_rows.append({"row": row_number, "status": "error", "error": str(entry)})
+                    continue
+
+                try:
+                    transaction = StatementImportService._to_transaction(entry, payment_method, category_id, category_ids)
+                except (ValidationError, ValueError) as e:
+                    failed += 1
+                    report_rows.append({"row": row_number, "status": "error", "error": str(e)})
+                    continue
+
+                tx_batch.append({
+                    **transaction.model_dump(),
+                    "user_id": user_id,
+                    "kind": kind_for_payment_method(transaction.payment_method),
+                })
+
+                imported += 1
+                report_rows.append({"row": row_number, "status": "imported"})
+
+                if len(tx_batch) >= IMPORT_BATCH_SIZE:
+                    flush()
+
+            flush()
+            bump_data_version(db, user_id)
+            db.commit()
+        except (ValueError, ParseError, UnicodeDecodeError) as e:
+            # The file itself is unreadable: nothing from it is kept
+            db.rollback()
+            raise ValueError(f"Could not parse {fmt} statement: {e}") from e
+        except Exception:
+            db.rollback()
+            raise
+
+        return {
+            "format": fmt,
+            "imported": imported,
+            "failed": failed,
+            "loans_created": loans_created,
+            "rows": report_rows
+        }
+
+    @staticmethod
+    def _to_transaction(
+        entry: dict, payment_method: str, category_id: int = None, category_ids: set = None
+    ) -> schemas.TransactionCreate:
+        amount = entry["amount"]
+        tx_type = entry.get("type") or ("expense" if amount < 0 else "income")
+        if tx_type not in ("income", "expense"):
+            raise ValueError(f"Unknown transaction type: {tx_type!r}")
+
+        # Checked here, so a bad row is reported instead of failing the whole batch INSERT
+        payment_method = entry.get("payment_method") or payment_method
+        if payment_method not in schemas.PAYMENT_METHODS:
+            raise ValueError(f"Unknown payment method: {payment_method!r}")
+        category_id = entry.get("category_id", category_id)
+        if category_id is not None and category_ids is not None and category_id not in category_ids:
+            raise ValueError(f"Unknown category: {category_id!r}")
+
+        return schemas.TransactionCreate(
+            description=entry.get("description"),
+            amount=float(abs(amount)),
+            type=tx_type,
+            payment_method=payment_method,
+            date=entry["date"],
+            category_id=category_id
+        )
@@ -0,0 +1,23 @@
+"""
+Transaction kinds. Set by the services that create transactions, so filters and
+analytics can select card purchases and repayments with an index lookup instead
+of matching payment-method strings and description prefixes.
+"""
+
+REGULAR = "regular"
+CARD_PURCHASE = "card_purchase"
+CARD_REPAYMENT = "card_repayment"
+LOAN_REPAYMENT = "loan_repayment"
+BALANCE_ADJUSTMENT = "balance_adjustment"
+
+KINDS = (REGULAR, CARD_PURCHASE, CARD_REPAYMENT, LOAN_REPAYMENT, BALANCE_ADJUSTMENT)
+
+# Transactions that pay down a credit-card balance (excluded by exclude_card_repayment)
+CARD_REPAYMENT_KINDS = (CARD_REPAYMENT, BALANCE_ADJUSTMENT)
+
+CREDIT_CARD_PAYMENT_METHODS = ['Cartão de crédito', 'credit_card', 'Credit Card']
+
+
+def kind_for_payment_method(payment_method: str) -> str:
+    """Kind of a transaction entered by the user (create, batch create, import)."""
+    return CARD_PURCHASE if payment_method in CREDIT_CARD_PAYMENT_METHODS else REGULAR
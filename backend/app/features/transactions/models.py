@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, Text, Numeric, String, Date, TIMESTAMP, ForeignKey, text
+from sqlalchemy import Column, Integer, Text, Numeric, String, Date, TIMESTAMP, ForeignKey, Index, Boolean, CheckConstraint, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from core.db import Base
+from core.search import search_document, search_indexes
+from features.transactions import kinds
 
 class Transaction(Base):
     __tablename__ = "transactions"
@@ -14,8 +16,34 @@ class Transaction(Base):
     type = Column(String(10), nullable=False)
     payment_method = Column(String(10), nullable=False)
     date = Column(Date, nullable=False)
+    kind = Column(String(20), nullable=False, default=kinds.REGULAR, server_default=kinds.REGULAR)
     created_at = Column(TIMESTAMP, server_default=text("TIMEZONE('utc', NOW())"))
     deleted_at = Column(TIMESTAMP, nullable=True)
 
+    __table_args__ = (
+        CheckConstraint(f"kind IN {kinds.KINDS}", name="transactions_kind_check"),
+        Index("ix_transactions_user_kind_date", "user_id", "kind", "date", postgresql_where=text("deleted_at IS NULL")),
+        # Keyset pagination indexes (see service.get_transactions_page)
+        Index("ix_transactions_user_date_id", "user_id", "date", "id", postgresql_where=text("deleted_at IS NULL")),
+        Index("ix_transactions_user_created_at_id", "user_id", "created_at", "id", postgresql_where=text("deleted_at IS NULL")),
+        # Text search (see service.search_transactions)
+        *search_indexes("ix_transactions_search", search_document(description), text("deleted_at IS NULL")),
+    )
 
-    category = relationship("Category", back_populates="transactions")
+    # Loaded eagerly: the async routes serialize transactions after their session work is done
+    category = relationship("Category", back_populates="transactions", lazy="selectin")
+
+
+
+class TransactionMonthlyRollup(Base):
+    """Running totals per (user, month, type, category, payment method), maintained by rollup_service."""
+    __tablename__ = "transaction_monthly_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    month_start = Column(Date, primary_key=True)
+    type = Column(String(10), primary_key=True)
+    category_id = Column(Integer, primary_key=True, autoincrement=False)  # 0 = uncategorised
+    payment_method = Column(String(50), primary_key=True)
+    is_card_repayment = Column(Boolean, primary_key=True)
+    total = Column(Numeric(14, 2), nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,165 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy import case, delete, extract, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from core.cache import analytics_cache
+from features.transactions.models import Transaction, TransactionMonthlyRollup
+from features.transactions.kinds import CARD_REPAYMENT_KINDS
+
+NO_CATEGORY = 0
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class TransactionRollupService:
+    @staticmethod
+    def record(db: Session, transactions, sign: int = 1):
+        """
+        Adds (sign=1) or removes (sign=-1) transactions from the monthly rollup.
+        Accepts any objects exposing the Transaction columns. Must be called before
+        the caller commits so the rollup changes in the same DB transaction.
+        """
+        transactions = list(transactions)
+        if not transactions:
+            return
+
+        deltas = defaultdict(lambda: [Decimal("0"), 0])
+        for tx in transactions:
+            is_card_repayment = tx.kind in CARD_REPAYMENT_KINDS
+            key = (tx.user_id, month_start(tx.date), tx.type, tx.category_id or NO_CATEGORY, tx.payment_method, is_card_repayment)
+            deltas[key][0] += Decimal(str(tx.amount)) * sign
+            deltas[key][1] += sign
+
+        TransactionRollupService._upsert(db, deltas)
+
+    @staticmethod
+    def _upsert(db: Session, deltas: dict):
+        rows = [
+            {
+                "user_id": user_id,
+                "month_start": month,
+                "type": tx_type,
+                "category_id": category_id,
+                "payment_method": payment_method,
+                "is_card_repayment": is_card_repayment,
+                "total": total,
+                "count": count,
+            }
+            for (user_id, month, tx_type, category_id, payment_method, is_card_repayment), (total, count) in deltas.items()
+        ]
+
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert(TransactionMonthlyRollup)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[c.name for c in TransactionMonthlyRollup.__table__.primary_key],
+                set_={
+                    "total": TransactionMonthlyRollup.total + stmt.excluded.total,
+                    "count": TransactionMonthlyRollup.count + stmt.excluded.count,
+                }
+            )
+            db.execute(stmt, rows)
+            return
+
+        # Generic fallback: one lookup per touched rollup row
+        for row in rows:
+            key = {k: row[k] for k in row if k not in ("total", "count")}
+            existing = db.get(TransactionMonthlyRollup, tuple(key.values()))
+            if existing:
+                existing.total += row["total"]
+                existing.count += row["count"]
+            else:
+                db.add(TransactionMonthlyRollup(**row))
+        db.flush()
+
+    @staticmethod
+    def rebuild(db: Session, user_id: int = None):
+        """Recomputes the rollup from the transactions table (all users, or just one)."""
+        clear = delete(TransactionMonthlyRollup)
+        if user_id is not None:
+            clear = clear.where(TransactionMonthlyRollup.user_id == user_id)
+        db.execute(clear)
+
+        # Row-level values first, so the GROUP BY only sees plain columns
+        source = db.query(
+            Transaction.user_id,
+            extract("year", Transaction.date).label("year"),
+            extract("month", Transaction.date).label("month"),
+            Transaction.type,
+            func.coalesce(Transaction.category_id, NO_CATEGORY).label("category_id"),
+            Transaction.payment_method,
+            case((Transaction.kind.in_(CARD_REPAYMENT_KINDS), True), else_=False).label("is_card_repayment"),
+            Transaction.amount,
+        ).filter(Transaction.deleted_at.is_(None))
+        if user_id is not None:
+            source = source.filter(Transaction.user_id == user_id)
+        source = source.subquery()
+
+        dimensions = [
+            source.c.user_id,
+            source.c.year,
+            source.c.month,
+            source.c.type,
+            source.c.category_id,
+            source.c.payment_method,
+            source.c.is_card_repayment,
+        ]
+        query = db.query(
+            *dimensions,
+            func.sum(source.c.amount).label("total"),
+            func.count().label("count"),
+        ).group_by(*dimensions)
+
+        rows = [
+            {
+                "user_id": r.user_id,
+                "month_start": date(int(r.year), int(r.month), 1),
+                "type": r.type,
+                "category_id": r.category_id,
+                "payment_method": r.payment_method,
+                "is_card_repayment": bool(r.is_card_repayment),
+                "total": r.total,
+                "count": r.count,
+            }
+            for r in query
+        ]
+        if rows:
+            db.execute(TransactionMonthlyRollup.__table__.insert(), rows)
+        db.commit()
+
+        if user_id is not None:
+            analytics_cache.invalidate_user(user_id)
+        else:
+            analytics_cache.clear()
+        return len(rows)
+
+    @staticmethod
+    def split_range(start_date: date, end_date: date):
+        """
+        Splits [start_date, end_date] into the whole months the rollup can answer and
+        the (at most two) partial edge ranges that must be read from transactions.
+        Returns (first_full_month, last_full_month, edge_ranges); the months are None
+        when no whole month fits in the range.
+        """
+        first_full = start_date if start_date.day == 1 else next_month(start_date)
+        last_full = month_start(end_date + timedelta(days=1))  # first month NOT fully covered
+        if first_full >= last_full:
+            return None, None, [(start_date, end_date)] if start_date <= end_date else []
+
+        edges = []
+        if start_date < first_full:
+            edges.append((start_date, first_full - timedelta(days=1)))
+        if last_full <= end_date:
+            edges.append((last_full, end_date))
+
+        last_full_month = month_start(last_full - timedelta(days=1))
+        return first_full, last_full_month, edges
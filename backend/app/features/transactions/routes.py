@@ -1,33 +1,114 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, UploadFile, File
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from core.db import get_db
+from core.db import get_db, get_async_db, SessionLocal
+from core.cache import analytics_cache, cache_key
 from features.transactions import service, schemas
 from features.transactions.analytics_service import TransactionAnalyticsService
 from features.transactions.analytics_schemas import AnalyticsResponse, SpendingByCategoryResponse
+from features.transactions.import_service import StatementImportService
+from features.transactions.import_schemas import ImportReport
+from features.transactions.import_parsers import PARSERS, detect_format
 from datetime import date
 from fastapi import Query
-from features.auth.service import get_current_user
-from features.users.models import User
+from features.auth.service import Principal, get_current_user, get_current_user_async
+from features.users.versioning import check_etag_async, current_data_version_async
 
 
 router = APIRouter()
 
-@router.get("/", response_model=list[schemas.Transaction])
-def list_transactions(
+def transaction_filters(
+    start_date: date = Query(None),
+    end_date: date = Query(None),
+    type: str = Query(None, enum=["income", "expense"]),
+    category_id: int = Query(None),
+    payment_method: str = Query(None),
+    min_amount: float = Query(None, ge=0),
+    max_amount: float = Query(None, ge=0),
+    exclude_credit_card: bool = Query(False),
+    exclude_card_repayment: bool = Query(False),
+) -> schemas.TransactionFilters:
+    return schemas.TransactionFilters(
+        start_date=start_date,
+        end_date=end_date,
+        type=type,
+        category_id=category_id,
+        payment_method=payment_method,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        exclude_credit_card=exclude_credit_card,
+        exclude_card_repayment=exclude_card_repayment,
+    )
+
+@router.get("/", response_model=list[schemas.Transaction], dependencies=[Depends(check_etag_async)])
+async def list_transactions(
     sort_by: str = Query("date", enum=["date", "created_at"]),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    filters: schemas.TransactionFilters = Depends(transaction_filters),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async),
+):
+    return await db.run_sync(service.get_transactions, current_user.id, sort_by, filters)
+
+@router.get("/page", response_model=schemas.TransactionPage, dependencies=[Depends(check_etag_async)])
+async def list_transactions_page(
+    sort_by: str = Query("date", enum=["date", "created_at"]),
+    limit: int = Query(50, ge=1, le=service.MAX_PAGE_SIZE),
+    cursor: str = Query(None),
+    filters: schemas.TransactionFilters = Depends(transaction_filters),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async),
+):
+    try:
+        return await db.run_sync(service.get_transactions_page, current_user.id, sort_by, filters, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+EXPORT_FORMATS = {
+    "csv": (service.export_csv, "text/csv; charset=utf-8"),
+    "ndjson": (service.export_ndjson, "application/x-ndjson"),
+}
+
+@router.get("/export")
+def export_transactions(
+    format: str = Query("csv", enum=list(EXPORT_FORMATS)),
+    filters: schemas.TransactionFilters = Depends(transaction_filters),
+    current_user: Principal = Depends(get_current_user),
 ):
-    
-    return service.get_transactions(db, current_user.id, sort_by)
+    exporter, media_type = EXPORT_FORMATS[format]
+    user_id = current_user.id
 
-@router.get("/{transaction_id}", response_model=schemas.Transaction)
-def get_transaction(
+    # The stream outlives the request dependencies, so it owns its session
+    def stream():
+        db = SessionLocal()
+        try:
+            yield from exporter(db, user_id, filters)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'},
+    )
+
+@router.get("/search", response_model=list[schemas.TransactionSearchHit], dependencies=[Depends(check_etag_async)])
+async def search_transactions(
+    q: str = Query(..., min_length=2, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=service.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async),
+):
+    return await db.run_sync(service.search_transactions, current_user.id, q, skip, limit)
+
+@router.get("/{transaction_id}", response_model=schemas.Transaction, dependencies=[Depends(check_etag_async)])
+async def get_transaction(
     transaction_id: int, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async)
 ):
-    tx = service.get_transaction(db, transaction_id, current_user.id)
+    tx = await db.run_sync(service.get_transaction, transaction_id, current_user.id)
     if not tx:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return tx
@@ -36,45 +117,94 @@ def get_transaction(
 def create_transaction(
     transaction: schemas.TransactionCreate, 
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     return service.create_transaction(db, transaction, current_user.id)
 
+@router.post("/batch", response_model=list[schemas.Transaction])
+def create_transactions_batch(
+    transactions: list[schemas.TransactionCreate] = Body(..., min_length=1, max_length=schemas.MAX_BATCH_SIZE),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    return service.create_transactions(db, transactions, current_user.id)
+
+@router.delete("/batch", response_model=schemas.TransactionBatchDeleteResult)
+def delete_transactions_batch(
+    batch: schemas.TransactionBatchDelete,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    return service.delete_transactions(db, batch.ids, current_user.id)
+
+@router.post("/import", response_model=ImportReport)
+def import_statement(
+    file: UploadFile = File(...),
+    format: str = Query(None, enum=list(PARSERS)),
+    payment_method: str = Query("Transferência bancária"),
+    category_id: int = Query(None),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    fmt = format or detect_format(file.filename)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Could not detect the statement format, please specify it")
+    try:
+        return StatementImportService.import_statement(
+            db, current_user.id, file.file, fmt, payment_method, category_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.delete("/{transaction_id}", response_model=schemas.Transaction)
 def delete_transaction(
     transaction_id: int, 
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     tx = service.delete_transaction(db, transaction_id, current_user.id)
     if not tx:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return tx
 
-@router.get("/analytics/monthly-summary", response_model=AnalyticsResponse)
-def get_transactions_monthly_summary(
+@router.get("/analytics/monthly-summary", response_model=AnalyticsResponse, dependencies=[Depends(check_etag_async)])
+async def get_transactions_monthly_summary(
     start_date: date = Query(...),
     end_date: date = Query(...),
     category_id: int = Query(None),
     exclude_credit_card: bool = Query(False),
     exclude_card_repayment: bool = Query(False),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async),
+    version: int = Depends(current_data_version_async)
 ):
-    return TransactionAnalyticsService.get_monthly_summary(
-        db, current_user.id, start_date, end_date, category_id, exclude_credit_card, exclude_card_repayment
+    key = cache_key(
+        current_user.id, "transactions.monthly_summary", version=version,
+        start_date=start_date, end_date=end_date, category_id=category_id,
+        exclude_credit_card=exclude_credit_card, exclude_card_repayment=exclude_card_repayment
     )
+    return await analytics_cache.get_or_compute_async(key, lambda: db.run_sync(
+        TransactionAnalyticsService.get_monthly_summary,
+        current_user.id, start_date, end_date, category_id, exclude_credit_card, exclude_card_repayment
+    ))
 
-@router.get("/analytics/spending-by-category", response_model=SpendingByCategoryResponse)
-def get_transactions_spending_by_category(
+@router.get("/analytics/spending-by-category", response_model=SpendingByCategoryResponse, dependencies=[Depends(check_etag_async)])
+async def get_transactions_spending_by_category(
     start_date: date = Query(...),
     end_date: date = Query(...),
     category_id: int = Query(None),
     exclude_credit_card: bool = Query(False),
     exclude_card_repayment: bool = Query(False),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user_async),
+    version: int = Depends(current_data_version_async)
 ):
-    return TransactionAnalyticsService.get_spending_by_category(
-        db, current_user.id, start_date, end_date, category_id, exclude_credit_card, exclude_card_repayment
-    )
\ No newline at end of file
+    key = cache_key(
+        current_user.id, "transactions.spending_by_category", version=version,
+        start_date=start_date, end_date=end_date, category_id=category_id,
+        exclude_credit_card=exclude_credit_card, exclude_card_repayment=exclude_card_repayment
+    )
+    return await analytics_cache.get_or_compute_async(key, lambda: db.run_sync(
+        TransactionAnalyticsService.get_spending_by_category,
+        current_user.id, start_date, end_date, category_id, exclude_credit_card, exclude_card_repayment
+    ))
\ No newline at end of file
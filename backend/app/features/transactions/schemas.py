@@ -1,7 +1,12 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import date, datetime
 from features.categories.schemas import Category
 
+MAX_BATCH_SIZE = 1000
+
+# Allowed by the transactions.payment_method CHECK constraint (init_db.sql)
+PAYMENT_METHODS = ('Cartão de crédito', 'Cartão de débito', 'Transferência bancária', 'Dinheiro', 'Outro')
+
 class TransactionBase(BaseModel):
     description: str | None = None
     amount: float
@@ -17,8 +22,39 @@ class TransactionCreate(TransactionBase):
 class Transaction(TransactionBase):
     id: int
     user_id: int
+    kind: str
     created_at: datetime
     category: Category | None = None
 
     class Config:
         from_attributes = True
+
+
+class TransactionSearchHit(Transaction):
+    rank: float
+
+
+class TransactionFilters(BaseModel):
+    start_date: date | None = None
+    end_date: date | None = None
+    type: str | None = None
+    category_id: int | None = None
+    payment_method: str | None = None
+    min_amount: float | None = None
+    max_amount: float | None = None
+    exclude_credit_card: bool = False
+    exclude_card_repayment: bool = False
+
+
+class TransactionPage(BaseModel):
+    items: list[Transaction]
+    next_cursor: str | None = None
+
+
+class TransactionBatchDelete(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class TransactionBatchDeleteResult(BaseModel):
+    deleted: list[int]
+    not_found: list[int]
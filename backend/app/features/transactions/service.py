@@ -1,13 +1,55 @@
-from sqlalchemy.orm import Session
+import base64
+import binascii
+import csv
+import io
+import json
+from datetime import date, datetime
+from sqlalchemy import insert, tuple_, update
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.sql import func
+from features.users.versioning import bump_data_version
 from features.transactions import models, schemas
+from features.categories.models import Category
+from features.transactions.rollup_service import TransactionRollupService
+from features.transactions.kinds import CARD_PURCHASE, CARD_REPAYMENT_KINDS, kind_for_payment_method
+from core.search import match_and_rank, search_document
 
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ["id", "date", "description", "amount", "type", "payment_method", "category", "created_at"]
 
-def get_transactions(db: Session, user_id: int, sort_by: str = "date"):
+
+def apply_filters(query, filters: schemas.TransactionFilters | None):
+    """Applies the optional list filters to a Transaction query."""
+    if filters is None:
+        return query
+    if filters.start_date:
+        query = query.filter(models.Transaction.date >= filters.start_date)
+    if filters.end_date:
+        query = query.filter(models.Transaction.date <= filters.end_date)
+    if filters.type:
+        query = query.filter(models.Transaction.type == filters.type)
+    if filters.category_id:
+        query = query.filter(models.Transaction.category_id == filters.category_id)
+    if filters.payment_method:
+        query = query.filter(models.Transaction.payment_method == filters.payment_method)
+    if filters.min_amount is not None:
+        query = query.filter(models.Transaction.amount >= filters.min_amount)
+    if filters.max_amount is not None:
+        query = query.filter(models.Transaction.amount <= filters.max_amount)
+    if filters.exclude_credit_card:
+        query = query.filter(models.Transaction.kind != CARD_PURCHASE)
+    if filters.exclude_card_repayment:
+        query = query.filter(models.Transaction.kind.notin_(CARD_REPAYMENT_KINDS))
+    return query
+
+
+def get_transactions(db: Session, user_id: int, sort_by: str = "date", filters: schemas.TransactionFilters | None = None):
     query = db.query(models.Transaction).filter(
         models.Transaction.user_id == user_id,
         models.Transaction.deleted_at.is_(None)
     )
+    query = apply_filters(query, filters)
 
     if sort_by == "created_at":
         query = query.order_by(models.Transaction.created_at.desc())
@@ -17,6 +59,132 @@ def get_transactions(db: Session, user_id: int, sort_by: str = "date"):
     return query.all()
 
 
+def encode_cursor(sort_by: str, tx: models.Transaction) -> str:
+    value = tx.created_at if sort_by == "created_at" else tx.date
+    payload = json.dumps({"s": sort_by, "v": value.isoformat(), "id": tx.id})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str):
+    """Returns the (sort value, id) pair encoded in a cursor, raising ValueError if it is invalid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["s"] != sort_by:
+            raise ValueError("Cursor was issued for a different sort order")
+        if sort_by == "created_at":
+            value = datetime.fromisoformat(payload["v"])
+        else:
+            value = date.fromisoformat(payload["v"])
+        return value, int(payload["id"])
+    except (binascii.Error, json.JSONDecodeError, KeyError, TypeError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def get_transactions_page(
+    db: Session,
+    user_id: int,
+    sort_by: str = "date",
+    filters: schemas.TransactionFilters | None = None,
+    limit: int = 50,
+    cursor: str | None = None,
+):
+    """
+    Keyset pagination: seeks on (date, id) or (created_at, id) instead of using OFFSET,
+    so every page costs the same no matter how deep into the history it is.
+    """
+    sort_column = models.Transaction.created_at if sort_by == "created_at" else models.Transaction.date
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    query = db.query(models.Transaction).filter(
+        models.Transaction.user_id == user_id,
+        models.Transaction.deleted_at.is_(None)
+    )
+    query = apply_filters(query, filters)
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_by)
+        query = query.filter(tuple_(sort_column, models.Transaction.id) < tuple_(value, last_id))
+
+    # Fetch one extra row to know whether there is a next page
+    rows = query.order_by(sort_column.desc(), models.Transaction.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort_by, rows[-1])
+
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+def _export_rows(db: Session, user_id: int, filters: schemas.TransactionFilters | None):
+    """Yields plain result rows in batches from a server-side cursor, never the whole result set."""
+    query = db.query(
+        models.Transaction.id,
+        models.Transaction.date,
+        models.Transaction.description,
+        models.Transaction.amount,
+        models.Transaction.type,
+        models.Transaction.payment_method,
+        Category.name.label("category"),
+        models.Transaction.created_at,
+    ).outerjoin(Category, models.Transaction.category_id == Category.id).filter(
+        models.Transaction.user_id == user_id,
+        models.Transaction.deleted_at.is_(None)
+    )
+    query = apply_filters(query, filters)
+    query = query.order_by(models.Transaction.date.asc(), models.Transaction.id.asc())
+
+    # yield_per turns on stream_results, so Postgres uses a named (server-side) cursor
+    for row in query.yield_per(EXPORT_BATCH_SIZE):
+        yield row
+
+
+def export_csv(db: Session, user_id: int, filters: schemas.TransactionFilters | None = None):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    for count, row in enumerate(_export_rows(db, user_id, filters), start=1):
+        writer.writerow([
+            row.id,
+            row.date.isoformat(),
+            row.description or "",
+            row.amount,
+            row.type,
+            row.payment_method,
+            row.category or "",
+            row.created_at.isoformat() if row.created_at else "",
+        ])
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    yield buffer.getvalue()
+
+
+def export_ndjson(db: Session, user_id: int, filters: schemas.TransactionFilters | None = None):
+    lines = []
+    for row in _export_rows(db, user_id, filters):
+        lines.append(json.dumps({
+            "id": row.id,
+            "date": row.date.isoformat(),
+            "description": row.description,
+            "amount": float(row.amount),
+            "type": row.type,
+            "payment_method": row.payment_method,
+            "category": row.category,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+        }, ensure_ascii=False))
+        if len(lines) == EXPORT_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
 def get_transaction(db: Session, transaction_id: int, user_id: int):
     return (
         db.query(models.Transaction)
@@ -27,52 +195,156 @@ def get_transaction(db: Session, transaction_id: int, user_id: int):
     )
 
 
+def search_transactions(db: Session, user_id: int, q: str, skip: int = 0, limit: int = 50):
+    condition, rank = match_and_rank(db, search_document(models.Transaction.description), q)
+    rows = (
+        db.query(models.Transaction, rank.label("rank"))
+        .options(joinedload(models.Transaction.category))
+        .filter(models.Transaction.user_id == user_id)
+        .filter(models.Transaction.deleted_at.is_(None))
+        .filter(condition)
+        .order_by(rank.desc(), models.Transaction.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    for transaction, score in rows:
+        transaction.rank = float(score)
+    return [transaction for transaction, _ in rows]
+
+
+def card_expense_loan_values(transaction: schemas.TransactionCreate, user_id: int) -> dict:
+    """Column values of the Loan that tracks a credit-card expense until it is repaid."""
+    return {
+        "user_id": user_id,
+        "name": f"Despesa CC: {transaction.description or 'Sem descrição'}",
+        "principal": transaction.amount,
+        "start_date": transaction.date,
+        "used_credit_card": None,  # To be linked later
+        "interest_rate": None,     # As requested
+        "total_installments": 1,   # Default to 1-time full payment
+    }
+
+
 def create_transaction(db: Session, transaction: schemas.TransactionCreate, user_id: int):
-    db_tx = models.Transaction(**transaction.model_dump(), user_id=user_id)
+    db_tx = models.Transaction(
+        **transaction.model_dump(), user_id=user_id, kind=kind_for_payment_method(transaction.payment_method)
+    )
     db.add(db_tx)
     
     # Check for Credit Card usage
     if transaction.payment_method == "Cartão de crédito":
-        # Create an unlinked Loan
+        # Create a Loan linked to the transaction but not yet to a card
         from features.loans.models import Loan
-        
-        loan = Loan(
-            user_id=user_id,
-            name=f"Despesa CC: {transaction.description or 'Sem descrição'}",
-            principal=transaction.amount,
-            start_date=transaction.date,
-            used_credit_card=None, # To be linked later
-            interest_rate=None,        # As requested
-            total_installments=1       # Default to 1-time full payment
-        )
-        db.add(loan)
 
+        db.add(Loan(**card_expense_loan_values(transaction, user_id), transaction=db_tx))
+
+    TransactionRollupService.record(db, [db_tx])
+    bump_data_version(db, user_id)
     db.commit()
     db.refresh(db_tx)
     return db_tx
 
 
+def _delete_card_loans(db: Session, transaction_ids: list[int], user_id: int):
+    """Soft-deletes the loans created for these card expenses (indexed on loans.transaction_id)."""
+    from features.loans.models import Loan
+    from features.credit_cards.balances import adjust_balances, loan_deltas
+
+    if transaction_ids:
+        deleted = db.execute(
+            update(Loan)
+            .where(Loan.transaction_id.in_(transaction_ids), Loan.user_id == user_id, Loan.deleted_at.is_(None))
+            .values(deleted_at=func.now())
+            .returning(Loan.used_credit_card, Loan.principal)
+            .execution_options(synchronize_session=False)
+        ).all()
+        adjust_balances(db, loan_deltas(deleted, sign=-1), user_id)
+
+
 def delete_transaction(db: Session, transaction_id: int, user_id: int):
     tx = get_transaction(db, transaction_id, user_id)
     if tx:
         tx.deleted_at = func.now()
         db.add(tx)
+        TransactionRollupService.record(db, [tx], sign=-1)
+        if tx.payment_method == "Cartão de crédito":
+            _delete_card_loans(db, [tx.id], user_id)
+        bump_data_version(db, user_id)
         db.commit()
         db.refresh(tx)
-    if tx.payment_method == "Cartão de crédito":
-        from features.loans.models import Loan
-        
-        # Heuristic: Find one matching unlinked loan to delete
-        loan_to_delete = db.query(Loan).filter(
-            Loan.user_id == tx.user_id,
-            Loan.name == f"Despesa CC: {tx.description or 'Sem descrição'}",
-            Loan.principal == tx.amount,
-            Loan.start_date == tx.date,
-            Loan.deleted_at.is_(None)
-        ).first()
-
-        if loan_to_delete:
-            loan_to_delete.deleted_at = func.now()
-            db.add(loan_to_delete)
-            db.commit()
-    return tx
\ No newline at end of file
+    return tx
+
+def create_transactions(db: Session, transactions: list[schemas.TransactionCreate], user_id: int):
+    """Creates many transactions with one INSERT ... RETURNING and a single commit."""
+    from features.loans.models import Loan
+
+    if not transactions:
+        return []
+
+    created = db.scalars(
+        insert(models.Transaction).returning(models.Transaction),
+        [
+            {**tx.model_dump(), "user_id": user_id, "kind": kind_for_payment_method(tx.payment_method)}
+            for tx in transactions
+        ]
+    ).all()
+
+    loans = [
+        {**card_expense_loan_values(tx, user_id), "transaction_id": tx.id}
+        for tx in created if tx.payment_method == "Cartão de crédito"
+    ]
+    if loans:
+        db.execute(insert(Loan), loans)
+
+    TransactionRollupService.record(db, created)
+    created_ids = [tx.id for tx in created]
+    bump_data_version(db, user_id)
+    db.commit()
+
+    # Reload in one query, otherwise each expired row is refreshed on its own while serializing
+    return (
+        db.query(models.Transaction)
+        .options(joinedload(models.Transaction.category))
+        .filter(models.Transaction.id.in_(created_ids))
+        .order_by(models.Transaction.id)
+        .all()
+    )
+
+
+def delete_transactions(db: Session, transaction_ids: list[int], user_id: int):
+    """Soft-deletes many transactions with one UPDATE, plus one UPDATE for their card loans."""
+    requested = list(dict.fromkeys(transaction_ids))
+    deleted = db.execute(
+        update(models.Transaction)
+        .where(
+            models.Transaction.id.in_(requested),
+            models.Transaction.user_id == user_id,
+            models.Transaction.deleted_at.is_(None)
+        )
+        .values(deleted_at=func.now())
+        .returning(
+            models.Transaction.id,
+            models.Transaction.user_id,
+            models.Transaction.description,
+            models.Transaction.amount,
+            models.Transaction.type,
+            models.Transaction.category_id,
+            models.Transaction.date,
+            models.Transaction.payment_method,
+            models.Transaction.kind
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    TransactionRollupService.record(db, deleted, sign=-1)
+
+    _delete_card_loans(db, [tx.id for tx in deleted if tx.payment_method == "Cartão de crédito"], user_id)
+
+    bump_data_version(db, user_id)
+    db.commit()
+
+    deleted_ids = {tx.id for tx in deleted}
+    return {
+        "deleted": [tx_id for tx_id in requested if tx_id in deleted_ids],
+        "not_found": [tx_id for tx_id in requested if tx_id not in deleted_ids]
+    }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, func
 from core.db import Base
 
 class User(Base):
@@ -8,4 +8,5 @@ class User(Base):
     email = Column(String(255), unique=True, nullable=False)   # ✅ adicionado
     password_hash = Column(String, nullable=False)             # ✅ campo usado no auth
     username = Column(String(100))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    data_version = Column(BigInteger, nullable=False, default=0, server_default="0")  # bumped on every write, see versioning.py
\ No newline at end of file
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from core.db import get_db
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.db import get_async_db
+from features.auth.hashing import password_hasher
 from features.users import service, schemas
 
 router = APIRouter()
 
 @router.post("/", response_model=schemas.UserRead)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    return service.create_user(db, user)
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        # Duplicates are refused before they take a slot on the hashing executor
+        await db.run_sync(service.check_new_user, user)
+        # End the lookup's transaction: the pooled connection is free while the hash waits
+        await db.rollback()
+        hashed_pw = await password_hasher.hash(user.password)
+        return await db.run_sync(service.create_user, user, hashed_pw)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel, EmailStr
 
 class UserBase(BaseModel):
@@ -9,6 +10,6 @@ class UserCreate(UserBase):
 
 class UserRead(UserBase):
     id: int
-    created_at: str
+    created_at: datetime
     class Config:
         from_attributes = True
\ No newline at end of file
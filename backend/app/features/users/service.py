@@ -1,18 +1,22 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from features.users import models, schemas
-from passlib.hash import bcrypt
 
-def create_user(db: Session, user: schemas.UserCreate):
+def check_new_user(db: Session, user: schemas.UserCreate):
+    """Raises ValueError when the email or username is taken (before paying for the password hash)."""
     # Existing email check
-    if db.query(User).filter(User.email == user.email).first():
+    if db.query(models.User).filter(models.User.email == user.email).first():
         raise ValueError("Email já registado")
     
     # Existing username check
-    if db.query(User).filter(User.username == user.username).first():
+    if db.query(models.User).filter(models.User.username == user.username).first():
         raise ValueError("Username já existe") # This message is sent to frontend
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_pw: str):
+    """hashed_pw comes from features.auth.hashing.password_hasher (hashed off the request thread)."""
+    # Checked again: another registration may have taken them while hashing
+    check_new_user(db, user)
     
-    hashed_pw = bcrypt.hash(user.password)
     new_user = models.User(email=user.email, password_hash=hashed_pw, username=user.username)
     db.add(new_user)
     db.commit()
@@ -0,0 +1,101 @@
+"""
+Per-user data version.
+
+Every service that writes a user's transactions, loans or credit cards calls
+bump_data_version() before committing, so users.data_version changes in the
+same DB transaction as the data. GET endpoints derive their ETag from it and
+answer 304 Not Modified without running their queries when it hasn't changed.
+
+The version is read from the database on each request that needs it
+(current_data_version), never from the cached principal, so a write served by
+another worker process is seen immediately.
+"""
+from datetime import date
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from core.db import get_async_db, get_db
+from features.auth.service import Principal, get_current_user, get_current_user_async
+from features.users.models import User
+
+
+def bump_data_version(db: Session, user_id: int):
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(data_version=User.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def current_data_version(
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> int:
+    """Dependency: the user's data version (resolved once per request, however many dependants)."""
+    return db.scalar(select(User.data_version).where(User.id == current_user.id))
+
+
+async def current_data_version_async(
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+) -> int:
+    """current_data_version on the request's AsyncSession (for async routes)."""
+    return await db.scalar(select(User.data_version).where(User.id == current_user.id))
+
+
+def data_version_etag(user_id: int, version: int, *extra) -> str:
+    tag = "-".join([f"u{user_id}", f"v{version}", *map(str, extra)])
+    return f'W/"{tag}"'
+
+
+def _etag_response(request: Request, response: Response, etag: str):
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return etag
+
+
+def check_etag(
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    version: int = Depends(current_data_version)
+):
+    """Dependency for GET endpoints: sets the ETag header or short-circuits with 304."""
+    return _etag_response(request, response, data_version_etag(current_user.id, version))
+
+
+def check_daily_etag(
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    version: int = Depends(current_data_version)
+):
+    """Same as check_etag, for responses that also depend on today's date."""
+    return _etag_response(request, response, data_version_etag(current_user.id, version, date.today().isoformat()))
+
+
+async def check_etag_async(
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user_async),
+    version: int = Depends(current_data_version_async)
+):
+    """check_etag for async routes: the user and version come from the AsyncSession."""
+    return _etag_response(request, response, data_version_etag(current_user.id, version))
+
+
+async def check_daily_etag_async(
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user_async),
+    version: int = Depends(current_data_version_async)
+):
+    """check_daily_etag for async routes."""
+    return _etag_response(request, response, data_version_etag(current_user.id, version, date.today().isoformat()))
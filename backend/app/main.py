@@ -53,4 +53,10 @@ from features.business.transaction_categories.routes import router as business_c
 app.include_router(business_categories_router, prefix="/business/{business_id}/categories", tags=["Business Categories"])
 
 from features.business.transactions.routes import router as business_transactions_router
-app.include_router(business_transactions_router, prefix="/business/{business_id}/transactions", tags=["Business Transactions"])
\ No newline at end of file
+app.include_router(business_transactions_router, prefix="/business/{business_id}/transactions", tags=["Business Transactions"])
+
+from features.business.reports.routes import router as business_reports_router
+app.include_router(business_reports_router, prefix="/business/{business_id}/reports", tags=["Business Reports"])
+
+from features.system.routes import router as system_router
+app.include_router(system_router, prefix="/system", tags=["System"])
\ No newline at end of file
@@ -11,3 +11,51 @@ def _add_project_root_to_path():
 
 _add_project_root_to_path()
 
+# Settings() requires these; the unit tests never talk to the configured database.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from core.db import Base
+
+
+def _register_models():
+    """Import every feature model so relationships resolve and tables exist."""
+    from features.users import models as _users  # noqa: F401
+    from features.categories import models as _categories  # noqa: F401
+    from features.transactions import models as _transactions  # noqa: F401
+    from features.loans import models as _loans  # noqa: F401
+    from features.credit_cards import models as _credit_cards  # noqa: F401
+    from features.business import models as _business  # noqa: F401
+    from features.business.members import models as _members  # noqa: F401
+    from features.business.transaction_categories import models as _business_categories  # noqa: F401
+    from features.business.transactions import models as _business_transactions  # noqa: F401
+
+
+def _sqlite_compatible_defaults():
+    """SQLite can't parse TIMEZONE('utc', NOW()) as a column default."""
+    for table in Base.metadata.tables.values():
+        for column in table.columns:
+            default = column.server_default
+            if default is not None and "TIMEZONE" in str(getattr(default, "arg", "")):
+                default.arg = text("CURRENT_TIMESTAMP")
+
+
+@pytest.fixture()
+def sqlite_session():
+    """In-memory SQLite session with the full schema created."""
+    _register_models()
+    _sqlite_compatible_defaults()
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(bind=engine)
+    TestingSessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
@@ -0,0 +1,139 @@
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from tests.conftest import _register_models, _sqlite_compatible_defaults
+from core.cache import analytics_cache
+from core.db import Base, async_database_url, get_async_db, get_db
+from features.auth.service import create_access_token, principal_cache
+from features.categories.models import Category
+from features.credit_cards.models import CreditCard
+from features.transactions import schemas, service
+from features.users.models import User
+
+
+def test_async_database_url_picks_the_asyncio_driver():
+    def converted(url):
+        return async_database_url(url).render_as_string(hide_password=False)
+
+    assert converted("sqlite://") == "sqlite+aiosqlite://"
+    assert converted("postgresql://u:p@db/app?sslmode=require") == "postgresql+asyncpg://u:p@db/app?ssl=require"
+    assert converted("postgresql+psycopg2://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+
+
+@pytest.fixture()
+def client(tmp_path):
+    """TestClient whose sync and async sessions share one SQLite file."""
+    _register_models()
+    _sqlite_compatible_defaults()
+    path = tmp_path / "app.db"
+    engine = create_engine(f"sqlite:///{path}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    db = Session()
+    user = User(email="async@example.com", password_hash="x")
+    food = Category(name="Alimentação", type="expense")
+    db.add_all([user, food])
+    db.commit()
+    for day, amount in [(3, 10), (5, 20), (20, 30)]:
+        service.create_transaction(db, schemas.TransactionCreate(
+            description=f"Mercado {day}", amount=amount, type="expense",
+            payment_method="Dinheiro", date=date(2024, 1, day), category_id=food.id
+        ), user.id)
+
+    sync_sessions = []
+
+    def override_get_db():
+        sync_sessions.append(True)
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def override_get_async_db():
+        async with AsyncSession() as session:
+            yield session
+
+    from main import app
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    principal_cache.clear()
+    client = TestClient(app, headers={"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"})
+    client.sync_sessions = sync_sessions
+    try:
+        yield client
+    finally:
+        app.dependency_overrides.clear()
+        db.close()
+        engine.dispose()
+        async_engine.sync_engine.dispose()
+
+
+def test_read_routes_run_on_the_async_session(client):
+    listed = client.get("/transactions/", params={"sort_by": "date"}).json()
+    assert [tx["amount"] for tx in listed] == [30, 20, 10]
+    assert listed[0]["category"]["name"] == "Alimentação"
+
+    page = client.get("/transactions/page", params={"limit": 2}).json()
+    assert len(page["items"]) == 2 and page["next_cursor"]
+
+    assert client.get(f"/transactions/{listed[0]['id']}").json()["description"] == "Mercado 20"
+
+    summary = client.get("/transactions/analytics/monthly-summary", params={
+        "start_date": "2024-01-01", "end_date": "2024-01-31"
+    }).json()
+    assert [(m["month"], float(m["total_expense"])) for m in summary["data"]] == [(1, 60)]
+
+    assert client.get("/loans/credit-cards/balances").json() == {"resume": {}}
+    assert client.get("/credit-cards/analytics").json()["total_debt"] == 0
+    assert client.get("/credit-cards/analytics", headers={"If-None-Match": "*"}).status_code == 304
+
+    # Authentication, the data version and the ETag checks all ran on the AsyncSession
+    assert client.sync_sessions == []
+
+
+def test_analytics_fan_out_fits_a_pool_of_one(tmp_path):
+    _register_models()
+    _sqlite_compatible_defaults()
+    path = tmp_path / "pool.db"
+    engine = create_engine(f"sqlite:///{path}")
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0, pool_timeout=2
+    )
+    Base.metadata.create_all(bind=engine)
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    db = sessionmaker(bind=engine)()
+    user = User(email="pool@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    db.add(CreditCard(user_id=user.id, name="Visa", credit_card_limit=1000, interest_rate=12))
+    db.commit()
+    token = create_access_token({"sub": str(user.id)})
+    db.close()
+
+    async def override_get_async_db():
+        async with AsyncSession() as session:
+            yield session
+
+    from main import app
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    principal_cache.clear()
+    analytics_cache.clear()
+    try:
+        # The session's connection is released before the report's queries check theirs out
+        response = TestClient(app).get("/credit-cards/analytics", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200 and response.json()["utilization"]["total_limit"] == 1000
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+        async_engine.sync_engine.dispose()
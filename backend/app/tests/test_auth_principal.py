@@ -0,0 +1,105 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from features.auth import service as auth_service
+from core.db import Base, get_db
+from features.auth.service import Principal, create_access_token, get_current_user, principal_cache
+from features.credit_cards import schemas as card_schemas
+from features.credit_cards import service as card_service
+from features.users.models import User
+from features.users.versioning import current_data_version
+from tests.conftest import _register_models, _sqlite_compatible_defaults
+
+
+@pytest.fixture(autouse=True)
+def empty_principal_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+def _user(session):
+    user = User(email="principal@example.com", password_hash="old", username="p")
+    session.add(user)
+    session.commit()
+    return user
+
+
+def test_principal_is_loaded_once(sqlite_session):
+    user = _user(sqlite_session)
+    token = create_access_token({"sub": str(user.id)})
+    statements = []
+    event.listen(sqlite_session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    first = get_current_user(token, sqlite_session)
+    second = get_current_user(token, sqlite_session)
+
+    assert first is second
+    assert (first.id, first.email, first.username) == (user.id, "principal@example.com", "p")
+    assert len(statements) == 1
+
+
+def test_credential_change_and_deletion_invalidate(sqlite_session):
+    user = _user(sqlite_session)
+    auth_service.load_principal(sqlite_session, user.id)
+
+    user.password_hash = "new"
+    sqlite_session.commit()
+    assert principal_cache.get((user.id,)) == (False, None)
+
+    auth_service.load_principal(sqlite_session, user.id)
+    sqlite_session.delete(user)
+    sqlite_session.commit()
+    assert auth_service.load_principal(sqlite_session, user.id) is None
+
+
+def test_data_version_is_read_fresh_with_a_cached_principal(sqlite_session):
+    user = _user(sqlite_session)
+    principal = auth_service.load_principal(sqlite_session, user.id)
+    before = current_data_version(principal, sqlite_session)
+
+    card_service.create_credit_card(sqlite_session, card_schemas.CreditCardCreate(
+        name="Visa", credit_card_limit=1000, interest_rate=10
+    ), user.id)
+
+    assert auth_service.load_principal(sqlite_session, user.id) is principal
+    assert current_data_version(principal, sqlite_session) == before + 1
+
+
+def test_routes_run_with_a_principal():
+    _register_models()
+    _sqlite_compatible_defaults()
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    db = Session()
+    user = _user(db)
+    principal = auth_service.load_principal(db, user.id)
+    assert isinstance(principal, Principal)
+
+    def override_get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    from main import app
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: principal
+    try:
+        client = TestClient(app)
+        assert client.get("/auth/me").json()["email"] == "principal@example.com"
+        card = client.post("/credit-cards/", json={"name": "Visa", "credit_card_limit": 1000})
+        assert card.status_code == 201 and card.json()["user_id"] == user.id
+        business = client.post("/business/", json={"name": "Loja", "tax_id": "500000009", "country": "Portugal"})
+        assert business.status_code == 201
+        assert client.get(f"/business/{business.json()['id']}").json()["name"] == "Loja"
+        assert client.get("/business/dashboard").status_code == 200
+    finally:
+        app.dependency_overrides.clear()
+        db.close()
+        engine.dispose()
@@ -0,0 +1,60 @@
+from datetime import date, datetime
+
+from sqlalchemy import event
+
+from features.business import service
+from features.business.members.models import BusinessMember
+from features.business.models import Business
+from features.business.transactions.models import BusinessTransaction
+from features.users.models import User
+
+
+def _tx(business, user, tx_type, net, day, **extra):
+    return BusinessTransaction(
+        business_id=business.id, user_id=user.id,
+        counterparty_name="Cliente", counterparty_tax_id="123456789", counterparty_country="Portugal",
+        type=tx_type, net_amount=net, vat_rate=23, vat_amount=net * 0.23, vat_exemption=False,
+        gross_amount=net * 1.23, payment_method="Transferência bancária", date=day, **extra
+    )
+
+
+def test_dashboard_totals_in_one_query(sqlite_session):
+    user = User(email="accountant@example.com", password_hash="x")
+    businesses = [Business(name=f"Empresa {i}", tax_id=f"50000010{i}", country="Portugal") for i in range(5)]
+    sqlite_session.add_all([user, *businesses])
+    sqlite_session.flush()
+    a, b, closed, invited, removed = businesses
+    closed.deleted_at = datetime(2024, 1, 1)
+    sqlite_session.add_all([
+        BusinessMember(business_id=a.id, user_id=user.id, role="owner"),
+        BusinessMember(business_id=b.id, user_id=user.id, role="viewer"),
+        BusinessMember(business_id=closed.id, user_id=user.id, role="owner"),
+        BusinessMember(business_id=invited.id, user_id=user.id, role="invited"),
+        BusinessMember(business_id=removed.id, user_id=user.id, role="admin", deleted_at=datetime(2024, 1, 1)),
+        _tx(a, user, "income", 1000, date(2024, 1, 5)),
+        _tx(a, user, "expense", 400, date(2024, 2, 5)),
+        _tx(a, user, "income", 500, date(2023, 12, 31)),
+        _tx(a, user, "income", 999, date(2024, 1, 6), deleted_at=datetime(2024, 1, 7)),
+        _tx(a, user, "income", 7000, date(2024, 1, 8), currency="USD"),
+        *[_tx(x, user, "income", 100, date(2024, 1, 5)) for x in (closed, invited, removed)],
+    ])
+    sqlite_session.commit()
+    user_id = user.id
+
+    statements = []
+    event.listen(sqlite_session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    dashboard = service.get_dashboard(sqlite_session, user_id, start_date=date(2024, 1, 1))
+
+    assert len(statements) == 1
+    assert [(e["name"], e["role"]) for e in dashboard["businesses"]] == [("Empresa 0", "owner"), ("Empresa 1", "viewer")]
+    first, second = dashboard["businesses"]
+    assert (first["revenue"], first["expense"], first["profit"], first["transactions"]) == (1000, 400, 600, 2)
+    assert (first["vat_due"], first["vat_deductible"]) == (230, 92)
+    assert (second["revenue"], second["transactions"]) == (0, 0)
+    assert dashboard["totals"]["profit"] == 600 and dashboard["totals"]["transactions"] == 2
+    # Dollar invoices are counted apart, never added to the euro amounts
+    assert first["other_currency_transactions"] == 1 and dashboard["totals"]["other_currency_transactions"] == 1
+
+    dollars = service.get_dashboard(sqlite_session, user_id, start_date=date(2024, 1, 1), currency="usd")
+    assert dollars["currency"] == "USD"
+    assert (dollars["businesses"][0]["revenue"], dollars["businesses"][0]["other_currency_transactions"]) == (7000, 2)
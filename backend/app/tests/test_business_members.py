@@ -0,0 +1,74 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from features.business import schemas as business_schemas
+from features.business import service as business_service
+from features.business.members import schemas, service
+from features.business.members.service import check_member_role, membership_cache
+from features.users.models import User
+
+
+@pytest.fixture(autouse=True)
+def empty_membership_cache():
+    membership_cache.clear()
+    yield
+    membership_cache.clear()
+
+
+def _business(session):
+    owner = User(email="owner@example.com", password_hash="x")
+    other = User(email="other@example.com", password_hash="x")
+    session.add_all([owner, other])
+    session.commit()
+    business = business_service.create_business(session, business_schemas.BusinessCreate(
+        name="Loja", tax_id="123456789", country="Portugal"
+    ), owner.id)
+    return business, owner, other
+
+
+def test_role_is_resolved_once(sqlite_session):
+    business, owner, _ = _business(sqlite_session)
+    business_id, owner_id = business.id, owner.id
+    statements = []
+    event.listen(sqlite_session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    assert check_member_role(sqlite_session, business_id, owner_id, ['owner']) == 'owner'
+    assert check_member_role(sqlite_session, business_id, owner_id, ['owner', 'admin']) == 'owner'
+    assert len(statements) == 1
+
+
+def test_membership_changes_invalidate(sqlite_session):
+    business, owner, other = _business(sqlite_session)
+
+    # Non-members are cached too, until they are added
+    with pytest.raises(HTTPException) as exc:
+        check_member_role(sqlite_session, business.id, other.id, ['invited'])
+    assert exc.value.status_code == 403
+
+    member = service.add_member(sqlite_session, business.id, schemas.BusinessMemberCreate(user_id=other.id))
+    assert check_member_role(sqlite_session, business.id, other.id, ['invited']) == 'invited'
+
+    member.role = 'admin'
+    sqlite_session.commit()
+    assert check_member_role(sqlite_session, business.id, other.id, ['admin']) == 'admin'
+
+    # Removed (soft-deleted) members lose access
+    service.remove_member(sqlite_session, business.id, other.id)
+    with pytest.raises(HTTPException):
+        check_member_role(sqlite_session, business.id, other.id, ['admin'])
+
+
+def test_removed_member_can_be_added_again(sqlite_session):
+    business, _, other = _business(sqlite_session)
+    member = service.add_member(sqlite_session, business.id, schemas.BusinessMemberCreate(user_id=other.id))
+    service.remove_member(sqlite_session, business.id, other.id)
+    assert check_member_role(sqlite_session, business.id, other.id, ['invited', None]) is None
+
+    again = service.add_member(sqlite_session, business.id, schemas.BusinessMemberCreate(user_id=other.id))
+
+    assert again.id == member.id and again.deleted_at is None
+    assert check_member_role(sqlite_session, business.id, other.id, ['invited']) == 'invited'
+    with pytest.raises(HTTPException) as exc:
+        service.add_member(sqlite_session, business.id, schemas.BusinessMemberCreate(user_id=other.id))
+    assert exc.value.status_code == 400
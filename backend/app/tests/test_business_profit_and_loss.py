@@ -0,0 +1,66 @@
+from datetime import date
+
+from features.business.models import Business
+from features.business.reports.service import ProfitAndLossService
+from features.business.transaction_categories.models import BusinessTransactionCategory
+from features.business.transactions import schemas, service
+from features.business.transactions.rollup_service import BusinessRollupService
+from features.users.models import User
+
+
+def _seed(session):
+    user = User(email="pnl@example.com", password_hash="x")
+    business = Business(name="Loja", tax_id="500000002", country="Portugal")
+    session.add_all([user, business])
+    session.flush()
+    sales = BusinessTransactionCategory(business_id=business.id, name="Vendas", type="income")
+    rent = BusinessTransactionCategory(business_id=business.id, name="Renda", type="expense")
+    session.add_all([sales, rent])
+    session.commit()
+
+    def tx(day, net, tx_type="income", category_id=None, currency="EUR"):
+        return service.create_transaction(session, business.id, schemas.BusinessTransactionCreate(
+            counterparty_name="Cliente", counterparty_tax_id="123456789", counterparty_country="Portugal",
+            category_id=category_id, description=None, type=tx_type,
+            net_amount=net, vat_rate=23, vat_amount=net * 0.23, vat_exemption=False, withholding_tax_amount=None,
+            gross_amount=net * 1.23, payment_method="Transferência bancária", invoice_number=None, date=day,
+            currency=currency,
+        ), user.id)
+
+    tx(date(2023, 2, 10), 500, category_id=sales.id)
+    tx(date(2023, 9, 1), 700, category_id=sales.id)
+    tx(date(2024, 1, 15), 1000, category_id=sales.id)
+    tx(date(2024, 1, 31), 200)
+    tx(date(2024, 2, 1), 300, "expense", rent.id)
+    removed = tx(date(2024, 2, 20), 999, category_id=sales.id)
+    tx(date(2024, 5, 1), 50, category_id=sales.id)
+    tx(date(2024, 1, 20), 8000, category_id=sales.id, currency="USD")
+    service.delete_transaction(session, removed.id, business.id, user.id, "owner")
+    return business, sales
+
+
+def test_profit_and_loss_matches_rebuild(sqlite_session):
+    business, sales = _seed(sqlite_session)
+    today = date(2024, 3, 10)
+
+    incremental = ProfitAndLossService.get_report(sqlite_session, business.id, 2024, today=today)
+    BusinessRollupService.rebuild(sqlite_session)
+    assert ProfitAndLossService.get_report(sqlite_session, business.id, 2024, today=today) == incremental
+
+    lines = {(line["type"], line["category_name"]): line for line in incremental["lines"]}
+    assert list(lines) == [("income", "Sem categoria"), ("income", "Vendas"), ("expense", "Renda")]
+    assert lines[("income", "Vendas")]["months"][:5] == [1000, 0, 0, 0, 50]
+    assert lines[("income", "Vendas")]["category_id"] == sales.id
+    # Year to date runs through March; the prior-year column covers the same months
+    assert (lines[("income", "Vendas")]["ytd"], lines[("income", "Vendas")]["prior_ytd"]) == (1000, 500)
+    assert lines[("income", "Vendas")]["prior_year"] == 1200
+
+    assert incremental["through_month"] == 3
+    assert incremental["ytd"]["income"] == 1200 and incremental["ytd"]["expense"] == 300
+    assert incremental["ytd"]["margin"] == 900 and incremental["ytd"]["margin_pct"] == 75
+    assert incremental["months"][1]["margin"] == -300 and incremental["months"][1]["margin_pct"] is None
+    assert (incremental["currency"], incremental["other_currencies"]) == ("EUR", ["USD"])
+
+    dollars = ProfitAndLossService.get_report(sqlite_session, business.id, 2024, "usd", today=today)
+    assert [(line["category_name"], line["ytd"]) for line in dollars["lines"]] == [("Vendas", 8000)]
+    assert dollars["other_currencies"] == ["EUR"] and dollars["ytd"]["margin"] == 8000
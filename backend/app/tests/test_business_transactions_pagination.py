@@ -0,0 +1,71 @@
+from datetime import date
+
+import pytest
+
+from features.business.models import Business
+from features.business.transactions import models, schemas, service
+from features.users.models import User
+
+
+def _seed(session, count: int) -> Business:
+    user = User(email="ledger@example.com", password_hash="x")
+    business = Business(name="Loja", tax_id="500000000", country="Portugal")
+    session.add_all([user, business])
+    session.flush()
+    for idx in range(count):
+        session.add(models.BusinessTransaction(
+            business_id=business.id,
+            user_id=user.id,
+            counterparty_name="Fornecedor A" if idx % 2 else "Cliente B",
+            counterparty_tax_id=f"10000000{idx % 2}",
+            counterparty_country="Portugal",
+            type="expense" if idx % 2 else "income",
+            net_amount=100, vat_rate=23, vat_amount=23, vat_exemption=False, gross_amount=123,
+            currency="EUR" if idx < 8 else "USD",
+            payment_method="Transferência bancária",
+            # Several rows per day so the id tie-breaker matters
+            date=date(2024, 1, 1 + idx // 3),
+        ))
+    session.commit()
+    return business
+
+
+def test_pages_cover_every_row_once_in_order(sqlite_session):
+    business = _seed(sqlite_session, 10)
+
+    seen = []
+    cursor = None
+    while True:
+        page = service.get_transactions_page(sqlite_session, business.id, limit=4, cursor=cursor)
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len({tx.id for tx in seen}) == len(seen) == 10
+    keys = [(tx.date, tx.id) for tx in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_filters_and_soft_deleted_rows(sqlite_session):
+    business = _seed(sqlite_session, 10)
+    deleted = sqlite_session.query(models.BusinessTransaction).filter(models.BusinessTransaction.type == "expense").first()
+    service.delete_transaction(sqlite_session, deleted.id, business.id, deleted.user_id, "owner")
+
+    listed = service.get_transactions(sqlite_session, business.id)
+    assert len(listed) == 9 and deleted.id not in {tx.id for tx in listed}
+
+    filters = schemas.BusinessTransactionFilters(counterparty="fornecedor", currency="eur", end_date=date(2024, 1, 3))
+    page = service.get_transactions_page(sqlite_session, business.id, filters=filters)
+    assert page["next_cursor"] is None
+    assert [tx.id for tx in page["items"]] and all(
+        tx.type == "expense" and tx.currency == "EUR" and tx.id != deleted.id for tx in page["items"]
+    )
+
+
+def test_invalid_cursor_is_rejected(sqlite_session):
+    business = _seed(sqlite_session, 3)
+    page = service.get_transactions_page(sqlite_session, business.id, limit=1)
+
+    with pytest.raises(ValueError):
+        service.get_transactions_page(sqlite_session, business.id, sort_by="created_at", cursor=page["next_cursor"])
@@ -0,0 +1,104 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+
+from features.business.models import Business
+from features.business.reports.service import VatReportService, vat_report_cache
+from features.business.transactions import models, schemas, service
+from features.users.models import User
+
+
+@pytest.fixture(autouse=True)
+def empty_vat_report_cache():
+    vat_report_cache.clear()
+    yield
+    vat_report_cache.clear()
+
+
+def _invoice(business, user, day, type="income", net=100, rate=23, exempt=False, withholding=None, currency="EUR"):
+    vat = 0 if exempt else net * rate / 100
+    return models.BusinessTransaction(
+        business_id=business.id, user_id=user.id,
+        counterparty_name="Cliente", counterparty_tax_id="123456789", counterparty_country="Portugal",
+        type=type, net_amount=net, vat_rate=None if exempt else rate, vat_amount=vat,
+        vat_exemption=exempt, withholding_tax_amount=withholding, gross_amount=net + vat,
+        payment_method="Transferência bancária", date=day, currency=currency,
+    )
+
+
+def _seed(session):
+    user = User(email="vat@example.com", password_hash="x")
+    business = Business(name="Loja", tax_id="500000001", country="Portugal")
+    session.add_all([user, business])
+    session.flush()
+    session.add_all([
+        _invoice(business, user, date(2024, 1, 10), net=1000, withholding=250),
+        _invoice(business, user, date(2024, 2, 5), net=200, rate=6),
+        _invoice(business, user, date(2024, 2, 20), type="expense", net=400),
+        _invoice(business, user, date(2024, 3, 1), net=300, exempt=True),
+        _invoice(business, user, date(2024, 5, 1), net=100),
+        _invoice(business, user, date(2024, 1, 12), net=5000, currency="USD"),
+    ])
+    session.commit()
+    return business, user
+
+
+def test_monthly_and_quarterly_totals(sqlite_session):
+    business, _ = _seed(sqlite_session)
+
+    report = VatReportService.get_report(sqlite_session, business.id, 2024, today=date(2024, 6, 1))
+    q1, q2 = report["quarters"][:2]
+
+    assert q1["period"] == "2024-Q1" and q1["closed"] and not q2["closed"]
+    assert q1["vat_due"] == 230 + 12 and q1["vat_deductible"] == 92 and q1["vat_balance"] == 150
+    assert q1["exempt_sales"] == 300 and q1["withholding_on_sales"] == 250
+    assert [(line["vat_rate"], line["vat_exemption"]) for line in q1["lines"]] == [(6, False), (23, False), (0, True)]
+    assert [m["vat_due"] for m in q1["months"]] == [230, 12, 0]
+    assert q1["months"][1]["vat_deductible"] == 92
+    assert q2["vat_due"] == 23 and q2["months"][1]["vat_due"] == 23
+    assert (report["currency"], report["other_currencies"]) == ("EUR", ["USD"])
+
+
+def test_each_currency_is_reported_separately(sqlite_session):
+    business, _ = _seed(sqlite_session)
+    today = date(2024, 6, 1)
+    VatReportService.get_report(sqlite_session, business.id, 2024, today=today)
+
+    # The closed first quarter comes from the cache, with the dollar invoice kept apart
+    report = VatReportService.get_report(sqlite_session, business.id, 2024, "usd", today=today)
+    assert (report["currency"], report["other_currencies"]) == ("USD", ["EUR"])
+    q1 = report["quarters"][0]
+    assert (q1["vat_due"], q1["vat_deductible"], [m["vat_due"] for m in q1["months"]]) == (1150, 0, [1150, 0, 0])
+    assert [line["transactions"] for line in q1["lines"]] == [1]
+    assert report["quarters"][1]["lines"] == []
+
+    report = VatReportService.get_report(sqlite_session, business.id, 2024, "GBP", today=today)
+    assert report["other_currencies"] == ["EUR", "USD"] and report["quarters"][0]["vat_due"] == 0
+
+
+def test_closed_quarters_are_cached_until_a_late_invoice(sqlite_session):
+    business, user = _seed(sqlite_session)
+    today = date(2024, 6, 1)
+    VatReportService.get_report(sqlite_session, business.id, 2024, today=today)
+
+    parameters = []
+    event.listen(sqlite_session.get_bind(), "before_cursor_execute", lambda *args: parameters.append(args[3]))
+    VatReportService.get_report(sqlite_session, business.id, 2024, today=today)
+    # Only the open quarters (Q2 to Q4) are read again
+    assert len(parameters) == 1 and "2024-04-01" in map(str, parameters[0])
+
+    service.create_transaction(sqlite_session, business.id, schemas.BusinessTransactionCreate(
+        counterparty_name="Cliente", counterparty_tax_id="123456789", counterparty_country="Portugal",
+        category_id=None, description="Fatura em atraso", type="income",
+        net_amount=100, vat_rate=23, vat_amount=23, vat_exemption=False, withholding_tax_amount=None,
+        gross_amount=123, payment_method="Transferência bancária", invoice_number=None, date=date(2024, 3, 31),
+    ), user.id)
+    report = VatReportService.get_report(sqlite_session, business.id, 2024, today=today)
+    assert report["quarters"][0]["vat_due"] == 242 + 23
+
+
+def test_postgres_uses_grouping_sets():
+    query = VatReportService._query("postgresql", 1, date(2024, 1, 1), date(2024, 12, 31))
+    assert "GROUP BY GROUPING SETS" in str(query.compile(dialect=postgresql.dialect()))
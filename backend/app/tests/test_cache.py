@@ -0,0 +1,45 @@
+from datetime import date
+
+from core import cache as cache_module
+from core.cache import TTLCache, analytics_cache, cache_key
+from features.transactions import schemas, service
+from features.users.models import User
+
+
+def test_lru_eviction_ttl_and_counters(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = TTLCache(max_entries=2, ttl_seconds=10)
+
+    cache.set((1, "a"), "A")
+    cache.set((1, "b"), "B")
+    assert cache.get((1, "a")) == (True, "A")  # "a" becomes most recently used
+    cache.set((2, "c"), "C")                    # evicts "b"
+
+    assert cache.get((1, "b")) == (False, None)
+    now[0] += 11
+    assert cache.get((1, "a")) == (False, None)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (1, 2, 1, 1)
+
+
+def test_cache_key_normalizes_params():
+    assert cache_key(1, "x", start=date(2024, 1, 1), category_id=None) == cache_key(1, "x", start=date(2024, 1, 1))
+    assert cache_key(1, "x", a=1, b=2) == cache_key(1, "x", b=2, a=1)
+
+
+def test_transaction_write_bumps_data_version_used_in_keys(sqlite_session):
+    user = User(email="cache@example.com", password_hash="x")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    before = user.data_version
+    analytics_cache.set(cache_key(user.id, "report", version=before), "stale")
+
+    service.create_transaction(sqlite_session, schemas.TransactionCreate(
+        amount=10, type="expense", payment_method="Dinheiro", date=date(2024, 1, 1)
+    ), user.id)
+    sqlite_session.refresh(user)
+
+    assert user.data_version == before + 1
+    assert analytics_cache.get(cache_key(user.id, "report", version=user.data_version)) == (False, None)
@@ -0,0 +1,192 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from core.db import Base
+from features.credit_cards.balances import adjust_balance, check_balances, repair_balances
+from features.credit_cards.models import CreditCard
+from features.credit_cards.recommendation_service import RecommendationService
+from features.loans import schemas
+from features.loans import service as loans_service
+from features.loans.models import Loan
+from features.transactions import schemas as transaction_schemas
+from features.transactions import service as transactions_service
+from features.users.models import User
+from tests.conftest import _register_models, _sqlite_compatible_defaults
+
+
+def _seed(session, cards: int):
+    user, other = User(email="balances@example.com", password_hash="x"), User(email="o@example.com", password_hash="x")
+    session.add_all([user, other])
+    session.flush()
+    owned = [
+        CreditCard(user_id=user.id, name=f"Card {i}", credit_card_limit=1000, interest_rate=10 + i)
+        for i in range(cards)
+    ]
+    foreign = CreditCard(user_id=other.id, name="Other", credit_card_limit=1000, interest_rate=5)
+    session.add_all([*owned, foreign])
+    session.flush()
+    for i, card in enumerate(owned[1:], start=1):
+        session.add(Loan(user_id=user.id, name="a", principal=100 * i, used_credit_card=card.id, start_date=date(2024, 1, 1)))
+        session.add(Loan(user_id=user.id, name="b", principal=50, used_credit_card=card.id, start_date=date(2024, 1, 1),
+                         deleted_at=date(2024, 2, 1)))
+    session.add(Loan(user_id=other.id, name="c", principal=70, used_credit_card=foreign.id, start_date=date(2024, 1, 1)))
+    session.commit()
+    assert len(repair_balances(session)) == cards  # loans added directly, not through the services
+    return user.id, [card.id for card in owned]
+
+
+def _count_queries(session, calls):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(session.get_bind(), "before_cursor_execute", listener)
+    try:
+        results = [call() for call in calls]
+    finally:
+        event.remove(session.get_bind(), "before_cursor_execute", listener)
+    return len(statements), results
+
+
+@pytest.mark.parametrize("cards", [1, 8])
+def test_balance_call_sites_use_one_query(sqlite_session, cards):
+    user_id, card_ids = _seed(sqlite_session, cards)
+
+    queries, (balances, repayment, purchase) = _count_queries(sqlite_session, [
+        lambda: loans_service.credit_card_balances(sqlite_session, user_id),
+        lambda: RecommendationService.get_repayment_recommendations(sqlite_session, user_id, 150),
+        lambda: RecommendationService.get_purchase_recommendations(sqlite_session, user_id, 150),
+    ])
+
+    assert queries == 3
+    assert balances.resume == {card_id: 100.0 * i for i, card_id in enumerate(card_ids)}
+    assert repayment["total_debt"] == sum(100 * i for i in range(cards))
+    assert purchase["total_available"] == sum(1000 - 100 * i for i in range(cards))
+    assert loans_service.credit_card_balance(sqlite_session, card_ids[-1], user_id).balance == 100 * (cards - 1)
+
+
+def test_loan_services_keep_the_stored_balance_in_sync(sqlite_session):
+    user_id, (first, second) = _seed(sqlite_session, 2)
+    day = date(2024, 3, 1)
+
+    loan = loans_service.create_loan(sqlite_session, schemas.LoanCreate(
+        name="new", principal=40, start_date=day, used_credit_card=first), user_id)
+    loans_service.repay_loan(sqlite_session, loan.id, schemas.LoanRepayment(amount=15, date=day), user_id)
+    loans_service.correct_loan_balance(sqlite_session, loan.id, schemas.LoanCorrection(new_balance=30), user_id)
+    loans_service.update_loan_card(sqlite_session, loan.id, second, user_id)
+
+    expense = transactions_service.create_transaction(sqlite_session, transaction_schemas.TransactionCreate(
+        description="jantar", amount=20.5, type="expense", payment_method="Cartão de crédito", date=day), user_id)
+    card_loan = sqlite_session.query(Loan).filter(Loan.transaction_id == expense.id).one()
+    loans_service.update_loan_card(sqlite_session, card_loan.id, first, user_id)
+    assert loans_service.credit_card_balances(sqlite_session, user_id).resume == {first: 20.5, second: 130.0}
+
+    loans_service.credit_card_balance_repayment(sqlite_session, second, user_id, schemas.LoanRepayment(amount=110.25, date=day))
+    loans_service.correct_credit_card_balance(sqlite_session, first, schemas.CreditCardBalanceCorrection(
+        balance=50, date=datetime(2024, 3, 2)), user_id)
+    transactions_service.delete_transaction(sqlite_session, expense.id, user_id)
+    loans_service.delete_loan(sqlite_session, loan.id, user_id)
+
+    assert check_balances(sqlite_session) == []
+    assert loans_service.credit_card_balances(sqlite_session, user_id).resume == {first: 29.5, second: 0.0}
+
+
+def test_repair_fixes_a_drifted_balance(sqlite_session):
+    user_id, card_ids = _seed(sqlite_session, 3)
+    card = sqlite_session.get(CreditCard, card_ids[2])
+    card.current_balance = 999
+    sqlite_session.commit()
+
+    assert check_balances(sqlite_session, user_id) == [
+        {"card_id": card.id, "user_id": user_id, "stored": 999, "actual": 200}
+    ]
+    assert len(repair_balances(sqlite_session, user_id)) == 1
+    assert check_balances(sqlite_session) == []
+    assert loans_service.credit_card_balance(sqlite_session, card.id, user_id).balance == 200
+
+
+@pytest.mark.parametrize("loans", [3, 60])
+def test_fifo_repayment_is_one_update(sqlite_session, loans):
+    user_id, (card_id,) = _seed(sqlite_session, 1)
+    for i in range(loans):
+        sqlite_session.add(Loan(user_id=user_id, name=f"l{i}", principal=10, used_credit_card=card_id,
+                                start_date=date(2024, 1, 1) + timedelta(days=loans - i)))
+    sqlite_session.commit()
+    repair_balances(sqlite_session)
+    loan_ids = [loan.id for loan in sqlite_session.query(Loan).filter(Loan.used_credit_card == card_id)
+                .order_by(Loan.start_date, Loan.created_at, Loan.id)]
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(sqlite_session.get_bind(), "before_cursor_execute", listener)
+    result = loans_service.credit_card_balance_repayment(
+        sqlite_session, card_id, user_id, schemas.LoanRepayment(amount=25.5, date=date(2024, 3, 1)))
+    event.remove(sqlite_session.get_bind(), "before_cursor_execute", listener)
+
+    assert sum(s.lstrip().startswith("UPDATE loans") for s in statements) == 1
+    principals = dict(sqlite_session.query(Loan.id, Loan.principal).filter(Loan.id.in_(loan_ids)))
+    assert [float(principals[i]) for i in loan_ids[:4]] == [0, 0, 4.5, 10][:min(loans, 4)]
+    assert result.balance == 10 * loans - 25.5
+    assert check_balances(sqlite_session) == []
+
+    # Paying more than the debt clears it and records only what was owed
+    loans_service.credit_card_balance_repayment(
+        sqlite_session, card_id, user_id, schemas.LoanRepayment(amount=10_000, date=date(2024, 3, 2)))
+    assert loans_service.credit_card_balance(sqlite_session, card_id, user_id).balance == 0
+    assert check_balances(sqlite_session) == []
+
+
+def test_fifo_repayment_postgresql_sql():
+    sql = str(loans_service.fifo_repayment(1, 1, Decimal("10")).compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE loans SET principal=CASE")
+    assert "OVER (ORDER BY loans.start_date, loans.created_at, loans.id)" in sql and "FROM (SELECT" in sql
+
+
+def test_loans_cannot_touch_another_users_card(sqlite_session):
+    user_id, (card_id,) = _seed(sqlite_session, 1)
+    other = sqlite_session.query(User).filter(User.email == "o@example.com").one()
+    foreign = sqlite_session.query(CreditCard).filter(CreditCard.user_id == other.id).one()
+    day = date(2024, 3, 1)
+
+    assert loans_service.create_loan(sqlite_session, schemas.LoanCreate(
+        name="x", principal=900, start_date=day, used_credit_card=foreign.id), user_id) is None
+    assert loans_service.correct_credit_card_balance(sqlite_session, foreign.id, schemas.CreditCardBalanceCorrection(
+        balance=900, date=datetime(2024, 3, 2)), user_id) is None
+    adjust_balance(sqlite_session, foreign.id, 900, user_id)
+    sqlite_session.commit()
+    assert loans_service.credit_card_balances(sqlite_session, other.id).resume == {foreign.id: 70.0}
+
+    # A loan of the user pointing at the other user's card is not part of its balance
+    sqlite_session.add(Loan(user_id=user_id, name="y", principal=900, used_credit_card=foreign.id, start_date=day))
+    sqlite_session.commit()
+    assert check_balances(sqlite_session) == []
+    assert loans_service.credit_card_balances(sqlite_session, other.id).resume == {foreign.id: 70.0}
+
+
+def test_loan_writes_reread_the_principal_a_repayment_changed(tmp_path):
+    _register_models()
+    _sqlite_compatible_defaults()
+    engine = create_engine(f"sqlite:///{tmp_path / 'race.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    first, second = Session(), Session()
+    user_id, (card_id,) = _seed(first, 1)
+    day = date(2024, 3, 1)
+    loan = loans_service.create_loan(first, schemas.LoanCreate(
+        name="l", principal=10, start_date=day, used_credit_card=card_id), user_id)
+
+    # The loan was read (principal 10) before a card repayment on another connection paid it off
+    assert loans_service.get_loan(first, loan.id, user_id).principal == 10
+    loans_service.credit_card_balance_repayment(second, card_id, user_id, schemas.LoanRepayment(amount=10, date=day))
+
+    loans_service.repay_loan(first, loan.id, schemas.LoanRepayment(amount=4, date=day), user_id)
+    loans_service.correct_loan_balance(first, loan.id, schemas.LoanCorrection(new_balance=0), user_id)
+
+    assert float(first.get(Loan, loan.id).principal) == 0
+    assert check_balances(first) == []
+    first.close()
+    second.close()
+    engine.dispose()
@@ -0,0 +1,139 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from core import buckets
+from core.db import Base
+from features.credit_cards.analytics_service import CreditCardsAnalyticsService
+from features.credit_cards.balances import repair_balances
+from features.credit_cards.models import CreditCard
+from features.loans.models import Loan
+from features.transactions import kinds
+from features.transactions.models import Transaction
+from features.users.models import User
+from tests.conftest import _register_models, _sqlite_compatible_defaults
+
+
+def test_concurrent_report_matches_sequential_one(tmp_path):
+    _register_models()
+    _sqlite_compatible_defaults()
+    path = tmp_path / "cards.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    user, other = User(email="cards@example.com", password_hash="x"), User(email="other@example.com", password_hash="x")
+    db.add_all([user, other])
+    db.commit()
+    visa = CreditCard(user_id=user.id, name="Visa", credit_card_limit=1000, interest_rate=12)
+    amex = CreditCard(user_id=user.id, name="Amex", credit_card_limit=500, interest_rate=12)
+    foreign = CreditCard(user_id=other.id, name="Other", credit_card_limit=700, interest_rate=5)
+    db.add_all([visa, amex, foreign])
+    db.commit()
+
+    today = date.today()
+    db.add_all([
+        Loan(user_id=user.id, name="a", principal=100, used_credit_card=visa.id, start_date=today),
+        Loan(user_id=user.id, name="b", principal=50, used_credit_card=amex.id, start_date=today),
+        Loan(user_id=user.id, name="gone", principal=999, used_credit_card=amex.id, start_date=today, deleted_at=today),
+        Loan(user_id=other.id, name="c", principal=70, used_credit_card=foreign.id, start_date=today),
+        Transaction(user_id=user.id, amount=40, type="expense", payment_method="Cartão de crédito",
+                    date=today, kind=kinds.CARD_PURCHASE),
+        Transaction(user_id=user.id, amount=25, type="expense", payment_method="Deposito à ordem",
+                    date=today - timedelta(days=40), kind=kinds.CARD_REPAYMENT),
+    ])
+    db.commit()
+    repair_balances(db)  # loans added directly, not through the services
+
+    sequential = CreditCardsAnalyticsService.get_analytics(db, user.id)
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    connections = []
+    event.listen(async_engine.sync_engine, "checkout", lambda dbapi_conn, record, proxy: connections.append(record))
+
+    async def concurrent():
+        try:
+            return await CreditCardsAnalyticsService.get_analytics_concurrent(async_engine, user.id)
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(concurrent()) == sequential
+    assert len(connections) == 2  # one pooled connection per query
+    assert sequential["total_debt"] == 150
+    assert sequential["interest_rates_utilization"] == [{"interest_rate": 12.0, "used": 150.0, "limit": 1500.0, "percentage": 10.0}]
+    assert sum(p["spending"] for p in sequential["evolution"]) == 40
+    assert sum(p["repayment"] for p in sequential["evolution"]) == 25
+
+    db.close()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("granularity, expected", [
+    (buckets.DAY, None),
+    (buckets.WEEK, [("2024-01-29", 10, 0), ("2024-02-05", 0, 0), ("2024-02-12", 20, 5)]),
+    (buckets.FORTNIGHT, [("2024-01-16", 10, 0), ("2024-02-01", 0, 0), ("2024-02-16", 20, 5)]),
+    (buckets.MONTH, [("2024-01-01", 10, 0), ("2024-02-01", 20, 5)]),
+    (buckets.QUARTER, [("2024-01-01", 30, 5)]),
+])
+def test_evolution_buckets(sqlite_session, granularity, expected):
+    user = User(email="buckets@example.com", password_hash="x")
+    sqlite_session.add(user)
+    sqlite_session.flush()
+    sqlite_session.add_all([
+        CreditCard(user_id=user.id, name="Visa", credit_card_limit=1000, interest_rate=12),
+        Transaction(user_id=user.id, amount=10, type="expense", payment_method="Cartão de crédito",
+                    date=date(2024, 1, 31), kind=kinds.CARD_PURCHASE),
+        Transaction(user_id=user.id, amount=20, type="expense", payment_method="Cartão de crédito",
+                    date=date(2024, 2, 18), kind=kinds.CARD_PURCHASE),
+        Transaction(user_id=user.id, amount=5, type="expense", payment_method="Deposito à ordem",
+                    date=date(2024, 2, 16), kind=kinds.BALANCE_ADJUSTMENT),
+    ])
+    sqlite_session.commit()
+
+    report = CreditCardsAnalyticsService.get_analytics(
+        sqlite_session, user.id, granularity, start_date=date(2024, 1, 30), end_date=date(2024, 2, 18)
+    )
+    points = [(p["raw_date"], p["spending"], p["repayment"]) for p in report["evolution"]]
+
+    if expected is None:  # one point per day, gaps included
+        assert len(points) == 20 and points[1] == ("2024-01-31", 10, 0) and points[-1] == ("2024-02-18", 20, 0)
+    else:
+        assert points == expected
+
+
+def test_evolution_range_is_validated(sqlite_session):
+    with pytest.raises(ValueError):
+        CreditCardsAnalyticsService.get_analytics(sqlite_session, 1, buckets.DAY, start_date=date(2000, 1, 1))
+    with pytest.raises(ValueError):
+        CreditCardsAnalyticsService.get_analytics(sqlite_session, 1, start_date=date(2024, 2, 1), end_date=date(2024, 1, 1))
+
+
+def test_default_window_covers_whole_months():
+    start, end = CreditCardsAnalyticsService._evolution_window(date(2024, 3, 10), buckets.FORTNIGHT)
+    assert (start, end) == (date(2023, 3, 1), date(2024, 3, 31))
+    starts = buckets.bucket_starts(start, end, buckets.FORTNIGHT)
+    # Same points as before the bucketed query: both halves of each of the 13 months
+    assert len(starts) == 26 and starts[-1] == date(2024, 3, 16)
+
+
+@pytest.mark.parametrize("granularity, bucket, step", [
+    (buckets.DAY, "transactions.date AS bucket", "interval '1 day'"),
+    (buckets.WEEK, "CAST(date_trunc('week', transactions.date) AS DATE)", "interval '1 week'"),
+    (buckets.FORTNIGHT, "interval '15 days'", "make_interval(0, 0, 0, halves.days)"),
+    (buckets.MONTH, "CAST(date_trunc('month', transactions.date) AS DATE)", "interval '1 month'"),
+    (buckets.QUARTER, "CAST(date_trunc('quarter', transactions.date) AS DATE)", "interval '3 months'"),
+])
+def test_postgres_fills_gaps_with_generate_series(granularity, bucket, step):
+    query = CreditCardsAnalyticsService._evolution_query(1, date(2024, 1, 30), date(2024, 2, 18), granularity, "postgresql")
+    sql = " ".join(str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})).split())
+
+    assert bucket in sql and step in sql
+    assert "FROM generate_series(CAST('" in sql and "LEFT OUTER JOIN" in sql
+    assert "coalesce(anon_2.spending, 0)" in sql and "ON anon_2.bucket = anon_1.bucket" in sql
+    assert "GROUP BY anon_4.bucket" in sql  # grouped on the plain subquery column
+    assert sql.endswith("ORDER BY anon_1.bucket")
@@ -0,0 +1,87 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from core.db import Base, get_async_db, get_db
+from features.auth.service import create_access_token, principal_cache
+from features.users.models import User
+from tests.conftest import _register_models, _sqlite_compatible_defaults
+
+
+@pytest.fixture()
+def client(tmp_path):
+    _register_models()
+    _sqlite_compatible_defaults()
+    path = tmp_path / "etags.db"
+    engine = create_engine(f"sqlite:///{path}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    db = Session()
+    user = User(email="etag@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    token = create_access_token({"sub": str(user.id)})
+    db.close()
+
+    def override_get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def override_get_async_db():
+        async with AsyncSession() as session:
+            yield session
+
+    from main import app
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    principal_cache.clear()
+    try:
+        yield TestClient(app, headers={"Authorization": f"Bearer {token}"})
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+        async_engine.sync_engine.dispose()
+
+
+def _assert_not_modified(client, path):
+    first = client.get(path)
+    assert first.status_code == 200 and first.headers["ETag"].startswith('W/"')
+    repeat = client.get(path, headers={"If-None-Match": first.headers["ETag"]})
+    assert repeat.status_code == 304 and repeat.headers["ETag"] == first.headers["ETag"]
+    return first.headers["ETag"]
+
+
+def _assert_changed(client, path, etag):
+    after = client.get(path, headers={"If-None-Match": etag})
+    assert after.status_code == 200 and after.headers["ETag"] != etag
+    return after
+
+
+@pytest.mark.parametrize("path", ["/credit-cards/", "/loans/credit-cards/balances"])
+def test_card_and_loan_writes_change_the_etag(client, path):
+    etag = _assert_not_modified(client, path)
+
+    card = client.post("/credit-cards/", json={"name": "Visa", "credit_card_limit": 1000, "interest_rate": 12})
+    assert card.status_code == 201
+    _assert_changed(client, path, etag)
+    etag = _assert_not_modified(client, path)
+
+    loan = client.post("/loans/", json={
+        "name": "Compra", "principal": 80, "start_date": "2024-01-10", "used_credit_card": card.json()["id"]
+    })
+    assert loan.status_code == 201
+    after = _assert_changed(client, path, etag)
+    if path == "/loans/credit-cards/balances":
+        assert after.json() == {"resume": {str(card.json()["id"]): 80.0}}
+
+    etag = after.headers["ETag"]
+    assert client.delete(f"/credit-cards/{card.json()['id']}").status_code == 200
+    _assert_changed(client, path, etag)
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from core.db import Base, get_async_db
+
+from features.auth import hashing
+from features.auth.hashing import PasswordHasher, password_hasher
+from tests.conftest import _register_models, _sqlite_compatible_defaults
+
+
+def test_hash_runs_on_the_dedicated_executor_and_verifies():
+    hasher = PasswordHasher(max_workers=1, max_pending=0)
+
+    async def roundtrip():
+        hashed = await hasher.hash("s3cret")
+        return hashed, await hasher.verify("s3cret", hashed), await hasher.verify("wrong", hashed)
+
+    hashed, ok, bad = asyncio.run(roundtrip())
+    assert hashed.startswith("$2b$") and ok and not bad
+    assert hasher.stats()["in_flight"] == 0
+
+
+def test_excess_requests_are_rejected_with_429(monkeypatch):
+    hasher = PasswordHasher(max_workers=1, max_pending=1)
+    release = threading.Event()
+    monkeypatch.setattr(hashing, "hash_password", lambda password: release.wait(5) and "hashed")
+
+    async def burst():
+        first = asyncio.ensure_future(hasher.hash("a"))   # running
+        second = asyncio.ensure_future(hasher.hash("b"))  # queued
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as excinfo:
+            await hasher.hash("c")
+        release.set()
+        return excinfo.value, await first, await second
+
+    error, first, second = asyncio.run(burst())
+    assert error.status_code == 429 and error.headers["Retry-After"] == "1"
+    assert (first, second) == ("hashed", "hashed")
+    assert hasher.stats()["rejected"] == 1
+
+
+def test_duplicate_registration_is_refused_before_hashing(tmp_path, monkeypatch):
+    _register_models()
+    _sqlite_compatible_defaults()
+    path = tmp_path / "users.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncSession() as session:
+            yield session
+
+    hashed = []
+
+    async def fake_hash(password):
+        hashed.append(password)
+        return "hashed"
+
+    monkeypatch.setattr(password_hasher, "hash", fake_hash)
+    from main import app
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    try:
+        client = TestClient(app)
+        body = {"email": "new@example.com", "username": "new", "password": "s3cret"}
+        assert client.post("/users/", json=body).status_code == 200
+        duplicate = client.post("/users/", json={**body, "username": "other"})
+        assert duplicate.status_code == 400 and duplicate.json()["detail"] == "Email já registado"
+        assert hashed == ["s3cret"]
+    finally:
+        app.dependency_overrides.clear()
+        async_engine.sync_engine.dispose()
+
+
+def test_no_connection_is_held_while_hashing(tmp_path, monkeypatch):
+    _register_models()
+    _sqlite_compatible_defaults()
+    path = tmp_path / "auth.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool)
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncSession() as session:
+            yield session
+
+    checked_out = []
+
+    async def fake_hash(password):
+        checked_out.append(async_engine.sync_engine.pool.checkedout())
+        return f"hashed-{password}"
+
+    async def fake_verify(password, hashed):
+        checked_out.append(async_engine.sync_engine.pool.checkedout())
+        return hashed == f"hashed-{password}"
+
+    monkeypatch.setattr(password_hasher, "hash", fake_hash)
+    monkeypatch.setattr(password_hasher, "verify", fake_verify)
+    from main import app
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    try:
+        client = TestClient(app)
+        assert client.post("/users/", json={"email": "a@example.com", "username": "a", "password": "s3cret"}).status_code == 200
+        assert client.post("/auth/register", json={"email": "b@example.com", "username": "b", "password": "s3cret"}).status_code == 200
+        assert client.post("/auth/login", json={"email": "b@example.com", "password": "s3cret"}).status_code == 200
+        assert client.post("/auth/login", json={"email": "b@example.com", "password": "wrong"}).status_code == 401
+        assert checked_out == [0, 0, 0, 0]
+    finally:
+        app.dependency_overrides.clear()
+        async_engine.sync_engine.dispose()
@@ -0,0 +1,132 @@
+import random
+from datetime import date
+
+import numpy as np
+import pytest
+
+from features.credit_cards.balances import repair_balances
+from features.credit_cards.models import CreditCard
+from features.credit_cards.payoff_service import PayoffSimulationService
+from features.loans.models import Loan
+from features.users.models import User
+
+
+def _seed(session):
+    user = User(email="payoff@example.com", password_hash="x")
+    session.add(user)
+    session.flush()
+    card = CreditCard(user_id=user.id, name="Visa", credit_card_limit=5000, interest_rate=24)
+    idle = CreditCard(user_id=user.id, name="Sem saldo", credit_card_limit=1000, interest_rate=30)
+    session.add_all([card, idle])
+    session.flush()
+    car = Loan(user_id=user.id, name="Carro", principal=300, interest_rate=0, start_date=date(2024, 1, 1))
+    session.add_all([
+        car,
+        Loan(user_id=user.id, name="Compra", principal=600, used_credit_card=card.id, start_date=date(2024, 1, 1)),
+        Loan(user_id=user.id, name="Paga", principal=0, interest_rate=5, start_date=date(2024, 1, 1)),
+    ])
+    session.commit()
+    repair_balances(session)
+    return user.id, card.id, car.id
+
+
+def test_simulation_per_strategy(sqlite_session):
+    user_id, card_id, car_id = _seed(sqlite_session)
+
+    result = PayoffSimulationService.get_simulation(
+        sqlite_session, user_id, 300, ["avalanche", "snowball", "custom"],
+        order=[f"loan:{car_id}"], today=date(2024, 5, 20)
+    )
+
+    # Card loans are part of the card balance; empty cards and paid loans are left out
+    assert [d["key"] for d in result["debts"]] == [f"card:{card_id}", f"loan:{car_id}"]
+    avalanche, snowball, custom = result["strategies"]
+    assert avalanche["order"] == [f"card:{card_id}", f"loan:{car_id}"]
+    assert snowball["order"] == custom["order"] == [f"loan:{car_id}", f"card:{card_id}"]
+    assert snowball["total_interest"] == custom["total_interest"]
+
+    # Avalanche: the card (2%/month) gets 300, 300 then 12.24 + 287.76 to the loan
+    card, car = avalanche["debts"]
+    assert [(r["month"], r["payment"], r["interest"], r["balance"]) for r in card["schedule"]] == [
+        (date(2024, 6, 1), 300, 12, 312), (date(2024, 7, 1), 300, 6.24, 18.24), (date(2024, 8, 1), 18.6, 0.36, 0)
+    ]
+    assert card["payoff_date"] == date(2024, 8, 1) and car["payoff_date"] == date(2024, 9, 1)
+    assert avalanche["months"] == 4 and avalanche["payoff_date"] == date(2024, 9, 1)
+    assert avalanche["total_interest"] == 18.6 and avalanche["total_paid"] == 918.6
+    assert snowball["total_interest"] > avalanche["total_interest"]
+
+
+def test_budget_below_interest_never_pays_off(sqlite_session):
+    user_id, card_id, _ = _seed(sqlite_session)
+
+    result = PayoffSimulationService.get_simulation(sqlite_session, user_id, 10, ["avalanche"], months=24)
+
+    strategy = result["strategies"][0]
+    assert (strategy["paid_off"], strategy["months"], strategy["payoff_date"]) == (False, None, None)
+    card = strategy["debts"][0]
+    assert card["payoff_date"] is None and len(card["schedule"]) == 24
+    assert card["schedule"][-1]["balance"] > 600
+
+
+def test_custom_order_may_name_paid_off_debts(sqlite_session):
+    user_id, card_id, car_id = _seed(sqlite_session)
+    idle = sqlite_session.query(CreditCard).filter(CreditCard.name == "Sem saldo").one()
+    paid, charged = (sqlite_session.query(Loan).filter(Loan.name == name).one() for name in ("Paga", "Compra"))
+
+    result = PayoffSimulationService.get_simulation(
+        sqlite_session, user_id, 300, ["custom"],
+        order=[f"card:{idle.id}", f"loan:{paid.id}", f"loan:{charged.id}", f"loan:{car_id}"]
+    )
+
+    assert result["strategies"][0]["order"] == [f"loan:{car_id}", f"card:{card_id}"]
+
+
+@pytest.mark.parametrize("strategies, order, message", [
+    (["fastest"], None, "Unknown strategies"),
+    (["custom"], None, "needs an order"),
+    (["custom"], ["card:999"], "Unknown debts"),
+])
+def test_invalid_requests(sqlite_session, strategies, order, message):
+    user_id, _, _ = _seed(sqlite_session)
+    with pytest.raises(ValueError, match=message):
+        PayoffSimulationService.get_simulation(sqlite_session, user_id, 100, strategies, order)
+
+
+def _reference(balances, rates, order, budget, months, minimum_pct):
+    """Straightforward per-debt loop the vectorized simulation must agree with."""
+    balances = list(balances)
+    interest = 0.0
+    for _ in range(months):
+        if not any(balances):
+            break
+        for d, rate in enumerate(rates):
+            accrued = balances[d] * rate / 1200
+            balances[d] += accrued
+            interest += accrued
+        minimum = [b * minimum_pct / 100 for b in balances]
+        scale = min(1, budget / sum(minimum)) if sum(minimum) else 1
+        left = budget
+        for d in range(len(balances)):
+            balances[d] -= minimum[d] * scale
+            left -= minimum[d] * scale
+        for d in order:
+            payment = min(max(left, 0), balances[d])
+            balances[d] -= payment
+            left -= payment
+        balances = [b if b >= 0.005 else 0 for b in balances]
+    return interest, balances
+
+
+def test_vectorized_simulation_matches_reference():
+    rng = random.Random(7)
+    balances = [rng.uniform(100, 5000) for _ in range(12)]
+    rates = [rng.choice([0, 3.5, 12, 19.9, 27]) for _ in range(12)]
+    orders = [rng.sample(range(12), 12) for _ in range(3)]
+
+    payments, interest, remaining = PayoffSimulationService.simulate(balances, rates, orders, 900, 360, minimum_payment_pct=2)
+
+    for s, order in enumerate(orders):
+        expected_interest, expected_balances = _reference(balances, rates, order, 900, 360, 2)
+        assert interest[s].sum() == pytest.approx(expected_interest)
+        assert remaining[s, -1] == pytest.approx(np.array(expected_balances))
+        assert payments[s].sum() == pytest.approx(sum(balances) + expected_interest - sum(expected_balances))
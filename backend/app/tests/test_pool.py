@@ -0,0 +1,51 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from core import pool
+from core.config import settings
+from features.auth.service import Principal, get_current_user
+
+
+def test_engine_options_come_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 7)
+    monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 5000)
+
+    options = pool.engine_options("postgresql://u:p@db/app")
+    assert (options["pool_size"], options["pool_recycle"], options["pool_pre_ping"]) == (
+        7, settings.DB_POOL_RECYCLE, settings.DB_POOL_PRE_PING
+    )
+    async_options = pool.engine_options("postgresql://u:p@db/app", is_async=True)
+    assert async_options["connect_args"]["server_settings"]["statement_timeout"] == "5000"
+    assert pool._session_statements() == ["SET client_encoding TO 'UTF8'", "SET statement_timeout = 5000"]
+    assert pool.engine_options("sqlite://") == {}
+
+
+def test_pool_monitor_counts_connections_and_checkouts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    monitor = pool.PoolMonitor("test", engine)
+
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            assert monitor.status()["checkedout"] == 1
+
+    status = monitor.status()
+    assert (status["connects"], status["checkouts"], status["checkins"], status["checkedout"]) == (1, 3, 3, 0)
+    engine.dispose()
+
+
+@pytest.mark.parametrize("email, allowed", [("ops@example.com", True), ("OPS@example.com", True), ("user@example.com", False)])
+def test_system_endpoints_are_for_ops_users(monkeypatch, email, allowed):
+    monkeypatch.setattr(settings, "OPS_USER_EMAILS", "admin@example.com, ops@example.com")
+    from main import app
+    app.dependency_overrides[get_current_user] = lambda: Principal(id=1, email=email, username=None, created_at=None)
+    try:
+        client = TestClient(app)
+        for path in ("/system/pool", "/system/cache"):
+            response = client.get(path)
+            assert response.status_code == (200 if allowed else 403)
+        if allowed:
+            assert "sync" in client.get("/system/pool").json()
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,79 @@
+from datetime import date
+
+from sqlalchemy import event
+
+from features.loans.models import Loan
+from features.transactions import models, schemas, service
+from features.users.models import User
+
+
+def _payloads(count: int) -> list[schemas.TransactionCreate]:
+    return [
+        schemas.TransactionCreate(
+            description=f"Item {idx}",
+            amount=5 + idx,
+            type="expense",
+            payment_method="Cartão de crédito" if idx % 2 else "Dinheiro",
+            date=date(2024, 5, 1 + idx % 28),
+        )
+        for idx in range(count)
+    ]
+
+
+def _count_statements(session):
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_batch_create_and_delete_use_constant_statements(sqlite_session):
+    user = User(email="batch@example.com", password_hash="x")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    user_id = user.id
+
+    statements = _count_statements(sqlite_session)
+    created = service.create_transactions(sqlite_session, _payloads(40), user_id)
+    assert len(created) == 40
+    assert len(statements) == 5  # INSERT ... RETURNING + card loans + rollup upsert + data version + reload
+    assert sqlite_session.query(Loan).filter(Loan.deleted_at.is_(None)).count() == 20
+    card_ids = {tx.id for tx in created if tx.payment_method == "Cartão de crédito"}
+    assert {loan.transaction_id for loan in sqlite_session.query(Loan)} == card_ids
+
+    ids = [tx.id for tx in created] + [10_000]
+    statements.clear()
+    result = service.delete_transactions(sqlite_session, ids, user_id)
+    assert len(statements) == 4  # UPDATE ... RETURNING + rollup + loan UPDATE + data version
+    assert result["not_found"] == [10_000]
+    assert len(result["deleted"]) == 40
+
+    assert sqlite_session.query(models.Transaction).filter(models.Transaction.deleted_at.is_(None)).count() == 0
+    assert sqlite_session.query(Loan).filter(Loan.deleted_at.is_(None)).count() == 0
+
+
+def test_batch_delete_ignores_other_users(sqlite_session):
+    owner = User(email="owner@example.com", password_hash="x")
+    other = User(email="other@example.com", password_hash="x")
+    sqlite_session.add_all([owner, other])
+    sqlite_session.commit()
+    created = service.create_transactions(sqlite_session, _payloads(2), owner.id)
+
+    result = service.delete_transactions(sqlite_session, [tx.id for tx in created], other.id)
+
+    assert result["deleted"] == []
+    assert sqlite_session.query(models.Transaction).filter(models.Transaction.deleted_at.is_(None)).count() == 2
+
+
+def test_delete_removes_exactly_the_linked_card_loan(sqlite_session):
+    user = User(email="linked@example.com", password_hash="x")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    twin = schemas.TransactionCreate(description="Café", amount=2, type="expense",
+                                     payment_method="Cartão de crédito", date=date(2024, 5, 1))
+    first = service.create_transaction(sqlite_session, twin, user.id)
+    second = service.create_transaction(sqlite_session, twin, user.id)
+
+    service.delete_transaction(sqlite_session, second.id, user.id)
+
+    live = sqlite_session.query(Loan).filter(Loan.deleted_at.is_(None)).all()
+    assert [loan.transaction_id for loan in live] == [first.id]
@@ -0,0 +1,48 @@
+import csv
+import io
+import json
+from datetime import date
+
+from features.categories.models import Category
+from features.transactions import kinds, models, schemas, service
+from features.users.models import User
+
+
+def _seed(session) -> User:
+    user = User(email="export@example.com", password_hash="x")
+    debt = Category(name="Pagamento de dívidas", type="expense")
+    session.add_all([user, debt])
+    session.flush()
+    session.add_all([
+        models.Transaction(user_id=user.id, description="Groceries", amount=20, type="expense",
+                           payment_method="Dinheiro", date=date(2024, 1, 2)),
+        models.Transaction(user_id=user.id, description="Pagamento de Cartão de Crédito: Visa", amount=50,
+                           type="expense", payment_method="Outro", date=date(2024, 1, 3), category_id=debt.id,
+                           kind=kinds.CARD_REPAYMENT),
+        models.Transaction(user_id=user.id, description="Salary", amount=1000, type="income",
+                           payment_method="Outro", date=date(2024, 2, 1)),
+    ])
+    session.commit()
+    return user
+
+
+def test_export_csv_streams_header_and_rows(sqlite_session, monkeypatch):
+    monkeypatch.setattr(service, "EXPORT_BATCH_SIZE", 1)
+    user = _seed(sqlite_session)
+
+    chunks = list(service.export_csv(sqlite_session, user.id))
+    rows = list(csv.reader(io.StringIO("".join(chunks))))
+
+    assert len(chunks) > 1
+    assert rows[0] == service.EXPORT_COLUMNS
+    assert [r[2] for r in rows[1:]] == ["Groceries", "Pagamento de Cartão de Crédito: Visa", "Salary"]
+    assert rows[2][6] == "Pagamento de dívidas"
+
+
+def test_export_ndjson_applies_analytics_filters(sqlite_session):
+    user = _seed(sqlite_session)
+    filters = schemas.TransactionFilters(end_date=date(2024, 1, 31), exclude_card_repayment=True)
+
+    lines = "".join(service.export_ndjson(sqlite_session, user.id, filters)).splitlines()
+
+    assert [json.loads(line)["description"] for line in lines] == ["Groceries"]
@@ -0,0 +1,111 @@
+import io
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from features.categories.models import Category
+from features.loans.models import Loan
+from features.transactions import import_service, models
+from features.transactions.import_parsers import parse_camt053, parse_ofx
+from features.transactions.import_service import StatementImportService
+from features.users.models import User
+
+CSV_STATEMENT = """date;description;amount;payment_method
+31/01/2024;Supermercado;-45,20;Cartão de crédito
+01/02/2024;Salário;1.500,00;
+not-a-date;Broken;10;
+02/02/2024;Farmácia;-12.5;
+"""
+
+OFX_STATEMENT = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240105120000[-3:BRT]
+<TRNAMT>-19.99
+<NAME>Streaming
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240106<TRNAMT>250.00<NAME>Refund<MEMO>Order 42</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+CAMT_STATEMENT = """<?xml version="1.0" encoding="UTF-8"?>
+<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02"><BkToCstmrStmt><Stmt>
+<Ntry><Amt Ccy="EUR">30.00</Amt><CdtDbtInd>DBIT</CdtDbtInd><BookgDt><Dt>2024-03-01</Dt></BookgDt>
+<NtryDtls><TxDtls><RmtInf><Ustrd>Ginásio</Ustrd></RmtInf></TxDtls></NtryDtls></Ntry>
+<Ntry><Amt Ccy="EUR">100.00</Amt><CdtDbtInd>CRDT</CdtDbtInd><BookgDt><DtTm>2024-03-02T10:00:00</DtTm></BookgDt>
+<AddtlNtryInf>Transferência recebida</AddtlNtryInf></Ntry>
+</Stmt></BkToCstmrStmt></Document>
+"""
+
+
+def _user(session) -> User:
+    user = User(email="import@example.com", password_hash="x")
+    session.add(user)
+    session.commit()
+    return user
+
+
+def test_csv_import_reports_rows_and_creates_card_loans(sqlite_session, monkeypatch):
+    monkeypatch.setattr(import_service, "IMPORT_BATCH_SIZE", 2)
+    user = _user(sqlite_session)
+
+    report = StatementImportService.import_statement(
+        sqlite_session, user.id, io.BytesIO(CSV_STATEMENT.encode()), "csv"
+    )
+
+    assert (report["imported"], report["failed"], report["loans_created"]) == (3, 1, 1)
+    assert [r["status"] for r in report["rows"]] == ["imported", "imported", "error", "imported"]
+
+    rows = sqlite_session.query(models.Transaction).order_by(models.Transaction.date).all()
+    assert [(r.type, r.amount, r.payment_method) for r in rows] == [
+        ("expense", Decimal("45.20"), "Cartão de crédito"),
+        ("income", Decimal("1500.00"), "Transferência bancária"),
+        ("expense", Decimal("12.50"), "Transferência bancária"),
+    ]
+    loan = sqlite_session.query(Loan).one()
+    assert loan.name == "Despesa CC: Supermercado"
+
+
+def test_rows_the_database_would_reject_are_reported(sqlite_session):
+    user = _user(sqlite_session)
+    food = Category(name="Alimentação", type="expense")
+    sqlite_session.add(food)
+    sqlite_session.commit()
+    statement = (
+        "date;description;amount;payment_method;category_id\n"
+        "01/02/2024;Mercado;-10;Dinheiro;{food}\n"
+        "02/02/2024;Cheque;-20;Cheque;\n"
+        "03/02/2024;Outra;-30;Dinheiro;{foreign}\n"
+        "04/02/2024;Renda;-40;;\n"
+    ).format(food=food.id, foreign=food.id + 100)
+
+    report = StatementImportService.import_statement(sqlite_session, user.id, io.BytesIO(statement.encode()), "csv")
+
+    assert (report["imported"], report["failed"]) == (2, 2)
+    assert [r["status"] for r in report["rows"]] == ["imported", "error", "error", "imported"]
+    assert "payment method" in report["rows"][1]["error"] and "category" in report["rows"][2]["error"]
+    assert sorted(float(t.amount) for t in sqlite_session.query(models.Transaction)) == [10, 40]
+
+
+def test_unreadable_statement_rolls_back(sqlite_session):
+    user = _user(sqlite_session)
+
+    with pytest.raises(ValueError):
+        StatementImportService.import_statement(sqlite_session, user.id, io.BytesIO(b"<Document><Ntry>"), "camt053")
+    assert sqlite_session.query(models.Transaction).count() == 0
+
+
+def test_ofx_and_camt_parsers():
+    ofx = [entry for _, entry in parse_ofx(io.BytesIO(OFX_STATEMENT.encode("latin-1")))]
+    assert ofx == [
+        {"date": date(2024, 1, 5), "description": "Streaming", "amount": Decimal("-19.99")},
+        {"date": date(2024, 1, 6), "description": "Refund - Order 42", "amount": Decimal("250.00")},
+    ]
+
+    camt = [entry for _, entry in parse_camt053(io.BytesIO(CAMT_STATEMENT.encode()))]
+    assert camt == [
+        {"date": date(2024, 3, 1), "description": "Ginásio", "amount": Decimal("-30.00")},
+        {"date": date(2024, 3, 2), "description": "Transferência recebida", "amount": Decimal("100.00")},
+    ]
@@ -0,0 +1,65 @@
+from datetime import date
+
+import pytest
+
+from features.transactions import models, schemas, service
+from features.users.models import User
+
+
+def _seed(session, count: int) -> User:
+    user = User(email="pager@example.com", password_hash="x")
+    session.add(user)
+    session.flush()
+    for idx in range(count):
+        session.add(models.Transaction(
+            user_id=user.id,
+            description=f"Entry {idx}",
+            amount=10 + idx,
+            type="expense" if idx % 2 else "income",
+            payment_method="Dinheiro",
+            # Several rows per day so the id tie-breaker matters
+            date=date(2024, 1, 1 + idx // 3),
+        ))
+    session.commit()
+    return user
+
+
+def test_pages_cover_every_row_once_in_order(sqlite_session):
+    user = _seed(sqlite_session, 10)
+
+    seen = []
+    cursor = None
+    while True:
+        page = service.get_transactions_page(sqlite_session, user.id, limit=4, cursor=cursor)
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 10
+    assert len({tx.id for tx in seen}) == 10
+    keys = [(tx.date, tx.id) for tx in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_page_filters_and_soft_deleted_rows(sqlite_session):
+    user = _seed(sqlite_session, 10)
+    deleted = sqlite_session.query(models.Transaction).filter(models.Transaction.type == "expense").first()
+    service.delete_transaction(sqlite_session, deleted.id, user.id)
+
+    filters = schemas.TransactionFilters(type="expense", min_amount=12, max_amount=17)
+    page = service.get_transactions_page(sqlite_session, user.id, filters=filters, limit=50)
+
+    assert page["next_cursor"] is None
+    assert deleted.id not in {tx.id for tx in page["items"]}
+    assert all(tx.type == "expense" and 12 <= tx.amount <= 17 for tx in page["items"])
+
+
+def test_invalid_cursor_is_rejected(sqlite_session):
+    user = _seed(sqlite_session, 3)
+    page = service.get_transactions_page(sqlite_session, user.id, limit=1)
+
+    with pytest.raises(ValueError):
+        service.get_transactions_page(sqlite_session, user.id, cursor="not-a-cursor")
+    with pytest.raises(ValueError):
+        service.get_transactions_page(sqlite_session, user.id, sort_by="created_at", cursor=page["next_cursor"])
@@ -0,0 +1,95 @@
+from datetime import date
+
+from features.categories.models import Category
+from features.transactions import kinds, schemas, service
+from features.transactions.analytics_service import TransactionAnalyticsService
+from features.transactions.models import Transaction, TransactionMonthlyRollup
+from features.transactions.rollup_service import TransactionRollupService
+from features.users.models import User
+
+
+def _seed(session):
+    user = User(email="rollup@example.com", password_hash="x")
+    food = Category(name="Alimentação", type="expense")
+    debt = Category(name="Pagamento de dívidas", type="expense")
+    session.add_all([user, food, debt])
+    session.commit()
+
+    def tx(day, amount, tx_type="expense", **extra):
+        payload = {"amount": amount, "type": tx_type, "payment_method": "Dinheiro", "date": day, **extra}
+        return service.create_transaction(session, schemas.TransactionCreate(**payload), user.id)
+
+    tx(date(2024, 1, 10), 1000, "income")
+    tx(date(2024, 1, 12), 40, category_id=food.id)
+    tx(date(2024, 2, 3), 60, category_id=food.id, payment_method="Cartão de crédito")
+    # Written the way loans.service.credit_card_balance_repayment does
+    repayment = Transaction(
+        user_id=user.id, description="Pagamento de Cartão de Crédito: Visa", amount=60, type="expense",
+        payment_method="Deposito à ordem", date=date(2024, 2, 20), category_id=debt.id, kind=kinds.CARD_REPAYMENT
+    )
+    session.add(repayment)
+    TransactionRollupService.record(session, [repayment])
+    session.commit()
+    removed = tx(date(2024, 3, 5), 25, category_id=food.id)
+    tx(date(2024, 3, 25), 15, category_id=food.id)
+    service.delete_transaction(session, removed.id, user.id)
+    return user, food, debt
+
+
+def _both_ways(session, user_id, *args, **kwargs):
+    """Runs a report on the incrementally maintained rollup and again after a full rebuild."""
+    incremental = TransactionAnalyticsService.get_monthly_summary(session, user_id, *args, **kwargs)
+    TransactionRollupService.rebuild(session)
+    rebuilt = TransactionAnalyticsService.get_monthly_summary(session, user_id, *args, **kwargs)
+    return incremental, rebuilt
+
+
+def test_monthly_summary_matches_rebuild_and_handles_partial_months(sqlite_session):
+    user, _, _ = _seed(sqlite_session)
+
+    incremental, rebuilt = _both_ways(sqlite_session, user.id, date(2024, 1, 11), date(2024, 3, 31))
+
+    assert incremental == rebuilt
+    assert [(m["month"], m["total_income"], m["total_expense"]) for m in incremental["data"]] == [
+        (1, 0, 40),  # partial month: the income on the 10th is outside the range
+        (2, 0, 120),
+        (3, 0, 15),  # the deleted transaction is gone from the rollup
+    ]
+
+
+def test_rollup_filters_and_category_spending(sqlite_session):
+    user, food, _ = _seed(sqlite_session)
+    start, end = date(2024, 1, 1), date(2024, 3, 31)
+
+    summary = TransactionAnalyticsService.get_monthly_summary(
+        sqlite_session, user.id, start, end, exclude_credit_card=True, exclude_card_repayment=True
+    )
+    assert [(m["month"], m["total_expense"]) for m in summary["data"]] == [(1, 40), (3, 15)]
+
+    spending = TransactionAnalyticsService.get_spending_by_category(sqlite_session, user.id, start, end)
+    assert [(c["category_name"], c["total_amount"]) for c in spending["categories"]] == [
+        ("Alimentação", 115), ("Pagamento de dívidas", 60)
+    ]
+
+    card_rows = sqlite_session.query(TransactionMonthlyRollup).filter(TransactionMonthlyRollup.is_card_repayment.is_(True)).all()
+    assert [(r.month_start, r.total) for r in card_rows] == [(date(2024, 2, 1), 60)]
+
+
+def test_kind_is_set_by_the_writing_service(sqlite_session):
+    user, food, _ = _seed(sqlite_session)
+
+    purchase = service.create_transaction(sqlite_session, schemas.TransactionCreate(
+        amount=5, type="expense", payment_method="Cartão de crédito", date=date(2024, 4, 1), category_id=food.id
+    ), user.id)
+    batch = service.create_transactions(sqlite_session, [
+        schemas.TransactionCreate(amount=5, type="expense", payment_method="Dinheiro", date=date(2024, 4, 2)),
+        schemas.TransactionCreate(amount=5, type="expense", payment_method="Credit Card", date=date(2024, 4, 3)),
+    ], user.id)
+
+    assert purchase.kind == kinds.CARD_PURCHASE
+    assert [tx.kind for tx in batch] == [kinds.REGULAR, kinds.CARD_PURCHASE]
+
+    filtered = service.get_transactions(
+        sqlite_session, user.id, filters=schemas.TransactionFilters(exclude_credit_card=True, exclude_card_repayment=True)
+    )
+    assert {tx.kind for tx in filtered} == {kinds.REGULAR}
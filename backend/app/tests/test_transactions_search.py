@@ -0,0 +1,49 @@
+from datetime import date
+
+from features.business.models import Business
+from features.business.transactions import service as business_service
+from features.business.transactions.models import BusinessTransaction
+from features.transactions import schemas, service
+from features.users.models import User
+
+
+def test_search_ranks_by_matching_terms_and_skips_deleted(sqlite_session):
+    user = User(email="search@example.com", password_hash="x")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+
+    def tx(description):
+        return service.create_transaction(sqlite_session, schemas.TransactionCreate(
+            description=description, amount=10, type="expense", payment_method="Dinheiro", date=date(2024, 1, 1)
+        ), user.id)
+
+    both = tx("Supermercado Continente")
+    one = tx("Continente online")
+    tx("Farmácia")
+    removed = tx("Continente 100%")
+    service.delete_transaction(sqlite_session, removed.id, user.id)
+
+    hits = service.search_transactions(sqlite_session, user.id, "continente SUPERMERCADO")
+    assert [(h.id, h.rank) for h in hits] == [(both.id, 2), (one.id, 1)]
+    assert service.search_transactions(sqlite_session, user.id, "100%") == []
+    assert [h.id for h in service.search_transactions(sqlite_session, user.id, "continente", skip=1, limit=1)] == [both.id]
+
+
+def test_business_search_matches_counterparty(sqlite_session):
+    user = User(email="biz-search@example.com", password_hash="x")
+    sqlite_session.add(user)
+    sqlite_session.commit()
+    business = Business(name="Loja", tax_id="500000000", country="PT")
+    sqlite_session.add(business)
+    sqlite_session.commit()
+
+    sqlite_session.add(BusinessTransaction(
+        business_id=business.id, user_id=user.id, counterparty_name="EDP Comercial",
+        counterparty_tax_id="503504564", counterparty_country="PT", description="Eletricidade",
+        type="expense", net_amount=100, vat_amount=23, vat_exemption=False, gross_amount=123,
+        payment_method="Transferência bancária", date=date(2024, 1, 1),
+    ))
+    sqlite_session.commit()
+
+    hits = business_service.search_transactions(sqlite_session, business.id, "edp")
+    assert [h.counterparty_name for h in hits] == ["EDP Comercial"]
@@ -0,0 +1,84 @@
+"""Compares the sequential and the concurrent credit-card analytics report.
+
+Runs CreditCardsAnalyticsService.get_analytics (one query after the other on a
+session) and get_analytics_concurrent (all queries at once on pooled async
+connections) against DATABASE_URL and prints the mean / p95 latency of each.
+
+Usage (from backend/, with PYTHONPATH=app):
+    python benchmark_card_analytics.py --user-id 7 --runs 50
+    python benchmark_card_analytics.py --user-id 7 --latency-ms 5  # simulate a remote DB
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import event
+from sqlalchemy.util import await_only
+
+from core.db import SessionLocal, async_engine, engine
+from features.users import models as _users  # noqa: F401 - register tables
+from features.categories import models as _categories  # noqa: F401
+from features.credit_cards.analytics_service import CreditCardsAnalyticsService
+
+
+def add_latency(latency_ms: float):
+    """Delays every statement, standing in for the network round-trip to a remote DB."""
+    def delay(*args):
+        time.sleep(latency_ms / 1000)
+
+    def async_delay(*args):
+        # The async engine runs its events inside a greenlet on the event loop, so it
+        # must yield to the loop rather than block it
+        await_only(asyncio.sleep(latency_ms / 1000))
+
+    event.listen(engine, "before_cursor_execute", delay)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", async_delay)
+
+
+def summarize(name: str, timings: list[float]):
+    timings = sorted(timings)
+    p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+    print(f"{name:<12} mean {statistics.mean(timings) * 1000:8.2f} ms   p95 {p95 * 1000:8.2f} ms")
+
+
+def run_sequential(user_id: int, runs: int):
+    timings = []
+    db = SessionLocal()
+    try:
+        for _ in range(runs):
+            started = time.perf_counter()
+            CreditCardsAnalyticsService.get_analytics(db, user_id)
+            timings.append(time.perf_counter() - started)
+    finally:
+        db.close()
+    return timings
+
+
+async def run_concurrent(user_id: int, runs: int):
+    timings = []
+    try:
+        # Warm-up run, so opening the pool's connections is not measured
+        await CreditCardsAnalyticsService.get_analytics_concurrent(async_engine, user_id)
+        for _ in range(runs):
+            started = time.perf_counter()
+            await CreditCardsAnalyticsService.get_analytics_concurrent(async_engine, user_id)
+            timings.append(time.perf_counter() - started)
+    finally:
+        await async_engine.dispose()
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    if args.latency_ms:
+        add_latency(args.latency_ms)
+    run_sequential(args.user_id, 1)  # warm-up
+
+    summarize("sequential", run_sequential(args.user_id, args.runs))
+    summarize("concurrent", asyncio.run(run_concurrent(args.user_id, args.runs)))
@@ -127,4 +127,120 @@ CREATE TABLE IF NOT EXISTS public.business_transactions(
     date DATE NOT NULL,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     deleted_at TIMESTAMPTZ NULL
+);
+
+-- Keyset pagination over a user's transactions
+CREATE INDEX IF NOT EXISTS ix_transactions_user_date_id
+    ON public.transactions (user_id, date DESC, id DESC) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS ix_transactions_user_created_at_id
+    ON public.transactions (user_id, created_at DESC, id DESC) WHERE deleted_at IS NULL;
+
+-- Monthly totals per user/type/category/payment method, kept in sync by the
+-- transaction write services (rebuild with backend/rebuild_rollups.py)
+CREATE TABLE IF NOT EXISTS public.transaction_monthly_rollups(
+    user_id INTEGER NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
+    month_start DATE NOT NULL,
+    type VARCHAR(10) NOT NULL,
+    category_id INTEGER NOT NULL,            -- 0 = uncategorised
+    payment_method VARCHAR(50) NOT NULL,
+    is_card_repayment BOOLEAN NOT NULL,
+    total NUMERIC(14,2) NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, month_start, type, category_id, payment_method, is_card_repayment)
+);
+
+-- Per-user data version behind the ETag / cache keys (bumped by every write service)
+ALTER TABLE public.users ADD COLUMN IF NOT EXISTS data_version BIGINT NOT NULL DEFAULT 0;
+
+-- Transaction search (core/search.py): full-text (Portuguese) and trigram GIN indexes
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS ix_transactions_search_fts
+    ON public.transactions USING gin (to_tsvector('portuguese'::regconfig, coalesce(description, '')))
+    WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS ix_transactions_search_trgm
+    ON public.transactions USING gin (coalesce(description, '') gin_trgm_ops)
+    WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS ix_business_transactions_search_fts
+    ON public.business_transactions USING gin (to_tsvector('portuguese'::regconfig, (coalesce(description, '') || ' ') || coalesce(counterparty_name, '')))
+    WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS ix_business_transactions_search_trgm
+    ON public.business_transactions USING gin (((coalesce(description, '') || ' ') || coalesce(counterparty_name, '')) gin_trgm_ops)
+    WHERE deleted_at IS NULL;
+
+-- Typed transaction kinds (features/transactions/kinds.py) replacing the
+-- payment-method / description heuristics, with a backfill of existing rows
+ALTER TABLE public.transactions ADD COLUMN IF NOT EXISTS kind VARCHAR(20) NOT NULL DEFAULT 'regular';
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'transactions_kind_check') THEN
+        ALTER TABLE public.transactions ADD CONSTRAINT transactions_kind_check
+            CHECK (kind IN ('regular', 'card_purchase', 'card_repayment', 'loan_repayment', 'balance_adjustment'));
+    END IF;
+END $$;
+UPDATE public.transactions SET kind = 'card_purchase'
+    WHERE kind = 'regular' AND payment_method IN ('Cartão de crédito', 'credit_card', 'Credit Card');
+UPDATE public.transactions t SET kind = 'card_repayment'
+    FROM public.categories c
+    WHERE t.kind = 'regular' AND t.category_id = c.id AND c.name = 'Pagamento de dívidas'
+      AND t.description ILIKE 'Pagamento de Cartão de Crédito%';
+UPDATE public.transactions t SET kind = 'loan_repayment'
+    FROM public.categories c
+    WHERE t.kind = 'regular' AND t.category_id = c.id AND c.name = 'Pagamento de dívidas'
+      AND t.description ILIKE 'Pagamento de Empréstimo%';
+CREATE INDEX IF NOT EXISTS ix_transactions_user_kind_date
+    ON public.transactions (user_id, kind, date) WHERE deleted_at IS NULL;
+
+-- Link from the loan created for a credit-card expense to its transaction
+ALTER TABLE public.loans ADD COLUMN IF NOT EXISTS transaction_id INTEGER
+    REFERENCES public.transactions(id) ON DELETE CASCADE;
+CREATE INDEX IF NOT EXISTS ix_loans_transaction_id ON public.loans (transaction_id);
+-- Backfill: pair each card expense with one unlinked loan created for it (same
+-- user, "Despesa CC: <description>", principal and start date), in id order
+WITH tx AS (
+    SELECT id, user_id, 'Despesa CC: ' || coalesce(description, 'Sem descrição') AS name, amount, date,
+           row_number() OVER (PARTITION BY user_id, description, amount, date ORDER BY id) AS rn
+    FROM public.transactions
+    WHERE payment_method = 'Cartão de crédito'
+      AND NOT EXISTS (SELECT 1 FROM public.loans l WHERE l.transaction_id = transactions.id)
+), loan AS (
+    SELECT id, user_id, name, principal, start_date,
+           row_number() OVER (PARTITION BY user_id, name, principal, start_date ORDER BY id) AS rn
+    FROM public.loans
+    WHERE transaction_id IS NULL AND name LIKE 'Despesa CC: %'
 )
+UPDATE public.loans l SET transaction_id = tx.id
+FROM loan JOIN tx ON tx.user_id = loan.user_id AND tx.name = loan.name
+    AND tx.amount = loan.principal AND tx.date = loan.start_date AND tx.rn = loan.rn
+WHERE l.id = loan.id;
+
+-- Keyset pagination over a business' transactions
+CREATE INDEX IF NOT EXISTS ix_business_transactions_business_date_id
+    ON public.business_transactions (business_id, date DESC, id DESC) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS ix_business_transactions_business_created_at_id
+    ON public.business_transactions (business_id, created_at DESC, id DESC) WHERE deleted_at IS NULL;
+
+-- Monthly net totals per business/type/category/currency behind the P&L report, kept in
+-- sync by the business transaction services (rebuild with backend/rebuild_rollups.py)
+CREATE TABLE IF NOT EXISTS public.business_monthly_rollups(
+    business_id INTEGER NOT NULL REFERENCES public.business(id) ON DELETE CASCADE,
+    month_start DATE NOT NULL,
+    type VARCHAR(10) NOT NULL,
+    category_id INTEGER NOT NULL,            -- 0 = uncategorised
+    currency VARCHAR(3) NOT NULL DEFAULT 'EUR',
+    net_total NUMERIC(14,2) NOT NULL DEFAULT 0,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (business_id, month_start, type, category_id, currency)
+);
+-- Tables created before the currency column: add it to the key, then rebuild the
+-- rows with backend/rebuild_rollups.py (they added up every currency)
+ALTER TABLE public.business_monthly_rollups ADD COLUMN IF NOT EXISTS currency VARCHAR(3) NOT NULL DEFAULT 'EUR';
+ALTER TABLE public.business_monthly_rollups DROP CONSTRAINT IF EXISTS business_monthly_rollups_pkey,
+    ADD PRIMARY KEY (business_id, month_start, type, category_id, currency);
+
+-- Current debt of each card (sum of its active loans), maintained by the loan
+-- write services; check / repair with backend/repair_card_balances.py
+ALTER TABLE public.credit_cards ADD COLUMN IF NOT EXISTS current_balance NUMERIC(12,2) NOT NULL DEFAULT 0;
+UPDATE public.credit_cards c SET current_balance = coalesce((
+    SELECT sum(l.principal) FROM public.loans l
+    WHERE l.used_credit_card = c.id AND l.user_id = c.user_id AND l.deleted_at IS NULL
+), 0);
@@ -0,0 +1,39 @@
+"""Backfills / repairs the monthly rollup tables (personal and business transactions).
+
+Usage (from backend/, with PYTHONPATH=app):
+    python rebuild_rollups.py                  # every user and every business
+    python rebuild_rollups.py --user-id 7      # a single user
+    python rebuild_rollups.py --business-id 3  # a single business
+"""
+import argparse
+
+from core.db import SessionLocal, Base, engine
+from features.users import models as _users  # noqa: F401 - register tables
+from features.categories import models as _categories  # noqa: F401
+from features.business import models as _business  # noqa: F401
+from features.business.transaction_categories import models as _business_categories  # noqa: F401
+from features.transactions.rollup_service import TransactionRollupService
+from features.business.transactions.rollup_service import BusinessRollupService
+
+
+def rebuild(user_id: int | None = None, business_id: int | None = None):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if business_id is None:
+            rows = TransactionRollupService.rebuild(db, user_id)
+            print(f"Rebuilt {rows} rollup rows" + (f" for user {user_id}" if user_id else ""))
+        if user_id is None:
+            rows = BusinessRollupService.rebuild(db, business_id)
+            print(f"Rebuilt {rows} business rollup rows" + (f" for business {business_id}" if business_id else ""))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--user-id", type=int, default=None)
+    group.add_argument("--business-id", type=int, default=None)
+    args = parser.parse_args()
+    rebuild(args.user_id, args.business_id)
@@ -0,0 +1,36 @@
+"""Checks / repairs credit_cards.current_balance against the card's active loans.
+
+Usage (from backend/, with PYTHONPATH=app):
+    python repair_card_balances.py                # repair every card
+    python repair_card_balances.py --user-id 7    # the cards of a single user
+    python repair_card_balances.py --check        # only report the drifted cards
+"""
+import argparse
+
+from core.db import SessionLocal, Base, engine
+from features.users import models as _users  # noqa: F401 - register tables
+from features.categories import models as _categories  # noqa: F401
+from features.transactions import models as _transactions  # noqa: F401
+from features.credit_cards.balances import check_balances, repair_balances
+
+
+def repair(user_id: int | None = None, check_only: bool = False) -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        drifted = check_balances(db, user_id) if check_only else repair_balances(db, user_id)
+    finally:
+        db.close()
+    for card in drifted:
+        print(f"Card {card['card_id']} (user {card['user_id']}): stored {card['stored']}, loans {card['actual']}")
+    print(f"{len(drifted)} card(s) " + ("out of sync" if check_only else "repaired"))
+    return len(drifted)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", type=int, default=None)
+    parser.add_argument("--check", action="store_true", help="report without writing; exits 1 if any card is out of sync")
+    args = parser.parse_args()
+    drifted = repair(args.user_id, args.check)
+    raise SystemExit(1 if args.check and drifted else 0)